@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the recoding of categorical columns.
+
+Compare the recoding of the codes with a lookup array (`recode_categorical`)
+to the cast of the column (`astype`), and `concat_with_categories` to the cast of
+the whole DataFrames before `pd.concat`, and to `pd.concat` alone, which falls
+back to `object`, from 1 to 100k categories. The concatenation of many DataFrames
+is then compared, from 2 to 400 DataFrames of 20k overlapping categories, with
+the union of their categories done in a single pass or by a fold of pairwise unions.
+
+Usage: PYTHONPATH=. python benchmarks/bench_categories.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import timeit
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from bff import concat_with_categories, recode_categorical
+
+N_CATEGORIES = (1, 10, 100, 1_000, 10_000, 100_000)
+N_FRAMES = (2, 10, 100, 400)
+N_CATEGORIES_FRAMES = 20_000
+
+
+def make_frames(n_rows: int, n_categories: int, n_frames: int = 2, random_state: int = 0):
+    """
+    Create DataFrames with a categorical column having different categories.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of each DataFrame.
+    n_categories : int
+        Number of categories of each DataFrame. The categories of each DataFrame are
+        shifted by ``n_categories // n_frames``, two DataFrames share half of them.
+    n_frames : int, default 2
+        Number of DataFrames.
+    random_state : int, default 0
+        Seed of the values.
+
+    Returns
+    -------
+    tuple of pd.DataFrame
+        The DataFrames, with a categorical column `key` and a float column `value`.
+    """
+    rng = np.random.default_rng(random_state)
+    frames = []
+    for offset in (i * (n_categories // n_frames) for i in range(n_frames)):
+        categories = [f'cat_{i:06d}' for i in range(offset, offset + n_categories)]
+        frames.append(pd.DataFrame({
+            'key': pd.Categorical.from_codes(rng.integers(0, n_categories, n_rows),
+                                             categories=categories),
+            'value': rng.random(n_rows)}))
+    return tuple(frames)
+
+
+def concat_astype(*dfs: pd.DataFrame) -> pd.DataFrame:
+    """Concatenation casting the whole DataFrames to the union of the categories."""
+    cat_type = pd.CategoricalDtype(pd.api.types.union_categoricals(
+        [df['key'] for df in dfs], sort_categories=True).categories)
+    return pd.concat([df.astype({'key': cat_type}) for df in dfs], ignore_index=True)
+
+
+def main(n_rows: int, repeat: int) -> pd.DataFrame:
+    """
+    Run the benchmark and return the best time of each method, in seconds.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of each DataFrame.
+    repeat : int
+        Number of runs of each method, the best one is kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        Times with the number of categories as index and the methods as columns.
+    """
+    results = []
+    for n_categories in N_CATEGORIES:
+        df_left, df_right = make_frames(n_rows, n_categories)
+        cat_type = pd.CategoricalDtype(df_left['key'].cat.categories
+                                       .union(df_right['key'].cat.categories))
+        methods = {
+            'astype': lambda: df_right['key'].astype(cat_type),
+            'recode_categorical': lambda: recode_categorical(df_right['key'].values, cat_type),
+            'pd.concat': lambda: pd.concat([df_left, df_right], ignore_index=True),
+            'astype + pd.concat': lambda: concat_astype(df_left, df_right),
+            'concat_with_categories': lambda: concat_with_categories(df_left, df_right,
+                                                                     ignore_index=True),
+        }
+        # The recoding must give the same codes as the cast.
+        assert (recode_categorical(df_right['key'].values, cat_type).codes
+                == df_right['key'].astype(cat_type).cat.codes.values).all()
+        pd.testing.assert_frame_equal(concat_with_categories(df_left, df_right,
+                                                             ignore_index=True),
+                                      concat_astype(df_left, df_right))
+        results.append({'n_categories': n_categories,
+                        **{name: min(timeit.repeat(method, number=1, repeat=repeat))
+                           for name, method in methods.items()}})
+    return pd.DataFrame(results).set_index('n_categories')
+
+
+def main_frames(n_rows: int, repeat: int) -> pd.DataFrame:
+    """
+    Run the benchmark on many DataFrames and return the best time of each method, in seconds.
+
+    Parameters
+    ----------
+    n_rows : int
+        Total number of rows, split between the DataFrames.
+    repeat : int
+        Number of runs of each method, the best one is kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        Times with the number of DataFrames as index and the methods as columns.
+    """
+    results = []
+    for n_frames in N_FRAMES:
+        dfs = make_frames(n_rows // n_frames, N_CATEGORIES_FRAMES, n_frames)
+        indexes = [df['key'].cat.categories for df in dfs]
+        methods = {
+            'union fold': lambda: reduce(pd.Index.union, indexes),
+            'union single pass': lambda: indexes[0].append(indexes[1:]).unique().sort_values(),
+            'astype + pd.concat': lambda: concat_astype(*dfs),
+            'concat_with_categories': lambda: concat_with_categories(*dfs, ignore_index=True),
+        }
+        pd.testing.assert_frame_equal(concat_with_categories(*dfs, ignore_index=True),
+                                      concat_astype(*dfs))
+        results.append({'n_frames': n_frames,
+                        **{name: min(timeit.repeat(method, number=1, repeat=repeat))
+                           for name, method in methods.items()}})
+    return pd.DataFrame(results).set_index('n_frames')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help='number of rows of each DataFrame')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of each method, the best one is kept')
+    args = parser.parse_args()
+    print(main(args.rows, args.repeat).to_string(float_format='{:.4f}'.format))
+    print(main_frames(args.rows, args.repeat).to_string(float_format='{:.4f}'.format))
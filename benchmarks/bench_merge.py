@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the merge on categorical keys.
+
+Compare `merge_with_categories` to `pd.merge`, which casts the keys to `object`
+when the categories of both DataFrames differ, from 1 to 100k categories.
+A large DataFrame is joined with a table having one row per category.
+
+Usage: PYTHONPATH=. python benchmarks/bench_merge.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from bff import mem_usage_pd, merge_with_categories
+
+N_CATEGORIES = (1, 10, 100, 1_000, 10_000, 100_000)
+
+
+def make_frames(n_rows: int, n_categories: int, random_state: int = 0):
+    """
+    Create a large DataFrame and a table of its categories, with different categories.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of the large DataFrame.
+    n_categories : int
+        Number of categories of each DataFrame, half of them are shared.
+    random_state : int, default 0
+        Seed of the values.
+
+    Returns
+    -------
+    tuple of pd.DataFrame
+        The large DataFrame, with a categorical column `key` and a float column `value`,
+        and the table, with a categorical column `key` and an integer column `attribute`.
+    """
+    rng = np.random.default_rng(random_state)
+    categories = [f'cat_{i:06d}' for i in range(n_categories)]
+    df_large = pd.DataFrame({
+        'key': pd.Categorical.from_codes(rng.integers(0, n_categories, n_rows),
+                                         categories=categories),
+        'value': rng.random(n_rows)})
+    offset = n_categories // 2
+    categories_table = [f'cat_{i:06d}' for i in range(offset, offset + n_categories)]
+    df_table = pd.DataFrame({'key': pd.Categorical(categories_table),
+                             'attribute': np.arange(n_categories)})
+    return df_large, df_table
+
+
+def main(n_rows: int, repeat: int) -> pd.DataFrame:
+    """
+    Run the benchmark and return the best time and the memory of the result of each method.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of the large DataFrame.
+    repeat : int
+        Number of runs of each method, the best one is kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        Times in seconds and memory in MB, with the number of categories as index
+        and the methods as columns.
+    """
+    results = []
+    for n_categories in N_CATEGORIES:
+        df_large, df_table = make_frames(n_rows, n_categories)
+        methods = {
+            'pd.merge': lambda: pd.merge(df_large, df_table, on='key', how='left'),
+            'merge_with_categories': lambda: merge_with_categories(df_large, df_table,
+                                                                   on='key', how='left'),
+        }
+        result = {'n_categories': n_categories}
+        for name, method in methods.items():
+            result[f'{name} (s)'] = min(timeit.repeat(method, number=1, repeat=repeat))
+            result[f'{name} (MB)'] = float(mem_usage_pd(method(), details=False)['total']
+                                           .split()[0])
+        # The merge on the codes must give the same values as the merge on the values.
+        pd.testing.assert_frame_equal(methods['merge_with_categories']().astype({'key': str}),
+                                      methods['pd.merge']().astype({'key': str}))
+        results.append(result)
+    return pd.DataFrame(results).set_index('n_categories')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help='number of rows of the large DataFrame')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of each method, the best one is kept')
+    args = parser.parse_args()
+    print(main(args.rows, args.repeat).to_string(float_format='{:.4f}'.format))
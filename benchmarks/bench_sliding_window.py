@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the sliding window over a generator.
+
+Compare `sliding_window_iter`, which reads the generator in streaming with a ring buffer,
+to the materialization of the generator in a list before `sliding_window`.
+The values are small integers, cached by Python, so the memory measured is the one
+of the list and of the windows, not of the values.
+The time is measured without tracing, the peak of the memory allocated during each method
+in another run, with `track_memory`.
+
+Usage: PYTHONPATH=. python benchmarks/bench_sliding_window.py [--length 100000000]
+       [--window 1000] [--step 500] [--repeat 1]
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+from bff import MemoryRegistry, sliding_window, sliding_window_iter, track_memory
+
+
+def values(length: int):
+    """Generator of the values."""
+    return (i % 256 for i in range(length))
+
+
+def count_windows(windows) -> int:
+    """Consume the windows and count them."""
+    return sum(1 for __ in windows)
+
+
+def main(length: int, window_size: int, step: int, repeat: int) -> pd.DataFrame:
+    """
+    Run the benchmark and return the best time and the peak memory of each method.
+
+    Parameters
+    ----------
+    length : int
+        Number of values of the generator.
+    window_size : int
+        Size of the window.
+    step : int
+        Step for each sliding window.
+    repeat : int
+        Number of runs of each method, the best one is kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        Number of windows, time in seconds and peak of the allocated memory in MB,
+        with the methods as index.
+    """
+    methods = {
+        'list + sliding_window': lambda: count_windows(
+            sliding_window(list(values(length)), window_size, step)),
+        'sliding_window_iter': lambda: count_windows(
+            sliding_window_iter(values(length), window_size, step)),
+    }
+    registry = MemoryRegistry()
+    results = []
+    for name, method in methods.items():
+        result = {'method': name}
+        result['time (s)'] = min(timeit.repeat(method, number=1, repeat=repeat))
+        with track_memory(name, registry=registry):
+            result['windows'] = method()
+        result['peak (MB)'] = registry.to_frame()['peak_traced_mb'].iloc[-1]
+        results.append(result)
+    return pd.DataFrame(results).set_index('method')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--length', type=int, default=100_000_000,
+                        help='number of values of the generator')
+    parser.add_argument('--window', type=int, default=1_000, help='size of the window')
+    parser.add_argument('--step', type=int, default=500, help='step of the window')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of runs of each method, the best one is kept')
+    args = parser.parse_args()
+    print(main(args.length, args.window, args.step, args.repeat)
+          .to_string(float_format='{:.4f}'.format))
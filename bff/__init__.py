@@ -8,41 +8,91 @@ from . import plot
 
 from .fancy import (
     avg_dicts,
+    avg_nested_dicts,
+    BiDict,
     cast_to_category_pd,
     concat_with_categories,
+    DictAverager,
+    DtypePlan,
     get_peaks,
+    get_peaks_memmap,
+    get_peaks_pd,
     idict,
     kwargs_2_list,
     log_df,
+    map_windows,
+    mem_footprint,
     mem_usage_pd,
+    MEMORY_REGISTRY,
+    MemoryRegistry,
+    merge_with_categories,
     normalization_pd,
+    NormalizationPlan,
+    optimize_dtypes_pd,
     parse_date,
+    PeakDetector,
     pipe_multiprocessing_pd,
+    PipelineProfiler,
     read_sql_by_chunks,
+    recode_categorical,
     size_2_square,
     sliding_window,
+    sliding_window_batches,
+    sliding_window_iter,
+    sliding_window_np,
+    sliding_window_time,
+    sliding_window_time_bounds,
+    start_async_logging,
+    stop_async_logging,
+    track_memory,
     value_2_list,
 )
 
 from .config import FancyConfig
+from .registry import CategoryRegistry
 
 # Public object of the module.
 __all__ = [
     'avg_dicts',
+    'avg_nested_dicts',
+    'BiDict',
     'cast_to_category_pd',
+    'CategoryRegistry',
     'concat_with_categories',
+    'DictAverager',
+    'DtypePlan',
     'get_peaks',
+    'get_peaks_memmap',
+    'get_peaks_pd',
     'idict',
     'kwargs_2_list',
     'log_df',
+    'map_windows',
+    'mem_footprint',
     'mem_usage_pd',
+    'MEMORY_REGISTRY',
+    'MemoryRegistry',
+    'merge_with_categories',
     'normalization_pd',
+    'NormalizationPlan',
+    'optimize_dtypes_pd',
     'parse_date',
+    'PeakDetector',
     'pipe_multiprocessing_pd',
+    'PipelineProfiler',
     'plot',
     'read_sql_by_chunks',
+    'recode_categorical',
     'size_2_square',
     'sliding_window',
+    'sliding_window_batches',
+    'sliding_window_iter',
+    'sliding_window_np',
+    'sliding_window_time',
+    'sliding_window_time_bounds',
+    'start_async_logging',
+    'stop_async_logging',
+    'track_memory',
     'FancyConfig',
     'value_2_list',
 ]
@@ -3,21 +3,55 @@
 
 This module contains various useful fancy functions.
 """
-from collections import abc, Counter
+from collections import abc, deque
+from contextlib import ContextDecorator
+import copy
+import inspect
 import logging
+import logging.handlers
 import math
 import multiprocessing
+import multiprocessing.pool
+import queue
 import sys
+import threading
+import time
+import tracemalloc
+import warnings
 from functools import partial, wraps
-from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple, Union
+from itertools import islice, repeat
+from typing import (Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Mapping,
+                    Optional, Sequence, Set, Tuple, Union)
 from dateutil import parser
-from scipy import signal
+from scipy import signal, stats
 import numpy as np
 import pandas as pd
 from pandas.api.types import is_hashable
 
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Resource usage is not available on Windows.
+    resource = None  # type: ignore
+
 LOGGER = logging.getLogger(__name__)
 
+# Sequence given to the processes of `map_windows`, set once per process.
+_MAP_WINDOWS_SEQUENCE: Any = None
+# Stack of the active `PipelineProfiler` of each thread, used by `log_df`.
+_PROFILERS = threading.local()
+# Active `track_memory` contexts of all the threads, tracemalloc being global to the process,
+# guarded by a lock. The tracing started by the contexts is stopped by the last one tracing.
+_MEMORY_TRACKERS: List['_MemoryTracker'] = []
+_MEMORY_TRACKERS_LOCK = threading.Lock()
+_MEMORY_TRACING_STARTED = False
+# Keyword arguments, with their default, of the methods of `normalization_pd`.
+_NORMALIZATION_KWARGS: Dict[str, Dict[str, Any]] = {
+    'minmax': {'feature_range': (0, 1)},
+    'standard': {'with_mean': True, 'with_std': True},
+    'robust': {'with_centering': True, 'with_scaling': True, 'quantile_range': (25.0, 75.0)},
+}
+
 
 def avg_dicts(*args):
     """
@@ -40,33 +74,349 @@ def avg_dicts(*args):
     ------
     TypeError
         If a value is not a number.
+
+    See Also
+    --------
+    DictAverager : Average the dictionaries one at a time, with weights and variance.
     """
-    try:
-        total = sum(map(Counter, args), Counter())
-        n_dict = len(args)
-        return {k: v / n_dict for k, v in total.items()}
-    except TypeError as e:
-        raise TypeError('Some values of the dictionaries are not numbers.') from e
+    averager = DictAverager()
+    averager.update_many(args)
+    return averager.result()
+
+
+def avg_nested_dicts(*args) -> Dict:
+    """
+    Average all the values in the given nested dictionaries.
+
+    Nested version of `avg_dicts`, e.g. to average the reports of
+    `sklearn.metrics.classification_report` with ``output_dict=True`` across folds.
+
+    The dictionaries are flattened into their key paths, the values of all the
+    dictionaries are averaged at once with array operations, and the nested
+    structure is rebuilt.
+
+    Dictionaries must only have numerical values or dictionaries as values.
+    If a key is not present in one of the dictionary, the value is 0.
+    Empty dictionaries are kept as empty dictionaries.
+
+    Parameters
+    ----------
+    *args
+        Nested dictionaries to average, as positional arguments.
+
+    Returns
+    -------
+    dict
+        Nested dictionary with the average of all inputs.
+
+    Raises
+    ------
+    TypeError
+        If a value is not a number.
+    ValueError
+        If a key has a number as value in a dictionary and a dictionary in another.
+
+    Examples
+    --------
+    >>> report_a = {'0': {'precision': 0.5, 'recall': 1.0}, 'accuracy': 0.6}
+    >>> report_b = {'0': {'precision': 0.7, 'recall': 0.5}, 'accuracy': 0.8}
+    >>> avg_nested_dicts(report_a, report_b)
+    {'0': {'precision': 0.6, 'recall': 0.75}, 'accuracy': 0.7}
+    """
+    # Reports of the same model usually have the same structure, their values are
+    # stacked in a single array per structure.
+    groups: Dict[Tuple, List[List[Any]]] = {}
+    for d in args:
+        structure, values = _flatten_dict(d)
+        groups.setdefault(structure, []).append(values)
+
+    paths: Dict[Tuple, int] = {}
+    # Paths of the leaves and of the empty dictionaries, in the order of the inputs.
+    nodes: Dict[Tuple[Tuple, bool], None] = {}
+    sums = []
+    for structure, rows in groups.items():
+        try:
+            values = np.asarray(rows)
+        except ValueError as e:
+            raise TypeError('Some values of the dictionaries are not numbers.') from e
+        if values.dtype.kind not in 'biuf':
+            raise TypeError('Some values of the dictionaries are not numbers.')
+        leaves = _dict_paths(structure)
+        cols = [paths.setdefault(path, len(paths)) for path in leaves]
+        sums.append((cols, values.sum(axis=0)))
+        leaves_set = set(leaves)
+        for path in _dict_paths(structure, empty=True):
+            nodes.setdefault((path, path not in leaves_set))
+
+    total = np.zeros(len(paths))
+    for cols, values_sum in sums:
+        total[cols] += values_sum
+    averages = dict(zip(paths, (total / len(args)).tolist()))
+    return _unflatten_dict([(path, {} if is_empty else averages[path])
+                            for path, is_empty in nodes])
+
+
+class BiDict(abc.MutableMapping):
+    """
+    Bidirectional dictionary, with lookups in both directions in constant time.
+
+    The dictionary keeps its inverse, as computed by `idict`, up to date when items
+    are set or deleted, so it is never inverted again. The inverse is available
+    with the `inverse` attribute, a read-only mapping from the values to the keys.
+
+    By default, the values must be unique, like the keys. With ``multi=True``,
+    several keys can have the same value, and the inverse gives the list of the keys
+    of a value.
+
+    For large dictionaries with dense integer keys, i.e. ``0`` to ``n - 1`` such as
+    ids, `from_array` creates a compact dictionary, backed by a numpy array of values
+    and a pandas index for the inverse, instead of two dictionaries of Python objects.
+    Compact dictionaries are meant to be read: the first modification converts
+    them to dictionaries.
+
+    Examples
+    --------
+    >>> labels = BiDict({1: 'cat', 2: 'dog'})
+    >>> labels.inverse['dog']
+    2
+    >>> labels[3] = 'bird'
+    >>> del labels[1]
+    >>> dict(labels.inverse)
+    {'dog': 2, 'bird': 3}
+    >>> labels = BiDict({1: 'cat', 2: 'dog', 3: 'cat'}, multi=True)
+    >>> labels.inverse['cat']
+    [1, 3]
+    >>> labels = BiDict.from_array(np.array(['cat', 'dog', 'bird']))
+    >>> labels[1], labels.inverse['bird']
+    ('dog', 2)
+    """
+
+    def __init__(self, data: Optional[Union[Dict, Iterable[Tuple[Hashable, Hashable]]]] = None,
+                 multi: bool = False):
+        """
+        Initialization of the dictionary.
+
+        Parameters
+        ----------
+        data : dict or iterable of tuple, default None
+            Items of the dictionary.
+        multi : bool, default False
+            If True, several keys can have the same value.
+
+        Raises
+        ------
+        TypeError
+            If the values are not hashable.
+        ValueError
+            If several keys have the same value and `multi` is False.
+        """
+        self.multi = multi
+        self._forward: Dict[Hashable, Hashable] = dict(data) if data is not None else {}
+        self._inverse: Dict[Hashable, Any] = {}
+        # Compact representation, with the values of the keys 0 to n - 1 in an array.
+        self._values: Optional[np.ndarray] = None
+        self._index: Optional[pd.Index] = None
+        self._order: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+        self._inverse_view = _BiDictInverse(self)
+        self._build_inverse()
+
+    def __getitem__(self, key: Hashable) -> Hashable:
+        """Getter of the class, value of the key."""
+        if self._values is None:
+            return self._forward[key]
+        if isinstance(key, (int, np.integer)) and 0 <= key < len(self._values):
+            # Python objects, as with the dictionaries and `_to_dicts`, not numpy scalars.
+            value = self._values[key]
+            return value.item() if isinstance(value, np.generic) else value
+        raise KeyError(key)
+
+    def __setitem__(self, key: Hashable, value: Hashable):
+        """
+        Setter of the class, set the value of the key in both directions.
+
+        Raises
+        ------
+        ValueError
+            If the value is already the value of another key and `multi` is False.
+        """
+        self._to_dicts()
+        if not self.multi and value in self._inverse and self._inverse[value] != key:
+            raise ValueError(f'Value {value!r} is already the value of '
+                             f'key {self._inverse[value]!r}.')
+        if key in self._forward:
+            self._discard_inverse(key, self._forward[key])
+        self._forward[key] = value
+        if self.multi:
+            self._inverse.setdefault(value, {})[key] = None
+        else:
+            self._inverse[value] = key
+
+    def __delitem__(self, key: Hashable):
+        """Delete the key in both directions."""
+        self._to_dicts()
+        self._discard_inverse(key, self._forward.pop(key))
+
+    def __iter__(self):
+        """Iterator of the class, over the keys."""
+        if self._values is None:
+            return iter(self._forward)
+        return iter(range(len(self._values)))
+
+    def __len__(self):
+        """Number of keys."""
+        return len(self._forward) if self._values is None else len(self._values)
+
+    def __repr__(self):
+        """Representation of the dictionary."""
+        multi = ', multi=True' if self.multi else ''
+        return f'{self.__class__.__name__}({dict(self)!r}{multi})'
+
+    def _build_inverse(self) -> None:
+        """Build the inverse of the dictionary from the keys and values."""
+        try:
+            if self.multi:
+                self._inverse = {}
+                for key, value in self._forward.items():
+                    self._inverse.setdefault(value, {})[key] = None
+            else:
+                self._inverse = {value: key for key, value in self._forward.items()}
+        except TypeError as e:
+            raise TypeError('Values of the dictionary are not hashable.') from e
+        if len(self._inverse) < len(self._forward) and not self.multi:
+            raise ValueError('Same values for multiple keys, '
+                             'use `multi=True` to keep all the keys.')
+
+    def _discard_inverse(self, key: Hashable, value: Hashable) -> None:
+        """Remove the key from the inverse of the value."""
+        if self.multi:
+            keys = self._inverse[value]
+            del keys[key]
+            if not keys:
+                del self._inverse[value]
+        else:
+            del self._inverse[value]
+
+    def _get_keys(self, value: Hashable) -> Any:
+        """Key of the value, or list of keys with `multi`."""
+        if self._values is None:
+            return list(self._inverse[value]) if self.multi else self._inverse[value]
+        loc = self._index.get_loc(value)
+        if self.multi:
+            return self._order[self._starts[loc]:self._starts[loc + 1]].tolist()
+        return loc
+
+    def _to_dicts(self) -> None:
+        """Convert a compact dictionary to dictionaries, to be modified."""
+        if self._values is None:
+            return
+        self._forward = dict(enumerate(self._values.tolist()))
+        self._values, self._index, self._order, self._starts = None, None, None, None
+        self._build_inverse()
+
+    @classmethod
+    def from_array(cls, values: Union[np.ndarray, pd.Series, Sequence],
+                   multi: bool = False) -> 'BiDict':
+        """
+        Create a compact dictionary with the keys ``0`` to ``n - 1`` and the given values.
+
+        The values are kept in a numpy array, and their inverse in a pandas index,
+        which is built with a single vectorized pass and uses much less memory than
+        two dictionaries. With `multi`, the keys of each value are grouped by sorting.
+
+        Parameters
+        ----------
+        values : np.ndarray, pd.Series or sequence
+            Value of each key, the key being the position.
+        multi : bool, default False
+            If True, several keys can have the same value.
+
+        Returns
+        -------
+        BiDict
+            Compact dictionary.
+
+        Raises
+        ------
+        ValueError
+            If several keys have the same value and `multi` is False.
+        """
+        bidict = cls(multi=multi)
+        bidict._values = np.asarray(values)
+        if multi:
+            codes, uniques = pd.factorize(bidict._values)
+            bidict._order = np.argsort(codes, kind='stable')
+            bidict._starts = np.searchsorted(codes[bidict._order], np.arange(len(uniques) + 1))
+            bidict._index = pd.Index(uniques)
+        else:
+            bidict._index = pd.Index(bidict._values)
+            if not bidict._index.is_unique:
+                raise ValueError('Same values for multiple keys, '
+                                 'use `multi=True` to keep all the keys.')
+        return bidict
 
+    @property
+    def inverse(self) -> Mapping:
+        """Read-only mapping from the values to the keys, or to the lists of keys."""
+        return self._inverse_view
 
-def cast_to_category_pd(df: pd.DataFrame, deep: bool = True) -> pd.DataFrame:
+    @property
+    def is_compact(self) -> bool:
+        """True if the dictionary is backed by an array, see `from_array`."""
+        return self._values is not None
+
+
+class _BiDictInverse(abc.Mapping):
+    """Read-only view of the inverse of a `BiDict`."""
+
+    def __init__(self, bidict: BiDict):
+        """Initialization of the view on the dictionary."""
+        self._bidict = bidict
+
+    def __getitem__(self, value: Hashable) -> Any:
+        """Getter of the class, key of the value, or list of keys."""
+        return self._bidict._get_keys(value)
+
+    def __iter__(self):
+        """Iterator of the class, over the values."""
+        if self._bidict._index is None:
+            return iter(self._bidict._inverse)
+        return iter(self._bidict._index)
+
+    def __len__(self):
+        """Number of distinct values."""
+        if self._bidict._index is None:
+            return len(self._bidict._inverse)
+        return len(self._bidict._index)
+
+
+def cast_to_category_pd(df: pd.DataFrame, deep: bool = True,
+                        inplace: bool = False) -> pd.DataFrame:
     """
     Automatically converts columns of pandas DataFrame that are worth stored as ``category`` dtype.
 
     To be casted a column must not be numerical, must be hashable and must have less than 50%
     of unique values.
 
+    If `inplace`, the DataFrame is not copied. The columns are converted one by one
+    and each original column is released as soon as it is replaced by its categorical
+    version. The memory overhead is then bounded by the size of a single column,
+    instead of a full copy of the DataFrame.
+
     Parameters
     ----------
     df : pd.DataFrame
         DataFrame with the columns to cast.
     deep : bool, default True
         Whether or not to perform a deep copy of the original DataFrame.
+        Ignored if `inplace` is True.
+    inplace : bool, default False
+        If True, convert the columns of the given DataFrame without copying it.
 
     Returns
     -------
     pd.DataFrame
-        Optimized copy of the input DataFrame.
+        Optimized copy of the input DataFrame, or the input DataFrame itself if `inplace`.
 
     Examples
     --------
@@ -95,14 +445,39 @@ def cast_to_category_pd(df: pd.DataFrame, deep: bool = True) -> pd.DataFrame:
     country  category
     dtype: object
     """
-    return (df.copy(deep=deep)
-            .astype({col: 'category' for col in df.columns
-                     if (df[col].dtype == 'object'
-                         and is_hashable(df[col].iloc[0])
-                         and df[col].nunique() / df[col].shape[0] < 0.5)
-                     }
-                    )
-            )
+    cols_to_cast = [col for col in df.columns if _is_category_candidate(df[col])]
+    if inplace:
+        for col in cols_to_cast:
+            # Replacing the column drops the last reference to the original values.
+            df[col] = df[col].astype('category')
+        return df
+    return df.copy(deep=deep).astype({col: 'category' for col in cols_to_cast})
+
+
+def _check_normalization(method: str, kwargs: Dict[str, Any]):
+    """
+    Raise an error if a method of normalization or its arguments are unknown.
+
+    Parameters
+    ----------
+    method : str
+        Method of normalization.
+    kwargs : dict
+        Keyword arguments of the method.
+
+    Raises
+    ------
+    ValueError
+        If the method of normalization is unknown.
+    TypeError
+        If a keyword argument is unknown for the method.
+    """
+    if method not in _NORMALIZATION_KWARGS:
+        raise ValueError(f'Unknown normalization {method!r}, use one of '
+                         f'{list(_NORMALIZATION_KWARGS)} or a scaler of sklearn.')
+    unknown = set(kwargs).difference(_NORMALIZATION_KWARGS[method])
+    if unknown:
+        raise TypeError(f'Unknown arguments for the {method} normalization: {sorted(unknown)}.')
 
 
 def _check_sklearn_support(caller_name: str):
@@ -129,36 +504,91 @@ def _check_sklearn_support(caller_name: str):
             '`pip install scikit-learn`') from e
 
 
-def concat_with_categories(df_left: pd.DataFrame, df_right: pd.DataFrame,
-                           **kwargs) -> pd.DataFrame:
+def _check_sliding_window(sequence: Sequence, window_size: int, step: int):
+    """
+    Check the arguments of the sliding window functions.
+
+    Parameters
+    ----------
+    sequence : Sequence
+        Sequence to apply the sliding window on. If it has no length,
+        its length is not checked.
+    window_size : int
+        Size of the window to apply on the sequence.
+    step : int
+        Step for each sliding window.
+
+    Raises
+    ------
+    TypeError
+        If the sequence is not iterable or if the window size or step are not integers.
+    ValueError
+        If the window size or step are not valid for the sequence.
+    """
+    # Check for types.
+    try:
+        __ = iter(sequence)
+    except TypeError as e:
+        raise TypeError('Sequence must be iterable.') from e
+
+    if not isinstance(step, int):
+        raise TypeError('Step must be an integer.')
+    if not isinstance(window_size, int):
+        raise TypeError('Window size must be an integer.')
+    # Check for values.
+    if window_size < step or window_size <= 0:
+        raise ValueError('Window_size must be larger or equal '
+                         'than step and higher than 0.')
+    if step <= 0:
+        raise ValueError('Step must be higher than 0.')
+    # The length of iterators is only known once consumed.
+    if isinstance(sequence, abc.Sized) and len(sequence) < window_size:
+        raise ValueError('Length of sequence must be larger '
+                         'or equal than window_size.')
+
+
+def concat_with_categories(*dfs: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                           sort_categories: bool = True, **kwargs) -> pd.DataFrame:
     """
     Concatenation of Pandas DataFrame having categorical columns.
 
-    With the `concat` function from Pandas, when merging two DataFrames
-    having categorical columns, categories not present in both DataFrames
+    With the `concat` function from Pandas, when merging DataFrames
+    having categorical columns, categories not present in all DataFrames
     and with the same code are lost. Columns are cast to `object`,
     which takes more memory.
 
-    In this function, a union of categorical values from both DataFrames
-    is done and both DataFrames are recategorized with the complete list of
-    categorical values before the concatenation. This way, the category
-    field is preserved.
+    In this function, a union of categorical values from all DataFrames
+    is done once and each DataFrame is recategorized a single time with the
+    complete list of categorical values before a single concatenation.
+    This way, the category field is preserved.
+
+    The recategorization only remaps the integer codes of the categorical columns,
+    the values are never hashed again. Non-categorical columns are not copied
+    before the concatenation.
+
+    The DataFrames can be given as positional arguments or as a single iterable.
 
     Original DataFrame are copied, hence preserved.
 
     Parameters
     ----------
-    df_left : pd.DataFrame
-        Left DataFrame to merge.
-    df_right : pd.DataFrame
-        Right DataFrame to merge.
+    *dfs : pd.DataFrame or iterable of pd.DataFrame
+        DataFrames to concatenate, as positional arguments or as a single iterable.
+    sort_categories : bool, default True
+        If True, sort the union of the categories. Otherwise, the categories are kept
+        in their order of appearance, so the codes of the first DataFrame are preserved.
     **kwargs
         Additional keyword arguments to be passed to the `pd.concat` function.
 
     Returns
     -------
     pd.DataFrame
-        Concatenation of both DataFrames.
+        Concatenation of the DataFrames.
+
+    Raises
+    ------
+    ValueError
+        If no DataFrame is given.
 
     Examples
     --------
@@ -216,156 +646,912 @@ def concat_with_categories(df_left: pd.DataFrame, df_right: pd.DataFrame,
     color      category
     country    category
     dtype: object
+
+    Any number of DataFrames can be concatenated, also given as an iterable:
+
+    >>> res_many = concat_with_categories([df_left, df_right, df_left], ignore_index=True)
+    >>> res_many.shape
+    (6, 3)
     """
-    assert sorted(df_left.columns.values) == sorted(df_right.columns.values), (
-        f'DataFrames must have identical columns '
-        f'({df_left.columns.values} != {df_right.columns.values}).')
+    frames = (list(dfs[0]) if len(dfs) == 1 and not isinstance(dfs[0], pd.DataFrame)
+              else list(dfs))
+    if not frames:
+        raise ValueError('No DataFrame to concatenate.')
 
-    df_a = df_left.copy()
-    df_b = df_right.copy()
+    df_first = frames[0]
+    for df in frames[1:]:
+        assert sorted(df_first.columns.values) == sorted(df.columns.values), (
+            f'DataFrames must have identical columns '
+            f'({df_first.columns.values} != {df.columns.values}).')
 
-    for col in df_a.columns:
-        # Process only the categorical columns.
-        if pd.api.types.is_categorical_dtype(df_a[col].dtype):
-            # Get all possible values for the categories.
-            cats = pd.api.types.union_categoricals([df_a[col], df_b[col]],
-                                                   sort_categories=True)
-            # Set all the possibles categories.
-            df_a[col] = pd.Categorical(df_a[col], categories=cats.categories)
-            df_b[col] = pd.Categorical(df_b[col], categories=cats.categories)
-    return pd.concat([df_a, df_b], **kwargs)
+    # Process only the categorical columns.
+    # Get all possible values for the categories, over all the DataFrames at once.
+    cat_types = {col: _union_categories([df[col] for df in frames],
+                                        sort_categories=sort_categories)
+                 for col in df_first.columns
+                 if pd.api.types.is_categorical_dtype(df_first[col].dtype)}
+    # Set all the possibles categories, each DataFrame is recoded a single time.
+    # Only the categorical columns are replaced, the other ones are not copied.
+    recoded_frames = []
+    for df in frames:
+        df_recoded = df.copy(deep=False)
+        for col, cat_type in cat_types.items():
+            if df[col].dtype != cat_type:
+                df_recoded[col] = recode_categorical(df[col].values, cat_type)
+        recoded_frames.append(df_recoded)
+    return pd.concat(recoded_frames, **kwargs)
 
 
-def get_peaks(s: pd.Series, distance_scale: float = 0.04):
+def _current_rss() -> int:
     """
-    Get the peaks of a time series having datetime as index.
+    Get the current resident set size (RSS) of the process, in bytes.
 
-    Only the peaks having a height higher than 0.75 quantile are returned
-    and a distance between two peaks at least ``df.shape[0]*distance_scale``.
+    Read from ``/proc`` on Linux. On other systems, the peak RSS of the process
+    is returned, or 0 if not available.
+
+    Returns
+    -------
+    int
+        Resident set size of the process, in bytes.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, AttributeError):
+        return _max_rss(children=False)
 
-    Return the dates and the corresponding value of the peaks.
+
+def _dict_paths(structure: Tuple, prefix: Tuple = (), empty: bool = False) -> List[Tuple]:
+    """
+    Get the key paths of the leaves of a nested dictionary from its structure.
 
     Parameters
     ----------
-    s : pd.Series
-        Series to get the peaks from, with datetime as index.
-    distance_scale : str, default 0.04
-        Scaling for the minimal distances between two peaks.
-        Multiplication of the length of the DataFrame
-        with the `distance_scale` value.
+    structure : tuple
+        Structure of the dictionary, see `_flatten_dict`.
+    prefix : tuple, default ()
+        Path of the dictionary.
+    empty : bool, default False
+        If True, also get the paths of the empty dictionaries, which have no leaves.
 
     Returns
     -------
-    dates : np.ndarray
-        Dates when the peaks occur.
-    heights : np.ndarray
-        Heights of the peaks at the corresponding dates.
+    list of tuple
+        Path of the keys of each leaf, in the order of the values of `_flatten_dict`.
     """
-    assert isinstance(s.index, pd.DatetimeIndex), (
-        'Serie must have a datetime index.')
-
-    peaks = signal.find_peaks(s.values,
-                              height=s.quantile(0.75),
-                              distance=math.ceil(s.shape[0] * distance_scale))
-    peaks_dates = s.reset_index().iloc[:, 0][peaks[0]]
-    return peaks_dates.values, peaks[1]['peak_heights']
+    paths = []
+    for key, child in zip(*structure):
+        if child is None or (empty and not child[0]):
+            paths.append(prefix + (key,))
+        else:
+            paths.extend(_dict_paths(child, prefix + (key,), empty))
+    return paths
 
 
-def idict(d: Dict[Any, Hashable]) -> Dict[Hashable, Any]:
+class DictAverager:
     """
-    Invert a dictionary.
+    Accumulator to average dictionaries with numerical values.
 
-    Keys will be become values and values will become keys.
+    Streaming version of `avg_dicts`: the dictionaries are added one at a time using
+    `update`, or by lists using `update_many`, and do not need to be kept in memory.
+    Only the statistics of each key, and a small buffer of dictionaries, are stored,
+    so the memory is ``O(keys)``.
 
-    Parameters
-    ----------
-    d : dict of any to hashable
-        Dictionary to invert.
+    As in `avg_dicts`, if a key is not present in a dictionary, its value is 0.
+    The dictionaries can be weighted, e.g. by the number of samples of a fold.
 
-    Returns
-    -------
-    dict of hashable to any
-        Inverted dictionary.
+    For each key, the following statistics are available:
 
-    Raises
-    ------
-    TypeError
-        If original values are not Hashable.
+    * `result`: the (weighted) mean of the values,
+    * `var`: the (weighted) variance of the values,
+    * `count`: the number of dictionaries having the key.
+
+    The variance is updated with the algorithm of Chan et al., which is numerically
+    stable, and the lists of dictionaries given to `update_many` are averaged
+    with array operations.
 
     Examples
     --------
-    >>> idict({1: 4, 2: 5})
-    {4: 1, 5: 2}
-    >>> idict({1: 4, 2: 4, 3: 6})
-    {4: 2, 6: 3}
+    >>> averager = DictAverager()
+    >>> averager.update({'accuracy': 0.8, 'loss': 0.3})
+    >>> averager.update({'accuracy': 0.9, 'loss': 0.1})
+    >>> averager.update({'accuracy': 0.7}, weight=2)
+    >>> averager.result()
+    {'accuracy': 0.775, 'loss': 0.1}
+    >>> averager.count()
+    {'accuracy': 3, 'loss': 2}
     """
-    try:
-        s = set(d.values())
 
-        if len(s) < len(d.values()):
-            LOGGER.warning('[DATA LOSS] Same values for multiple keys, '
-                           'inverted dict will not contain all keys')
-    except TypeError as e:
-        raise TypeError(f'TypeError: values of dict {d} are not hashable.') from e
+    def __init__(self, buffer_size: int = 1024):
+        """
+        Initialization of the averager, without any dictionary.
 
-    return {v: k for k, v in d.items()}
+        Parameters
+        ----------
+        buffer_size : int, default 1024
+            Number of dictionaries given to `update` that are kept before being
+            added to the statistics, all at once.
+        """
+        self.buffer_size = buffer_size
+        self._buffer: List[Dict[Hashable, Any]] = []
+        self._buffer_weights: List[float] = []
+        self._total_weight = 0.
+        self._keys: Dict[Hashable, int] = {}
+        # Sum of the weights, sum of the weighted values, sum of the weighted squared
+        # deviations from the mean, and number of the values of each key.
+        self._weights = np.empty(0)
+        self._sums = np.empty(0)
+        self._m2 = np.empty(0)
+        self._counts = np.empty(0, dtype=np.int64)
 
+    def __len__(self):
+        """Number of keys seen."""
+        self._flush()
+        return len(self._keys)
 
-def kwargs_2_list(**kwargs) -> Dict[str, Sequence]:
+    def __repr__(self):
+        """Representation of the averager."""
+        return f'{self.__class__.__name__}(keys={len(self)}, total_weight={self.total_weight})'
+
+    @property
+    def total_weight(self) -> float:
+        """Sum of the weights of the dictionaries."""
+        self._flush()
+        return self._total_weight
+
+    def _flush(self) -> None:
+        """Add the dictionaries of the buffer to the statistics."""
+        if self._buffer:
+            dicts, weights = self._buffer, self._buffer_weights
+            self._buffer, self._buffer_weights = [], []
+            self.update_many(dicts, weights)
+
+    def count(self) -> Dict[Hashable, int]:
+        """
+        Get the number of dictionaries having each key.
+
+        Returns
+        -------
+        dict
+            Dictionary with the number of values of each key.
+        """
+        self._flush()
+        return dict(zip(self._keys, self._counts.tolist()))
+
+    def result(self) -> Dict[Hashable, float]:
+        """
+        Get the average of the dictionaries.
+
+        Returns
+        -------
+        dict
+            Dictionary with the (weighted) average of each key.
+        """
+        self._flush()
+        return dict(zip(self._keys, (self._sums / self._total_weight).tolist()))
+
+    def update(self, d: Dict[Hashable, Any], weight: float = 1.) -> None:
+        """
+        Add a dictionary to the average.
+
+        The dictionaries are added to the statistics by groups of `buffer_size`,
+        with `update_many`.
+
+        Parameters
+        ----------
+        d : dict
+            Dictionary with numerical values.
+        weight : float, default 1
+            Weight of the dictionary.
+
+        Raises
+        ------
+        TypeError
+            If a value is not a number, when the buffer is added to the statistics.
+        """
+        self._buffer.append(d)
+        self._buffer_weights.append(weight)
+        if len(self._buffer) >= self.buffer_size:
+            self._flush()
+
+    def update_many(self, dicts: Sequence[Dict[Hashable, Any]],
+                    weights: Optional[Sequence[float]] = None) -> None:
+        """
+        Add several dictionaries to the average at once.
+
+        The values are put in a single array, with a row per dictionary and a column
+        per key, and the statistics of the keys are computed with array operations.
+
+        Parameters
+        ----------
+        dicts : sequence of dict
+            Dictionaries with numerical values.
+        weights : sequence of float, default None
+            Weight of each dictionary. If not provided, all weights are 1.
+
+        Raises
+        ------
+        TypeError
+            If a value is not a number.
+        ValueError
+            If the number of weights is not the number of dictionaries.
+        """
+        dicts = list(dicts)
+        weights = np.ones(len(dicts)) if weights is None else np.asarray(weights, dtype=float)
+        if len(weights) != len(dicts):
+            raise ValueError('There must be one weight per dictionary.')
+        try:
+            values = np.asarray([value for d in dicts for value in d.values()])
+        except ValueError as e:
+            raise TypeError('Some values of the dictionaries are not numbers.') from e
+        if values.dtype.kind not in 'biuf':
+            raise TypeError('Some values of the dictionaries are not numbers.')
+
+        for d in dicts:
+            for key in d:
+                self._keys.setdefault(key, len(self._keys))
+        new_keys = len(self._keys) - len(self._sums)
+        if new_keys:
+            self._weights = np.append(self._weights, np.zeros(new_keys))
+            self._sums = np.append(self._sums, np.zeros(new_keys))
+            self._m2 = np.append(self._m2, np.zeros(new_keys))
+            self._counts = np.append(self._counts, np.zeros(new_keys, dtype=np.int64))
+        self._total_weight += weights.sum()
+        if not values.size:
+            return
+
+        # Weights and values of each key (column) in each dictionary (row).
+        rows = np.repeat(np.arange(len(dicts)), [len(d) for d in dicts])
+        cols = np.fromiter((self._keys[key] for d in dicts for key in d),
+                           dtype=np.intp, count=len(rows))
+        keys, cols = np.unique(cols, return_inverse=True)
+        weights_batch = np.zeros((len(dicts), len(keys)))
+        weights_batch[rows, cols] = weights[rows]
+        values_batch = np.zeros((len(dicts), len(keys)))
+        values_batch[rows, cols] = values
+
+        weight_b = weights_batch.sum(axis=0)
+        sum_b = (weights_batch * values_batch).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_b = np.where(weight_b > 0, sum_b / weight_b, 0.)
+            m2_b = (weights_batch * (values_batch - mean_b) ** 2).sum(axis=0)
+            # Combine with the previous statistics of the keys.
+            weight_a = self._weights[keys]
+            mean_a = np.where(weight_a > 0, self._sums[keys] / weight_a, 0.)
+            weight = weight_a + weight_b
+            self._m2[keys] += m2_b + np.where(
+                weight > 0, (mean_b - mean_a) ** 2 * weight_a * weight_b / weight, 0.)
+        self._weights[keys] = weight
+        self._sums[keys] += sum_b
+        self._counts[keys] += np.bincount(cols, minlength=len(keys))
+
+    def var(self) -> Dict[Hashable, float]:
+        """
+        Get the variance of the values of each key.
+
+        As for the average, missing values are 0.
+
+        Returns
+        -------
+        dict
+            Dictionary with the (weighted) population variance of each key.
+        """
+        self._flush()
+        # Add the missing values, at 0, to the squared deviations of each key.
+        means = self._sums / np.where(self._weights > 0, self._weights, 1.)
+        m2 = (self._m2 + means ** 2 * self._weights * (self._total_weight - self._weights)
+              / self._total_weight)
+        return dict(zip(self._keys, (m2 / self._total_weight).tolist()))
+
+
+class DtypePlan:
     """
-    Convert all single values from keyword arguments into lists.
+    Plan of the types to apply on the chunks of a DataFrame.
 
-    For each argument provided, if the type is not a sequence,
-    convert the single value into a list.
-    Strings are not considered as a sequence in this scenario.
+    The plan is fitted once, on a sample or on the first chunk of the data, and is then
+    applied on every chunk. This gives consistent types, and especially consistent categories,
+    without analysing each chunk again.
 
-    Parameters
-    ----------
-    **kwargs
-        Parameters passed to the function.
+    The plan contains:
 
-    Returns
-    -------
-    dict
-        Dictionary with the single values put into a list.
+    * the downcast target of each column (see `optimize_dtypes_pd`),
+    * the categories of the categorical columns,
+    * the columns containing dates.
 
-    Raises
-    ------
-    TypeError
-        If a non-keyword argument is passed to the function.
+    Categories are append-only: values not seen during the fit are added at the end
+    of the categories of the chunk when applying the plan, so the codes of the known values
+    never change. The categories of the plan are not modified. If an integer column of a chunk
+    does not fit in its downcast target, the target is widened. If a float column of a chunk
+    holds values that its integer or `float32` target cannot store exactly, e.g. decimals
+    in a column fitted on whole numbers, the target is widened to the float type of the chunk.
+    Integer and boolean columns of a chunk having missing values are cast to the nullable
+    types of pandas.
+
+    The plan can be serialized using `to_dict` and restored using `from_dict`.
 
     Examples
     --------
-    >>> kwargs_2_list(name='John Doe', age=42, children=('Jane Doe', 14))
-    {'name': ['John Doe'], 'age': [42], 'children': ('Jane Doe', 14)}
-    >>> kwargs_2_list(countries=['Swiss', 'Spain'])
-    {'countries': ['Swiss', 'Spain']}
+    >>> import pandas as pd
+    >>> df_first = pd.DataFrame({'age': [24, 20, 25, 23, 28],
+    ...                          'country': ['China', 'China', 'Switzerland', 'China', 'China'],
+    ...                          'date': pd.date_range('2019-06-20', periods=5).astype(str)})
+    >>> plan = DtypePlan().fit(df_first)
+    >>> plan.to_dict()
+    {'types': {'age': 'int8', 'country': 'category'},
+     'categories': {'country': ['China', 'Switzerland']},
+     'dates': ['date']}
+    >>> df_next = pd.DataFrame({'age': [31, 22],
+    ...                         'country': ['France', 'China'],
+    ...                         'date': ['2019-06-24', '2019-06-25']})
+    >>> df_next_res = plan.apply(df_next)
+    >>> df_next_res.dtypes
+    age                  int8
+    country          category
+    date       datetime64[ns]
+    dtype: object
+    >>> df_next_res['country'].cat.categories.tolist()
+    ['China', 'Switzerland', 'France']
     """
-    for k, v in kwargs.items():
-        kwargs[k] = value_2_list(v)
-    return kwargs
 
+    def __init__(self, types: Optional[Dict[Hashable, str]] = None,
+                 categories: Optional[Dict[Hashable, List]] = None,
+                 dates: Optional[Sequence[Hashable]] = None):
+        """
+        Initialization of the plan.
 
-def log_df(df: pd.DataFrame, f: Callable[[pd.DataFrame], Any] = lambda x: x.shape,
-           msg: str = '') -> pd.DataFrame:
-    r"""
-    Log information on a DataFrame before returning it.
+        If any of the parameters is given, the plan is considered as fitted.
 
-    The given function is applied and the result is printed.
-    The original DataFrame is returned, unmodified.
+        Parameters
+        ----------
+        types : dict of str to str, default None
+            Target type of each column to cast.
+        categories : dict of str to list, default None
+            Categories of each categorical column.
+        dates : sequence of str, default None
+            Columns to convert to datetime.
+        """
+        self.types: Dict[Hashable, str] = dict(types or {})
+        self.categories: Dict[Hashable, List] = {col: list(cats)
+                                                 for col, cats in (categories or {}).items()}
+        self.dates: List[Hashable] = list(dates or [])
+        self.fitted = bool(types or categories or dates)
 
-    This allows to print debug information in method chaining.
+    def __repr__(self) -> str:
+        """Representation of the plan."""
+        return f'{self.__class__.__name__}({self.to_dict()})'
+
+    def fit(self, df: pd.DataFrame, categories: bool = True,
+            dates: Optional[Sequence[Hashable]] = None) -> 'DtypePlan':
+        """
+        Learn the types of the columns from a DataFrame.
+
+        Object columns containing only dates are detected automatically.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Sample or first chunk of the data.
+        categories : bool, default True
+            If True, cast the object columns worth it to ``category``.
+        dates : sequence of str, default None
+            Columns to convert to datetime, in addition to the detected ones.
+
+        Returns
+        -------
+        DtypePlan
+            The fitted plan itself.
+        """
+        self.dates = [col for col in df.columns
+                      if (dates is not None and col in dates) or _is_date_column(df[col])]
+        self.types = {}
+        self.categories = {}
+        for col in df.columns.drop(self.dates):
+            new_type = _optimal_dtype(df[col], categories=categories)
+            if new_type is None:
+                continue
+            self.types[col] = str(new_type)
+            if new_type == 'category':
+                self.categories[col] = df[col].astype('category').cat.categories.tolist()
+        self.fitted = True
+        return self
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the columns of a DataFrame following the plan.
+
+        Columns of the plan that are not in the DataFrame are ignored.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame to cast.
+
+        Returns
+        -------
+        pd.DataFrame
+            Copy of the DataFrame with the types of the plan.
+        """
+        new_types: Dict[Hashable, Any] = {}
+        for col, new_type in self.types.items():
+            if col not in df.columns:
+                continue
+            if new_type == 'category':
+                cats = self.categories[col]
+                # Append the unseen values, to keep the codes of the known ones.
+                unseen = pd.Index(df[col].dropna().unique()).difference(cats)
+                new_types[col] = pd.CategoricalDtype(cats + unseen.tolist())
+            else:
+                target = pd.api.types.pandas_dtype(new_type)
+                if (pd.api.types.is_float_dtype(df[col])
+                        and not pd.api.types.is_extension_array_dtype(df[col])
+                        and (pd.api.types.is_integer_dtype(target) or target == np.float32)):
+                    values = df[col].dropna().to_numpy()
+                    lossy = ((values % 1 != 0).any() if pd.api.types.is_integer_dtype(target)
+                             else (values.astype(np.float32) != values).any())
+                    if lossy:
+                        # The target was fitted on values it stores exactly, keep the floats.
+                        new_type = self.types[col] = str(df[col].dtype)
+                        target = df[col].dtype
+                if pd.api.types.is_integer_dtype(target) and df[col].notna().any():
+                    # Widen the target if the values of the chunk do not fit in it.
+                    info = np.iinfo(getattr(target, 'numpy_dtype', target))
+                    min_value, max_value = df[col].min(), df[col].max()
+                    if min_value < info.min or max_value > info.max:
+                        new_type = _smallest_int_dtype(
+                            min_value, max_value,
+                            nullable=pd.api.types.is_extension_array_dtype(target),
+                            unsigned=pd.api.types.is_unsigned_integer_dtype(target))
+                        if new_type is None:
+                            # Too large for any integer type, the column is left as is.
+                            continue
+                        new_type = self.types[col] = str(new_type)
+                        target = pd.api.types.pandas_dtype(new_type)
+                if df[col].hasnans and not pd.api.types.is_extension_array_dtype(target):
+                    # Missing values need the nullable types, for this chunk only.
+                    if pd.api.types.is_bool_dtype(target):
+                        new_type = 'boolean'
+                    elif pd.api.types.is_integer_dtype(target):
+                        info = np.iinfo(target)
+                        new_type = _smallest_int_dtype(
+                            info.min, info.max, nullable=True,
+                            unsigned=pd.api.types.is_unsigned_integer_dtype(target))
+                new_types[col] = new_type
+        df_res = df.astype(new_types)
+        for col in self.dates:
+            if col in df_res.columns:
+                df_res[col] = pd.to_datetime(df_res[col])
+        return df_res
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the plan into a dictionary.
+
+        Returns
+        -------
+        dict
+            Dictionary with the types, categories and dates of the plan.
+        """
+        return {'types': dict(self.types),
+                'categories': {col: list(cats) for col, cats in self.categories.items()},
+                'dates': list(self.dates)}
+
+    @classmethod
+    def from_dict(cls, plan: Dict[str, Any]) -> 'DtypePlan':
+        """
+        Create a plan from a dictionary generated with `to_dict`.
+
+        Parameters
+        ----------
+        plan : dict
+            Dictionary with the types, categories and dates of the plan.
+
+        Returns
+        -------
+        DtypePlan
+            The plan, fitted.
+        """
+        dtype_plan = cls(plan.get('types'), plan.get('categories'), plan.get('dates'))
+        dtype_plan.fitted = True
+        return dtype_plan
+
+
+def _find_peaks_columns(values: np.ndarray, heights: np.ndarray,
+                        distance: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Find the peaks of each column of a 2-D array.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        DataFrame to log.
-    f : Callable, default is the shape of the DataFrame
-        Function to apply on the DataFrame and to log.
+    values : np.ndarray
+        Array with the series as columns.
+    heights : np.ndarray
+        Minimal height of the peaks for each column.
+    distance : int
+        Minimal distance between two peaks.
 
     Returns
     -------
-    pd.DataFrame
+    list of tuple of np.ndarray
+        Positions and heights of the peaks of each column.
+    """
+    res = []
+    for i, height in enumerate(heights):
+        peaks, properties = signal.find_peaks(values[:, i], height=height)
+        kept = _select_peaks_by_distance(peaks, properties['peak_heights'], distance)
+        res.append((peaks[kept], properties['peak_heights'][kept]))
+    return res
+
+
+def _flatten_dict(d: Dict) -> Tuple[Tuple, List[Any]]:
+    """
+    Flatten a nested dictionary into its structure and the values of its leaves.
+
+    Parameters
+    ----------
+    d : dict
+        Nested dictionary.
+
+    Returns
+    -------
+    structure : tuple
+        Keys of the dictionary and structure of each of its values,
+        None if the value is not a dictionary. Dictionaries with the same
+        structure have the same keys, in the same order.
+    values : list
+        Values of the leaves, in the order of the keys.
+    """
+    values = list(d.values())
+    if not any(map(isinstance, values, repeat(dict))):
+        return (tuple(d), (None,) * len(values)), values
+
+    children: List[Optional[Tuple]] = []
+    values = []
+    for value in d.values():
+        if isinstance(value, dict):
+            child, child_values = _flatten_dict(value)
+            children.append(child)
+            values.extend(child_values)
+        else:
+            children.append(None)
+            values.append(value)
+    return (tuple(d), tuple(children)), values
+
+
+def get_peaks(s: pd.Series, distance_scale: float = 0.04):
+    """
+    Get the peaks of a time series having datetime as index.
+
+    Only the peaks having a height higher than 0.75 quantile are returned
+    and a distance between two peaks at least ``df.shape[0]*distance_scale``.
+    Among peaks of the same height closer than this distance, the first one is kept.
+
+    Return the dates and the corresponding value of the peaks.
+
+    Parameters
+    ----------
+    s : pd.Series
+        Series to get the peaks from, with datetime as index.
+    distance_scale : str, default 0.04
+        Scaling for the minimal distances between two peaks.
+        Multiplication of the length of the DataFrame
+        with the `distance_scale` value.
+
+    Returns
+    -------
+    dates : np.ndarray
+        Dates when the peaks occur.
+    heights : np.ndarray
+        Heights of the peaks at the corresponding dates.
+    """
+    assert isinstance(s.index, pd.DatetimeIndex), (
+        'Serie must have a datetime index.')
+
+    peaks, properties = signal.find_peaks(s.values, height=s.quantile(0.75))
+    kept = _select_peaks_by_distance(peaks, properties['peak_heights'],
+                                     math.ceil(s.shape[0] * distance_scale))
+    return s.index.values[peaks[kept]], properties['peak_heights'][kept]
+
+
+def get_peaks_memmap(values: np.ndarray, distance_scale: float = 0.04,
+                     block_size: int = 1_000_000, sample_size: int = 1_000_000,
+                     random_state: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the peaks of a large 1-D array, such as a `np.memmap`, without loading it in memory.
+
+    Out-of-core version of `get_peaks`. The array is read by blocks of `block_size` values.
+
+    The height threshold is the 0.75 quantile, estimated on a uniform random sample of
+    `sample_size` values instead of sorting the whole array. If the array is not larger
+    than the sample, the quantile is exact.
+
+    The peaks are then searched block by block, as in `PeakDetector`. Between two blocks,
+    only the last run of equal values and the peaks not confirmed yet are kept, with their
+    position and height, so the peaks near the edges of the blocks are the same as the ones
+    found on the whole array. The memory used is the block, the sample and these pending
+    peaks, not proportional to the size of the array nor to the distance between two peaks.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array to get the peaks from, usually a `np.memmap`.
+    distance_scale : str, default 0.04
+        Scaling for the minimal distances between two peaks.
+        Multiplication of the length of the array
+        with the `distance_scale` value.
+    block_size : int, default 1,000,000
+        Number of values to read at once.
+    sample_size : int, default 1,000,000
+        Number of values used to estimate the quantile.
+    random_state : int, default None
+        Seed of the sampling of the values used to estimate the quantile.
+
+    Returns
+    -------
+    positions : np.ndarray
+        Positions of the peaks in the array.
+    heights : np.ndarray
+        Heights of the peaks at the corresponding positions.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> np.save('/tmp/signal.npy', np.array([4, 5, 9, 3, 2, 1, 2, 1, 3, 4, 12, 9, 6, 3, 2, 4, 5]))
+    >>> values = np.load('/tmp/signal.npy', mmap_mode='r')
+    >>> get_peaks_memmap(values, block_size=5)
+    (array([ 2, 10]), array([ 9., 12.]))
+    """
+    n_values = len(values)
+    if n_values <= sample_size:
+        sample = np.asarray(values, dtype=np.float64)
+    else:
+        # Sorted positions to read the array sequentially.
+        positions = np.sort(np.random.default_rng(random_state)
+                            .choice(n_values, sample_size, replace=False))
+        sample = np.asarray(values[positions], dtype=np.float64)
+
+    height = np.nanquantile(sample, 0.75)
+    stream = _PeakStream(distance=max(1, math.ceil(n_values * distance_scale)))
+    peaks = [stream.update(np.asarray(values[start:start + block_size], dtype=np.float64), height)
+             for start in range(0, n_values, block_size)]
+    peaks.append(stream.flush())
+    return (np.concatenate([position for position, __ in peaks]),
+            np.concatenate([height for __, height in peaks]))
+
+
+def get_peaks_pd(df: pd.DataFrame, distance_scale: float = 0.04,
+                 nb_proc: Optional[int] = None) -> pd.DataFrame:
+    """
+    Get the peaks of all the columns of a DataFrame having datetime as index.
+
+    Vectorized version of `get_peaks` for multiple time series.
+    The 0.75 quantiles of all the columns are computed in a single pass and
+    the peaks of the columns are searched in parallel, by `nb_proc` processes.
+
+    Only the peaks having a height higher than the 0.75 quantile of their column are
+    returned and a distance between two peaks at least ``df.shape[0]*distance_scale``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame with the numerical series as columns and datetime as index.
+    distance_scale : str, default 0.04
+        Scaling for the minimal distances between two peaks.
+        Multiplication of the length of the DataFrame
+        with the `distance_scale` value.
+    nb_proc : Union[int, None], default None
+        Number of processor to use. If not provided,
+        uses `multiprocessing.cpu_count()` number of processes.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with one row per peak and the `column`, `date` and `height`
+        of the peak as columns.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'a': [4, 5, 9, 3, 2, 1, 2, 1, 3, 4, 12, 9, 6, 3, 2, 4, 5],
+    ...                    'b': [1, 1, 1, 1, 8, 1, 1, 1, 1, 1, 1, 1, 1, 1, 9, 1, 1]},
+    ...                   index=pd.date_range('2019-06-20', periods=17, freq='T'))
+    >>> get_peaks_pd(df, nb_proc=1)
+      column                date  height
+    0      a 2019-06-20 00:02:00     9.0
+    1      a 2019-06-20 00:10:00    12.0
+    2      b 2019-06-20 00:04:00     8.0
+    3      b 2019-06-20 00:14:00     9.0
+    """
+    assert isinstance(df.index, pd.DatetimeIndex), (
+        'DataFrame must have a datetime index.')
+
+    # Columns are contiguous in memory to be given to `signal.find_peaks` without copy.
+    values = np.asfortranarray(df.to_numpy(dtype=np.float64))
+    heights = np.nanquantile(values, 0.75, axis=0)
+    distance = math.ceil(df.shape[0] * distance_scale)
+
+    nb_proc = min(nb_proc or multiprocessing.cpu_count(), df.shape[1])
+    if nb_proc > 1:
+        chunks = np.array_split(np.arange(df.shape[1]), nb_proc)
+        with multiprocessing.Pool(processes=nb_proc) as pool:
+            # Results of pool.starmap is in the same order as given.
+            results = pool.starmap(_find_peaks_columns,
+                                   [(values[:, chunk], heights[chunk], distance)
+                                    for chunk in chunks])
+        peaks = [peak for result in results for peak in result]
+    else:
+        peaks = _find_peaks_columns(values, heights, distance)
+
+    positions = np.concatenate([position for position, __ in peaks] + [np.empty(0, dtype=int)])
+    return pd.DataFrame({'column': np.repeat(df.columns.values,
+                                             [len(position) for position, __ in peaks]),
+                         'date': df.index.values[positions],
+                         'height': np.concatenate([height for __, height in peaks]
+                                                  + [np.empty(0)])})
+
+
+def idict(d: Dict[Any, Hashable]) -> Dict[Hashable, Any]:
+    """
+    Invert a dictionary.
+
+    Keys will be become values and values will become keys.
+
+    Parameters
+    ----------
+    d : dict of any to hashable
+        Dictionary to invert.
+
+    Returns
+    -------
+    dict of hashable to any
+        Inverted dictionary.
+
+    Raises
+    ------
+    TypeError
+        If original values are not Hashable.
+
+    Examples
+    --------
+    >>> idict({1: 4, 2: 5})
+    {4: 1, 5: 2}
+    >>> idict({1: 4, 2: 4, 3: 6})
+    {4: 2, 6: 3}
+
+    To invert a dictionary several times, or to keep both directions up to date,
+    use `BiDict`.
+    """
+    try:
+        inverted = {v: k for k, v in d.items()}
+    except TypeError as e:
+        raise TypeError(f'TypeError: values of dict {d} are not hashable.') from e
+
+    # Collisions are detected from the size of the inverted dict, without another copy.
+    if len(inverted) < len(d):
+        LOGGER.warning('[DATA LOSS] Same values for multiple keys, '
+                       'inverted dict will not contain all keys')
+    return inverted
+
+
+def _is_category_candidate(s: pd.Series) -> bool:
+    """
+    Check if a Series is worth being stored as ``category`` dtype.
+
+    The Series must be of `object` dtype, hashable and must have less than 50%
+    of unique values.
+
+    Parameters
+    ----------
+    s : pd.Series
+        Series to check.
+
+    Returns
+    -------
+    bool
+        True if the Series should be cast to ``category``.
+    """
+    return (s.dtype == 'object'
+            and is_hashable(s.iloc[0])
+            and s.nunique() / s.shape[0] < 0.5)
+
+
+def _is_date_column(s: pd.Series) -> bool:
+    """
+    Check if an object Series only contains dates.
+
+    The Series is considered as containing dates if it holds datetime objects,
+    or strings that are all parsable as dates and that are not numbers.
+
+    Parameters
+    ----------
+    s : pd.Series
+        Series to check.
+
+    Returns
+    -------
+    bool
+        True if the Series contains dates.
+    """
+    non_null = s.dropna()
+    if not pd.api.types.is_object_dtype(s) or non_null.empty:
+        return False
+    inferred_type = pd.api.types.infer_dtype(non_null, skipna=True)
+    if inferred_type in ('datetime', 'date'):
+        return True
+    if inferred_type != 'string' or pd.to_numeric(non_null, errors='coerce').notna().any():
+        return False
+    try:
+        pd.to_datetime(non_null)
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return True
+
+
+def kwargs_2_list(**kwargs) -> Dict[str, Sequence]:
+    """
+    Convert all single values from keyword arguments into lists.
+
+    For each argument provided, if the type is not a sequence,
+    convert the single value into a list.
+    Strings are not considered as a sequence in this scenario.
+
+    Parameters
+    ----------
+    **kwargs
+        Parameters passed to the function.
+
+    Returns
+    -------
+    dict
+        Dictionary with the single values put into a list.
+
+    Raises
+    ------
+    TypeError
+        If a non-keyword argument is passed to the function.
+
+    Examples
+    --------
+    >>> kwargs_2_list(name='John Doe', age=42, children=('Jane Doe', 14))
+    {'name': ['John Doe'], 'age': [42], 'children': ('Jane Doe', 14)}
+    >>> kwargs_2_list(countries=['Swiss', 'Spain'])
+    {'countries': ['Swiss', 'Spain']}
+    """
+    for k, v in kwargs.items():
+        kwargs[k] = value_2_list(v)
+    return kwargs
+
+
+def log_df(df: pd.DataFrame, f: Callable[[pd.DataFrame], Any] = lambda x: x.shape,
+           msg: str = '', step: Optional[str] = None) -> pd.DataFrame:
+    r"""
+    Log information on a DataFrame before returning it.
+
+    The given function is applied and the result is printed.
+    The original DataFrame is returned, unmodified.
+
+    This allows to print debug information in method chaining.
+
+    The function is only applied if the logger is enabled for the ``INFO`` level,
+    so disabled logs cost almost nothing in hot chains. To not block the chain
+    on the I/O of the handlers, see `start_async_logging`.
+
+    Inside a `PipelineProfiler` context, each call is also a checkpoint of the profiler.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to log.
+    f : Callable, default is the shape of the DataFrame
+        Function to apply on the DataFrame and to log.
+    msg : str, default ''
+        Message to log before the result of `f`.
+    step : str, default None
+        Name of the step ending at this call, for the profiler.
+        If not provided, `msg` is used.
+
+    Returns
+    -------
+    pd.DataFrame
         The DataFrame, unmodified.
 
     Examples
@@ -388,12 +1574,331 @@ def log_df(df: pd.DataFrame, f: Callable[[pd.DataFrame], Any] = lambda x: x.shap
     kHfxaURF8t  0.654381  0.353666 -0.830602  1.788581  2
     2019-11-04 13:31:34,758 [INFO   ] bff.fancy: New shape=(5, 5)
     """
-    LOGGER.info(f'{msg}{f(df)}')
-    return df
+    if LOGGER.isEnabledFor(logging.INFO):
+        LOGGER.info(f'{msg}{f(df)}')
+    profilers = getattr(_PROFILERS, 'stack', None)
+    if profilers:
+        profilers[-1].checkpoint(df, step or msg or None)
+    return df
+
+
+def map_windows(func: Callable, sequence: Sequence, window_size: int, step: int, *,
+                nb_proc: Optional[int] = None, use_threads: bool = False,
+                chunksize: Optional[int] = None) -> List[Any]:
+    """
+    Apply a function on each window of a sliding window, in parallel.
+
+    Parallel version of ``[func(window) for window in sliding_window(...)]``,
+    the windows and the results are the same, in the same order.
+
+    The windows are not copied to the workers: only ranges of window indices
+    are distributed, and each worker slices the windows from the sequence.
+    With processes, the sequence is inherited without copy by the processes on platforms
+    using `fork`, or else given once to each process when the pool starts.
+    With threads, the sequence is shared directly, this is faster if `func` releases
+    the GIL (e.g. numpy functions such as FFT on large windows).
+
+    Parameters
+    ----------
+    func : Callable
+        Function to apply on each window. With processes, it must be picklable,
+        i.e. defined at the top level of a module.
+    sequence : Sequence
+        Sequence to apply the sliding window on
+        (can be str, list, numpy.array, pd.DataFrame, etc.).
+        It must have a length and support slicing, see `sliding_window_iter` for iterators.
+    window_size : int
+        Size of the window to apply on the sequence.
+    step : int
+        Step for each sliding window.
+    nb_proc : Union[int, None], default None
+        Number of processes or threads to use. If not provided,
+        uses `multiprocessing.cpu_count()`.
+    use_threads : bool, default False
+        If True, use a pool of threads instead of processes.
+    chunksize : int, default None
+        Number of windows per task. If not provided,
+        each worker receives about four tasks.
+
+    Returns
+    -------
+    list
+        Results of `func` for each window, in the order of the windows.
+
+    Raises
+    ------
+    TypeError
+        If the sequence has no length or does not support slicing, e.g. a generator.
+
+    Examples
+    --------
+    >>> map_windows(np.max, np.array([1, 5, 2, 4, 3, 6, 0]), 3, 2, nb_proc=2)
+    [5, 4, 6, 6]
+    """
+    if not isinstance(sequence, abc.Sized) or not hasattr(sequence, '__getitem__'):
+        raise TypeError('Sequence must have a length and support slicing, '
+                        'use `sliding_window_iter` for iterators.')
+    _check_sliding_window(sequence, window_size, step)
+    nb_proc = nb_proc or multiprocessing.cpu_count()
+
+    nb_windows = (len(sequence) - window_size) // step + 1
+    chunksize = chunksize or max(1, math.ceil(nb_windows / (4 * nb_proc)))
+    ranges = [range(i, min(i + chunksize, nb_windows)) for i in range(0, nb_windows, chunksize)]
+    task = partial(_map_windows_range, func, window_size, step)
+    if nb_proc == 1:
+        results = [task(windows, sequence) for windows in ranges]
+    elif use_threads:
+        with multiprocessing.pool.ThreadPool(processes=nb_proc) as pool:
+            results = pool.map(partial(task, sequence=sequence), ranges)
+    else:
+        # Forked processes inherit the sequence, the other ones receive it when they start.
+        _map_windows_init(sequence)
+        try:
+            fork = multiprocessing.get_start_method() == 'fork'
+            with multiprocessing.Pool(processes=nb_proc,
+                                      initializer=None if fork else _map_windows_init,
+                                      initargs=() if fork else (sequence,)) as pool:
+                # Results of pool.map is in the same order as given.
+                results = pool.map(task, ranges)
+        finally:
+            # The sequence must not be kept alive by the main process.
+            _map_windows_init(None)
+    res = [result for chunk in results for result in chunk]
+
+    # The remainder, as in `sliding_window`.
+    mod = len(sequence) % window_size
+    if mod:
+        res.append(func(sequence[len(sequence) - (window_size - step) - mod:]))
+    return res
+
+
+def _map_windows_init(sequence: Sequence):
+    """Store the sequence of `map_windows` in the process."""
+    global _MAP_WINDOWS_SEQUENCE
+    _MAP_WINDOWS_SEQUENCE = sequence
+
+
+def _map_windows_range(func: Callable, window_size: int, step: int, windows: range,
+                       sequence: Optional[Sequence] = None) -> List[Any]:
+    """
+    Apply a function on a range of windows of a sequence.
+
+    Parameters
+    ----------
+    func : Callable
+        Function to apply on each window.
+    window_size : int
+        Size of the windows.
+    step : int
+        Step between two windows.
+    windows : range
+        Indices of the windows.
+    sequence : Sequence, default None
+        Sequence to slice the windows from. If not provided,
+        uses the sequence stored in the process by `_map_windows_init`.
+
+    Returns
+    -------
+    list
+        Results of `func` for each window.
+    """
+    if sequence is None:
+        sequence = _MAP_WINDOWS_SEQUENCE
+    return [func(sequence[i * step:i * step + window_size]) for i in windows]
+
+
+def _max_rss(children: bool = False) -> int:
+    """
+    Get the peak resident set size (RSS) of the process, or of its terminated children.
+
+    Parameters
+    ----------
+    children : bool, default False
+        If True, peak RSS of the largest terminated and waited child process.
+
+    Returns
+    -------
+    int
+        Peak resident set size, in bytes, or 0 if not available.
+    """
+    if resource is None:  # pragma: no cover
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Kilobytes on Linux, bytes on macOS.
+    return usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def mem_footprint(obj: Any, deep: bool = True,
+                  details: bool = False) -> Union[float, pd.DataFrame]:
+    """
+    Calculate the memory footprint of any object, counting shared memory only once.
+
+    Unlike `mem_usage_pd`, this function accepts containers (dict, list, tuple, set)
+    of DataFrames, Series, Index, arrays or any other objects, explored recursively.
+    The memory of the numpy buffers is counted once even if several objects
+    share it, for instance views of an array, or DataFrames and Series created
+    from the same blocks without copy. A view holds its whole buffer in memory,
+    so the size of the base array is counted.
+
+    If `details`, the footprint is given for each item of the object, i.e. the values
+    of a dict, the elements of a list, tuple or set, or the columns and index of a
+    DataFrame. Each item has:
+
+    * `total_mb`: memory reachable from the item,
+    * `unique_mb`: memory only reachable from the item, freed if the item is removed,
+    * `shared_mb`: memory also reachable from other items.
+
+    Parameters
+    ----------
+    obj : Any
+        Object to measure.
+    deep : bool, default True
+        If True, also measure the Python objects in the arrays of type ``object``,
+        each object being counted once.
+    details : bool, default False
+        If True, give the footprint of each item of the object.
+
+    Returns
+    -------
+    float or pd.DataFrame
+        Memory footprint of the object in megabytes, or DataFrame with the footprint
+        of each item in megabytes if `details`.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import pandas as pd
+    >>> df = pd.DataFrame(np.zeros((1_000_000, 2)), columns=['a', 'b'])
+    >>> cache = {'df': df, 'a': df['a'], 'copy': df['a'].copy(), 'view': df.iloc[:10]}
+    >>> mem_footprint(cache)
+    22.888997077941895
+    >>> mem_footprint(cache, details=True)
+           total_mb  unique_mb  shared_mb
+    df    15.259026   0.000000  15.259026
+    a     15.258915   0.000000  15.258915
+    copy   7.629520   7.629520   0.000000
+    view  15.259026   0.000126  15.258900
+    """
+    if not details:
+        buffers: Dict[Hashable, int] = {}
+        _mem_footprint_buffers(obj, buffers, deep, set())
+        return sum(buffers.values()) / 1024 ** 2
+
+    if isinstance(obj, pd.DataFrame):
+        items = [(col, obj[col].array) for col in obj.columns] + [('Index', obj.index)]
+    elif isinstance(obj, abc.Mapping):
+        items = list(obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(enumerate(obj))
+    else:
+        items = [(type(obj).__name__, obj)]
+
+    items_buffers = []
+    for _, item in items:
+        buffers = {}
+        _mem_footprint_buffers(item, buffers, deep, set())
+        items_buffers.append(buffers)
+    # Number of items reaching each buffer.
+    counts: Dict[Hashable, int] = {}
+    for buffers in items_buffers:
+        for key in buffers:
+            counts[key] = counts.get(key, 0) + 1
+
+    totals = [sum(buffers.values()) for buffers in items_buffers]
+    uniques = [sum(size for key, size in buffers.items() if counts[key] == 1)
+               for buffers in items_buffers]
+    return pd.DataFrame({'total_mb': totals, 'unique_mb': uniques},
+                        index=[name for name, _ in items]
+                        ).assign(shared_mb=lambda x: x['total_mb'] - x['unique_mb']) / 1024 ** 2
+
+
+def _mem_footprint_buffers(obj: Any, buffers: Dict[Hashable, int], deep: bool,
+                           seen: Set[int]) -> None:
+    """
+    Collect the memory of an object and of the objects it contains.
+
+    Numpy buffers are identified by their base array, so shared buffers have
+    the same key. Other objects are identified by their id.
+
+    Parameters
+    ----------
+    obj : Any
+        Object to measure.
+    buffers : dict of hashable to int
+        Sizes of the collected memory, in bytes, updated in place.
+    deep : bool
+        If True, also collect the Python objects in the arrays of type ``object``.
+    seen : set of int
+        Ids of the containers already explored, updated in place.
+    """
+    if id(obj) in seen:
+        return
+    if isinstance(obj, np.ndarray):
+        base = obj
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base.base is None:
+            buffers[id(base)] = base.nbytes
+        else:
+            # Memory owned by another object, e.g. bytes or a memory map.
+            try:
+                size = memoryview(base.base).nbytes
+            except TypeError:
+                size = base.nbytes
+            buffers[id(base.base)] = max(size, buffers.get(id(base.base), 0))
+        if deep and obj.dtype == object:
+            seen.add(id(obj))
+            for value in obj.flat:
+                _mem_footprint_buffers(value, buffers, deep, seen)
+    elif isinstance(obj, pd.DataFrame):
+        seen.add(id(obj))
+        _mem_footprint_buffers(obj.index, buffers, deep, seen)
+        _mem_footprint_buffers(obj.columns, buffers, deep, seen)
+        for col in obj.columns:
+            _mem_footprint_buffers(obj[col].array, buffers, deep, seen)
+    elif isinstance(obj, pd.Series):
+        seen.add(id(obj))
+        _mem_footprint_buffers(obj.index, buffers, deep, seen)
+        _mem_footprint_buffers(obj.array, buffers, deep, seen)
+    elif isinstance(obj, pd.MultiIndex):
+        seen.add(id(obj))
+        for array in [*obj.levels, *obj.codes]:
+            _mem_footprint_buffers(array, buffers, deep, seen)
+    elif isinstance(obj, pd.RangeIndex):
+        buffers[id(obj)] = obj.nbytes
+    elif isinstance(obj, pd.Index):
+        seen.add(id(obj))
+        _mem_footprint_buffers(obj.array, buffers, deep, seen)
+    elif isinstance(obj, pd.Categorical):
+        seen.add(id(obj))
+        _mem_footprint_buffers(obj.codes, buffers, deep, seen)
+        _mem_footprint_buffers(obj.categories, buffers, deep, seen)
+    elif isinstance(obj, pd.api.extensions.ExtensionArray):
+        # Arrays backed by numpy arrays: datetimes, timedeltas, strings, nullables.
+        arrays = [getattr(obj, attr) for attr in ['_ndarray', '_data', '_mask']
+                  if isinstance(getattr(obj, attr, None), np.ndarray)]
+        if arrays:
+            for array in arrays:
+                _mem_footprint_buffers(array, buffers, deep, seen)
+        else:
+            buffers[id(obj)] = obj.nbytes
+    else:
+        buffers[id(obj)] = sys.getsizeof(obj)
+        if isinstance(obj, abc.Mapping):
+            seen.add(id(obj))
+            for key, value in obj.items():
+                _mem_footprint_buffers(key, buffers, deep, seen)
+                _mem_footprint_buffers(value, buffers, deep, seen)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            seen.add(id(obj))
+            for value in obj:
+                _mem_footprint_buffers(value, buffers, deep, seen)
 
 
 def mem_usage_pd(pd_obj: Union[pd.DataFrame, pd.Series], index: bool = True, deep: bool = True,
-                 details: bool = True) -> Dict[str, Union[str, Set[Any]]]:
+                 details: bool = True, approx: bool = False, sample_size: int = 10_000,
+                 confidence: float = 0.95,
+                 random_state: Optional[int] = None) -> Dict[str, Union[str, Set[Any]]]:
     """
     Calculate the memory usage of a pandas object.
 
@@ -401,6 +1906,12 @@ def mem_usage_pd(pd_obj: Union[pd.DataFrame, pd.Series], index: bool = True, dee
     each column (DataFrames only). Key=column, value=(memory, type).
     Else returns a dictionary with the total memory usage. Key=`total`, value=memory.
 
+    Measuring deeply the memory of object columns interrogates every Python object,
+    which can be slower than the computation being measured on huge frames.
+    If `approx`, the memory of the objects is extrapolated from a random sample of rows
+    of each object column (and object index), and given with the bound of the confidence
+    interval, for instance ``'762.94 ± 0.42 MB'``. Other columns are always exact.
+
     Parameters
     ----------
     pd_obj : pd.DataFrame or pd.Series
@@ -412,6 +1923,15 @@ def mem_usage_pd(pd_obj: Union[pd.DataFrame, pd.Series], index: bool = True, dee
         memory consumption.
     details : bool, default True
         If True and a DataFrame is given, give the detail (memory and type) of each column.
+    approx : bool, default False
+        If True and `deep`, estimate the memory of the objects from a sample of rows.
+    sample_size : int, default 10_000
+        Number of rows sampled in each object column if `approx`.
+        Columns with fewer rows are measured exactly.
+    confidence : float, default 0.95
+        Level of confidence of the bound of the estimations if `approx`.
+    random_state : int, default None
+        Seed of the sampling if `approx`.
 
     Returns
     -------
@@ -442,21 +1962,63 @@ def mem_usage_pd(pd_obj: Union[pd.DataFrame, pd.Series], index: bool = True, dee
     >>> mem_usage_pd(serie, details=True)
     2019-06-24 11:23:39,500 Details is only available for DataFrames.
     {'total': '0.76 MB'}
+    >>> mem_usage_pd(df, approx=True, details=True)
+    {'Index': {'6.38 ± 0.00 MB', 'Index type'},
+     'B': {'0.76 MB', dtype('int64')},
+     'C': {'0.76 MB', dtype('float64')},
+     'total': '7.91 ± 0.00 MB'}
     """
+    approx = approx and deep
     try:
-        usage_b = pd_obj.memory_usage(index=index, deep=deep)
+        # Objects are sampled afterwards, the rest is exact without introspection.
+        usage_b = pd_obj.memory_usage(index=index, deep=deep and not approx)
     except AttributeError as e:
         raise AttributeError(f'Object does not have a `memory_usage` function, '
                              'use only pandas objects.') from e
 
+    # Variance of the estimation of each column, zero if exact.
+    variances_b: Dict[Hashable, float] = {}
+    if approx:
+        rng = np.random.default_rng(random_state)
+        usage_b = pd.Series(usage_b) if isinstance(pd_obj, pd.DataFrame) else usage_b
+        if isinstance(pd_obj, pd.DataFrame):
+            arrays = [(col, pd_obj[col]) for col in pd_obj.columns]
+        else:
+            arrays = [(None, pd_obj)]
+        if index:
+            arrays.append(('Index', pd_obj.index))
+        for key, values in arrays:
+            if values.dtype == object and not isinstance(values, pd.MultiIndex):
+                estimation, variances_b[key] = _memory_usage_objects(np.asarray(values),
+                                                                     sample_size, rng)
+            else:
+                # Categories and levels are unique values, measured exactly.
+                kwargs = {'index': False} if isinstance(values, pd.Series) else {}
+                estimation = (values.memory_usage(deep=True, **kwargs)
+                              - values.memory_usage(**kwargs))
+            if key is None:
+                usage_b += estimation
+            elif isinstance(pd_obj, pd.DataFrame):
+                usage_b[key] += estimation
+            else:
+                # The index of a Series is not detailed.
+                usage_b += estimation
+                variances_b[None] = variances_b.get(None, 0) + variances_b.pop(key, 0)
+
     # Convert bytes to megabytes.
     usage_mb = usage_b / 1024 ** 2
+    z_score = stats.norm.ppf((1 + confidence) / 2)
+
+    def format_mb(value: float, variance: Optional[float]) -> str:
+        if variance is None:
+            return f'{value:03.2f} MB'
+        return f'{value:03.2f} ± {z_score * math.sqrt(variance) / 1024 ** 2:03.2f} MB'
 
     res: Dict[str, Union[str, Set[Any]]] = {}
 
     if details:
         if isinstance(pd_obj, pd.DataFrame):
-            res.update({idx: {f'{value:03.2f} MB',
+            res.update({idx: {format_mb(value, variances_b.get(idx)),
                               pd_obj[idx].dtype if idx != 'Index' else 'Index type'}
                         for (idx, value) in usage_mb.iteritems()})
         else:
@@ -464,11 +2026,403 @@ def mem_usage_pd(pd_obj: Union[pd.DataFrame, pd.Series], index: bool = True, dee
     # Sum the memory usage of the columns if this is a DataFrame.
     if isinstance(pd_obj, pd.DataFrame):
         usage_mb = usage_mb.sum()
-    res['total'] = f'{usage_mb:03.2f} MB'
+    # Estimations of the columns are independent, their variances add up.
+    res['total'] = format_mb(usage_mb, sum(variances_b.values()) if variances_b else None)
+    return res
+
+
+def _memory_usage_objects(values: np.ndarray, sample_size: int,
+                          rng: np.random.Generator) -> Tuple[float, float]:
+    """
+    Estimate the memory of the objects of an array from a random sample.
+
+    The memory of the objects is the sum of their sizes, as in the deep
+    memory usage of pandas.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of objects.
+    sample_size : int
+        Number of objects to sample, with replacement.
+        If the array is not larger, all the objects are measured.
+    rng : np.random.Generator
+        Generator of the sample.
+
+    Returns
+    -------
+    tuple of float
+        Estimated memory, in bytes, and variance of the estimation.
+    """
+    if len(values) <= sample_size:
+        return float(sum(map(sys.getsizeof, values))), 0.
+    sample = values[rng.integers(0, len(values), sample_size)]
+    sizes = np.fromiter(map(sys.getsizeof, sample), dtype=np.float64, count=sample_size)
+    return (len(values) * sizes.mean(),
+            len(values) ** 2 * sizes.var(ddof=1) / sample_size)
+
+
+class MemoryRegistry:
+    """
+    Registry of the memory measured by `track_memory`.
+
+    Each tracked call adds a record with its name and its memory, in megabytes.
+    Records can be queried as a DataFrame, or checked against thresholds
+    to detect regressions of memory in jobs.
+
+    The default registry of `track_memory` is `MEMORY_REGISTRY`.
+
+    Examples
+    --------
+    >>> registry = MemoryRegistry()
+    >>> with track_memory('load', registry=registry):
+    ...     df = pd.DataFrame(np.zeros((1_000_000, 10)))
+    >>> registry.to_frame()[['name', 'peak_traced_mb', 'retained_mb']]
+       name  peak_traced_mb  retained_mb
+    0  load       76.301...    76.294...
+    >>> registry.exceeded(retained_mb=50)['name'].tolist()
+    ['load']
+    """
+
+    columns = ['name', 'start', 'time', 'peak_rss_mb', 'rss_delta_mb', 'peak_traced_mb',
+               'retained_mb', 'children_peak_rss_mb']
+
+    def __init__(self):
+        """Initialization of the registry, without any record."""
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Number of records."""
+        return len(self.records)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Add a record to the registry.
+
+        Parameters
+        ----------
+        record : dict
+            Record with the keys of `MemoryRegistry.columns`.
+        """
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self) -> None:
+        """Remove all the records."""
+        with self._lock:
+            self.records.clear()
+
+    def exceeded(self, name: Optional[str] = None, **limits: float) -> pd.DataFrame:
+        """
+        Get the records exceeding thresholds.
+
+        Parameters
+        ----------
+        name : str, default None
+            If given, only check the records with this name.
+        **limits : float
+            Maximum value of the columns, e.g. ``peak_rss_mb=1024``.
+
+        Returns
+        -------
+        pd.DataFrame
+            Records with at least one column above its maximum.
+
+        Raises
+        ------
+        KeyError
+            If a limit is not a column of the records.
+        """
+        unknown = set(limits).difference(self.columns)
+        if unknown:
+            raise KeyError(f'Unknown columns for the limits: {sorted(unknown)}.')
+        df = self.to_frame(name)
+        mask = np.zeros(len(df), dtype=bool)
+        for column, limit in limits.items():
+            mask |= (df[column] > limit).to_numpy()
+        return df[mask]
+
+    def to_frame(self, name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get the records as a DataFrame.
+
+        Parameters
+        ----------
+        name : str, default None
+            If given, only get the records with this name.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with a row per record, in the order of the calls.
+        """
+        with self._lock:
+            df = pd.DataFrame(self.records, columns=self.columns)
+        return df if name is None else df[df['name'] == name].reset_index(drop=True)
+
+
+# Default registry of `track_memory`.
+MEMORY_REGISTRY = MemoryRegistry()
+
+
+class _MemoryTracker(ContextDecorator):
+    """Context and decorator measuring the memory of a block, see `track_memory`."""
+
+    def __init__(self, name: Optional[str], registry: Optional[MemoryRegistry],
+                 trace: bool, interval: float):
+        self.name = name
+        self.registry = registry if registry is not None else MEMORY_REGISTRY
+        self.trace = trace
+        self.interval = interval
+        self.record: Dict[str, Any] = {}
+
+    def __call__(self, func: Callable) -> Callable:
+        """Decorate a function, named by default after the function."""
+        if self.name is None:
+            self.name = func.__qualname__
+        if not inspect.isgeneratorfunction(func):
+            return super().__call__(func)
+
+        # Generators are tracked until they are exhausted or closed.
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._recreate_cm():
+                yield from func(*args, **kwargs)
+        return wrapper
+
+    def _recreate_cm(self) -> '_MemoryTracker':
+        """New tracker for each call of the decorated function."""
+        return copy.copy(self)
+
+    def _sample_rss(self) -> None:
+        """Sample the current RSS until the end of the context."""
+        while not self._stop.wait(self.interval):
+            self._peak_rss = max(self._peak_rss, _current_rss())
+
+    def __enter__(self) -> '_MemoryTracker':
+        """Start the measure of the memory."""
+        global _MEMORY_TRACING_STARTED
+        self._traced_peak = 0
+        with _MEMORY_TRACKERS_LOCK:
+            if self.trace:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _MEMORY_TRACING_STARTED = True
+                self._traced_start, peak = tracemalloc.get_traced_memory()
+                for tracker in _MEMORY_TRACKERS:
+                    # The peak of the other active contexts is reset below.
+                    tracker._traced_peak = max(tracker._traced_peak, peak)
+                # Without `reset_peak` (Python < 3.9), the peak is the one since the start.
+                if hasattr(tracemalloc, 'reset_peak'):
+                    tracemalloc.reset_peak()
+                self._traced_peak = self._traced_start
+            _MEMORY_TRACKERS.append(self)
+
+        self._max_rss = _max_rss()
+        self._max_rss_children = _max_rss(children=True)
+        self._rss_start = self._peak_rss = _current_rss()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+        self._start = pd.Timestamp.now()
+        self._time = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        """Stop the measure of the memory and add the record to the registry."""
+        elapsed = time.perf_counter() - self._time
+        self._stop.set()
+        self._sampler.join()
+        rss = _current_rss()
+        max_rss = _max_rss()
+        # The peak of the process is exact if it was reached during the context.
+        peak_rss = max(self._peak_rss, rss, max_rss if max_rss > self._max_rss else 0)
+        max_rss_children = _max_rss(children=True)
+
+        global _MEMORY_TRACING_STARTED
+        peak_traced, retained = np.nan, np.nan
+        with _MEMORY_TRACKERS_LOCK:
+            _MEMORY_TRACKERS.remove(self)
+            if self.trace:
+                current, peak = tracemalloc.get_traced_memory()
+                self._traced_peak = max(self._traced_peak, peak)
+                for tracker in _MEMORY_TRACKERS:
+                    tracker._traced_peak = max(tracker._traced_peak, self._traced_peak)
+                peak_traced = (self._traced_peak - self._traced_start) / 1024 ** 2
+                retained = (current - self._traced_start) / 1024 ** 2
+                # The tracing started by the contexts is stopped once none of them is tracing.
+                if (_MEMORY_TRACING_STARTED
+                        and not any(tracker.trace for tracker in _MEMORY_TRACKERS)):
+                    tracemalloc.stop()
+                    _MEMORY_TRACING_STARTED = False
+
+        self.record = {'name': self.name,
+                       'start': self._start,
+                       'time': elapsed,
+                       'peak_rss_mb': peak_rss / 1024 ** 2,
+                       'rss_delta_mb': (rss - self._rss_start) / 1024 ** 2,
+                       'peak_traced_mb': peak_traced,
+                       'retained_mb': retained,
+                       'children_peak_rss_mb': (max_rss_children / 1024 ** 2
+                                                if max_rss_children > self._max_rss_children
+                                                else np.nan)}
+        self.registry.add(self.record)
+        if LOGGER.isEnabledFor(logging.INFO):
+            traced = (f', peak traced {peak_traced:.2f} MB, retained {retained:.2f} MB'
+                      if self.trace else '')
+            LOGGER.info(f'{self.name}: peak RSS {self.record["peak_rss_mb"]:.2f} MB{traced}')
+
+
+def merge_with_categories(df_left: pd.DataFrame, df_right: pd.DataFrame,
+                          on: Union[Hashable, Sequence[Hashable]], **kwargs) -> pd.DataFrame:
+    """
+    Merge of Pandas DataFrame on categorical keys.
+
+    With the `merge` function from Pandas, when the categorical keys of both
+    DataFrames do not have the same categories, the keys are cast to `object`,
+    which takes more memory and slows down the join.
+
+    In this function, the categories of each categorical key are aligned on the union
+    of the categories of both DataFrames (see `concat_with_categories`). The join is then
+    done on the integer codes, and the keys of the result are cast back to ``category``.
+
+    Original DataFrame are preserved.
+
+    Parameters
+    ----------
+    df_left : pd.DataFrame
+        Left DataFrame to merge.
+    df_right : pd.DataFrame
+        Right DataFrame to merge.
+    on : str or sequence of str
+        Columns to join on, must be present in both DataFrames.
+    **kwargs
+        Additional keyword arguments to be passed to the `pd.merge` function.
+
+    Returns
+    -------
+    pd.DataFrame
+        Merge of both DataFrames.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df_left = pd.DataFrame({'country': ['China', 'Switzerland', 'China'],
+    ...                         'name': ['John', 'Jane', 'Mary']}).astype({'country': 'category'})
+    >>> df_right = pd.DataFrame({'country': ['Switzerland', 'China', 'Italy'],
+    ...                          'capital': ['Bern', 'Beijing', 'Rome']})
+    >>> df_right = df_right.astype({'country': 'category'})
+    >>> pd.merge(df_left, df_right, on='country').dtypes
+    country    object
+    name       object
+    capital    object
+    dtype: object
+    >>> df_merged = merge_with_categories(df_left, df_right, on='country')
+    >>> df_merged
+           country  name  capital
+    0        China  John  Beijing
+    1        China  Mary  Beijing
+    2  Switzerland  Jane     Bern
+    >>> df_merged.dtypes
+    country    category
+    name         object
+    capital      object
+    dtype: object
+    """
+    keys = value_2_list(on)
+    left = df_left.copy(deep=False)
+    right = df_right.copy(deep=False)
+
+    cat_types = {}
+    for col in keys:
+        # Process only the keys being categorical on both sides.
+        if (pd.api.types.is_categorical_dtype(left[col].dtype)
+                and pd.api.types.is_categorical_dtype(right[col].dtype)):
+            cat_types[col] = _union_categories([left[col], right[col]])
+            # Join on the codes of the aligned categories.
+            left[col] = recode_categorical(left[col].values, cat_types[col]).codes
+            right[col] = recode_categorical(right[col].values, cat_types[col]).codes
+
+    res = pd.merge(left, right, on=keys, **kwargs)
+    for col, cat_type in cat_types.items():
+        res[col] = pd.Categorical.from_codes(res[col].values, dtype=cat_type)
     return res
 
 
-def normalization_pd(df: pd.DataFrame, scaler=None,
+def _normalization_assign(df: pd.DataFrame, columns: Sequence[Hashable], values: np.ndarray,
+                          suffix: Optional[str]) -> pd.DataFrame:
+    """
+    Write normalized columns in a DataFrame, in a single assignment.
+
+    Replaced columns keep their position, new columns are appended.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame with the original columns.
+    columns : sequence of str
+        Names of the normalized columns.
+    values : np.ndarray
+        2-D array with the normalized values of the columns.
+    suffix : str
+        If provided, suffix of the names of the new columns.
+        Else, columns are overridden (or created with a string name, for integers).
+
+    Returns
+    -------
+    pd.DataFrame
+        New DataFrame with the normalized columns.
+    """
+    names = [f'{col}{suffix}' if suffix else str(col) for col in columns]
+    df_norm = pd.DataFrame(values, index=df.index, columns=names)
+    replaced = df.columns.intersection(names)
+    df_res = pd.concat([df.drop(columns=replaced), df_norm], axis=1)
+    if len(replaced):
+        df_res = df_res[list(df.columns) + [name for name in names if name not in replaced]]
+    return df_res
+
+
+def _normalization_params(method: str, stats: Dict[str, np.ndarray],
+                          **kwargs) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the parameters of a normalization from the statistics of the columns.
+
+    The normalized values are ``(x - center) * scale + shift``.
+    Columns with a null range, deviation or interquartile range are only centered,
+    as in the scalers of sklearn.
+
+    Parameters
+    ----------
+    method : str
+        Method of normalization, 'minmax', 'standard' or 'robust'.
+    stats : dict of str to np.ndarray
+        Statistics of the columns, see `_normalization_stats`.
+    **kwargs
+        Keyword arguments of the method, see `_NORMALIZATION_KWARGS`.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Center, scale and shift of each column.
+    """
+    params = {**_NORMALIZATION_KWARGS[method], **kwargs}
+    if method == 'minmax':
+        data_range = stats['max'] - stats['min']
+        low, high = params['feature_range']
+        scale = (high - low) / np.where(data_range == 0, 1, data_range)
+        return stats['min'], scale, np.full_like(scale, low)
+    if method == 'standard':
+        center, spread = stats['mean'], np.sqrt(stats['var'])
+        use_center, use_scale = params['with_mean'], params['with_std']
+    else:
+        center, spread = stats['median'], stats['q_high'] - stats['q_low']
+        use_center, use_scale = params['with_centering'], params['with_scaling']
+    scale = 1 / np.where(spread == 0, 1, spread) if use_scale else np.ones_like(spread)
+    return (center if use_center else np.zeros_like(center)), scale, np.zeros_like(scale)
+
+
+def normalization_pd(df: pd.DataFrame, scaler: Optional[Union[str, Any]] = 'minmax',
                      columns: Optional[Union[str, Sequence[str]]] = None,
                      suffix: Optional[str] = None, new_type: np.dtype = np.float32,
                      **kwargs) -> pd.DataFrame:
@@ -482,12 +2436,22 @@ def normalization_pd(df: pd.DataFrame, scaler=None,
 
     By default, if the suffix is not provided, columns are overridden.
 
+    All the columns are normalized at once, as a single 2-D array of type `new_type`,
+    and written back in a single assignment. The methods 'minmax', 'standard' and
+    'robust' are implemented with numpy and give the same results as the
+    `MinMaxScaler`, `StandardScaler` and `RobustScaler` of sklearn, which is not required.
+    Missing values are ignored to compute the parameters, and kept.
+
+    To normalize data that does not fit in memory, see `NormalizationPlan`.
+
     Parameters
     ----------
     df : pd.DataFrame
         DataFrame to normalize.
-    scaler : TransformerMixin, default MinMaxScaler
-        Scaler of sklearn to use for the normalization.
+    scaler : str or TransformerMixin, default 'minmax'
+        Method of normalization, 'minmax', 'standard' or 'robust',
+        or scaler of sklearn to use for the normalization.
+        None is the same as 'minmax', i.e. as `MinMaxScaler`.
     columns : sequence of str, default None
         Columns to normalize. If None, normalize all numerical columns.
     suffix : str, default None
@@ -495,14 +2459,27 @@ def normalization_pd(df: pd.DataFrame, scaler=None,
     new_type : np.dtype, default np.float32
         New type for the columns.
     **kwargs
-        Additional keyword arguments to be passed to the
-        scaler function from sklearn.
+        Additional keyword arguments of the method:
+
+        * 'minmax': `feature_range`, default (0, 1),
+        * 'standard': `with_mean` and `with_std`, default True,
+        * 'robust': `with_centering` and `with_scaling`, default True, and
+          `quantile_range`, default (25.0, 75.0),
+
+        or to be passed to the scaler function from sklearn.
 
     Returns
     -------
     pd.DataFrame
         DataFrame with the normalized columns.
 
+    Raises
+    ------
+    ValueError
+        If the method of normalization is unknown.
+    TypeError
+        If a keyword argument is unknown for the method.
+
     Examples
     --------
     >>> import numpy as np
@@ -534,18 +2511,475 @@ def normalization_pd(df: pd.DataFrame, scaler=None,
     2   38   32.0  0.229167  0.000000
     3   45   34.0  0.375000  0.009434
     4   67   90.0  0.833333  0.273585
+    >>> normalization_pd(df, scaler='robust')
+              x         y
+    0  2.689655  7.332143
+    1 -0.620690  0.000000
+    2 -0.241379 -0.239286
+    3  0.000000 -0.203571
+    4  0.758621  0.796429
     """
     if scaler is None:
-        _check_sklearn_support('normalization_pd')
-        from sklearn.preprocessing import MinMaxScaler
-        scaler = MinMaxScaler
+        scaler = 'minmax'
     # If columns are not provided, select all the numerical columns of the DataFrame.
     # If provided, select only the numerical ones.
     cols_to_norm = ([col for col in value_2_list(columns) if np.issubdtype(df[col], np.number)]
                     if columns else df.select_dtypes(include=[np.number]).columns)
-    return df.assign(**{f'{col}{suffix}' if suffix else str(col):
-                        scaler(**kwargs).fit_transform(df[[col]].values.astype(new_type))
-                        for col in cols_to_norm})
+    if isinstance(scaler, str):
+        _check_normalization(scaler, kwargs)
+    if len(cols_to_norm) == 0:
+        return df.copy()
+
+    values = df[cols_to_norm].to_numpy(dtype=new_type)
+    if isinstance(scaler, str):
+        stats = _normalization_stats(values, scaler, **kwargs)
+        _normalization_transform(values, *_normalization_params(scaler, stats, **kwargs))
+    else:
+        values = np.asarray(scaler(**kwargs).fit_transform(values), dtype=new_type)
+    return _normalization_assign(df, cols_to_norm, values, suffix)
+
+
+def _normalization_stats(values: np.ndarray, method: str, **kwargs) -> Dict[str, np.ndarray]:
+    """
+    Compute the statistics of the columns of an array for a normalization.
+
+    Missing values are ignored.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        2-D array with the columns to normalize.
+    method : str
+        Method of normalization, 'minmax', 'standard' or 'robust'.
+    **kwargs
+        Keyword arguments of the method, see `_NORMALIZATION_KWARGS`.
+
+    Returns
+    -------
+    dict of str to np.ndarray
+        Statistics of each column, in float64: 'min' and 'max' for 'minmax',
+        'mean' and 'var' for 'standard', 'median', 'q_low' and 'q_high' for 'robust'.
+    """
+    # Functions ignoring the missing values copy the array, only use them if needed.
+    has_nan = np.isnan(values).any()
+    if method == 'minmax':
+        min_func, max_func = (np.nanmin, np.nanmax) if has_nan else (np.min, np.max)
+        return {'min': min_func(values, axis=0).astype(np.float64),
+                'max': max_func(values, axis=0).astype(np.float64)}
+    if method == 'standard':
+        mean_func, var_func = (np.nanmean, np.nanvar) if has_nan else (np.mean, np.var)
+        return {'mean': mean_func(values, axis=0, dtype=np.float64),
+                'var': var_func(values, axis=0, dtype=np.float64)}
+    q_low, q_high = {**_NORMALIZATION_KWARGS[method], **kwargs}['quantile_range']
+    quantiles = (np.nanpercentile if has_nan else np.percentile)(
+        values, [q_low, 50, q_high], axis=0).astype(np.float64)
+    return {'q_low': quantiles[0], 'median': quantiles[1], 'q_high': quantiles[2]}
+
+
+def _normalization_transform(values: np.ndarray, center: np.ndarray, scale: np.ndarray,
+                             shift: np.ndarray) -> None:
+    """
+    Normalize the columns of an array in place, see `_normalization_params`.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        2-D array with the columns to normalize, modified in place.
+    center, scale, shift : np.ndarray
+        Parameters of the normalization of each column.
+    """
+    values -= center.astype(values.dtype)
+    values *= scale.astype(values.dtype)
+    if shift.any():
+        values += shift.astype(values.dtype)
+
+
+class NormalizationPlan:
+    """
+    Normalization of data arriving by chunks, fitted on all the chunks.
+
+    `normalization_pd` computes the parameters of the normalization on the DataFrame in hand.
+    For data too large to fit in memory, e.g. read by chunks from a database, the plan
+    is fitted in a first pass over the chunks, by accumulating the statistics of the columns,
+    and applied in a second pass on each chunk.
+
+    The statistics are merged exactly, for the 'minmax' method (minimum and maximum) and for
+    the 'standard' method (mean and variance, with the parallel algorithm of Welford).
+    The fitted parameters are hence the same, up to rounding, as with `normalization_pd`
+    on the whole data: the 'minmax' outputs are identical, while the mean and variance,
+    summed in another order, can differ in the last bits and the 'standard' outputs can
+    differ by one unit in the last place of `new_type` (about 1e-7 relative for float32).
+    The 'robust' method needs all the values to compute the quantiles and
+    is not available.
+
+    The plan can be serialized using `to_dict` and restored using `from_dict`.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> def chunks():
+    ...     return pd.read_sql('SELECT * FROM sales', cnxn, chunksize=1_000_000)
+    >>> plan = NormalizationPlan('standard', columns=['price', 'quantity']).fit(chunks())
+    >>> for df_chunk in plan.apply_chunks(chunks()):
+    ...     df_chunk.to_parquet(...)
+    >>> df = pd.DataFrame({'x': [123, 27, 38, 45, 67], 'y': [456, 45.4, 32, 34, 90]})
+    >>> plan = NormalizationPlan().fit([df.iloc[:2], df.iloc[2:]])
+    >>> plan.apply(df).equals(normalization_pd(df))
+    True
+    """
+
+    def __init__(self, method: str = 'minmax',
+                 columns: Optional[Union[str, Sequence[str]]] = None,
+                 suffix: Optional[str] = None, new_type: np.dtype = np.float32, **kwargs):
+        """
+        Initialization of the plan, not fitted.
+
+        Parameters
+        ----------
+        method : str, default 'minmax'
+            Method of normalization, 'minmax' or 'standard', see `normalization_pd`.
+        columns : sequence of str, default None
+            Columns to normalize. If None, normalize all the numerical columns
+            of the first chunk.
+        suffix : str, default None
+            If provided, create the normalization in new columns having this suffix.
+        new_type : np.dtype, default np.float32
+            New type for the columns.
+        **kwargs
+            Additional keyword arguments of the method, see `normalization_pd`.
+
+        Raises
+        ------
+        ValueError
+            If the method of normalization is unknown or cannot be fitted by chunks.
+        TypeError
+            If a keyword argument is unknown for the method.
+        """
+        _check_normalization(method, kwargs)
+        if method == 'robust':
+            raise ValueError('The robust normalization cannot be fitted by chunks, '
+                             'its quantiles need all the values.')
+        self.method = method
+        # Columns requested, restored by `fit`, `columns` are the ones actually normalized.
+        self._columns: Optional[List[Hashable]] = value_2_list(columns) if columns else None
+        self.columns = self._columns
+        self.suffix = suffix
+        self.new_type = np.dtype(new_type)
+        self.kwargs = kwargs
+        self.count = np.zeros(0)
+        self.stats: Dict[str, np.ndarray] = {}
+
+    def __repr__(self) -> str:
+        """Representation of the plan."""
+        return (f'{self.__class__.__name__}(method={self.method!r}, columns={self.columns}, '
+                f'count={self.count.max(initial=0):.0f})')
+
+    @property
+    def fitted(self) -> bool:
+        """True if the plan was fitted on at least one value."""
+        return bool(self.count.any())
+
+    def partial_fit(self, df: pd.DataFrame) -> 'NormalizationPlan':
+        """
+        Update the statistics of the columns with a chunk.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Chunk of the data.
+
+        Returns
+        -------
+        NormalizationPlan
+            The plan, updated.
+        """
+        if self.columns is None:
+            self.columns = list(df.select_dtypes(include=[np.number]).columns)
+        elif not self.stats:
+            # As in `normalization_pd`, only the numerical columns are normalized.
+            self.columns = [col for col in self.columns if np.issubdtype(df[col], np.number)]
+        values = df[self.columns].to_numpy(dtype=self.new_type)
+        count = (~np.isnan(values)).sum(axis=0).astype(np.float64)
+        if not self.stats:
+            self.count = np.zeros(len(self.columns))
+            self.stats = ({'min': np.full(len(self.columns), np.nan),
+                           'max': np.full(len(self.columns), np.nan)}
+                          if self.method == 'minmax' else
+                          {'mean': np.zeros(len(self.columns)),
+                           'var': np.zeros(len(self.columns))})
+        if not count.any():
+            return self
+
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            # Columns without values in the chunk give NaN, ignored below.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            stats = _normalization_stats(values, self.method, **self.kwargs)
+        total = self.count + count
+        if self.method == 'minmax':
+            self.stats = {'min': np.fmin(self.stats['min'], stats['min']),
+                          'max': np.fmax(self.stats['max'], stats['max'])}
+        else:
+            # Parallel algorithm of Welford (Chan et al.) to merge the means and variances.
+            mean = np.where(count > 0, stats['mean'], 0)
+            m2 = np.where(count > 0, stats['var'], 0) * count
+            delta = mean - self.stats['mean']
+            ratio = np.divide(count, total, out=np.zeros_like(total), where=total > 0)
+            m2_total = self.stats['var'] * self.count + m2 + delta ** 2 * self.count * ratio
+            self.stats = {'mean': self.stats['mean'] + delta * ratio,
+                          'var': np.divide(m2_total, total, out=np.zeros_like(total),
+                                           where=total > 0)}
+        self.count = total
+        return self
+
+    def fit(self, chunks: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> 'NormalizationPlan':
+        """
+        Compute the statistics of the columns over all the chunks.
+
+        Previous statistics are discarded, and the columns are selected again
+        from the columns given to the plan, so that it can be fitted on another schema.
+
+        Parameters
+        ----------
+        chunks : pd.DataFrame or iterable of pd.DataFrame
+            Chunks of the data, or all the data in a DataFrame.
+
+        Returns
+        -------
+        NormalizationPlan
+            The plan, fitted.
+        """
+        self.columns, self.count, self.stats = self._columns, np.zeros(0), {}
+        for df in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+            self.partial_fit(df)
+        return self
+
+    def params(self) -> pd.DataFrame:
+        """
+        Get the parameters of the normalization of each column.
+
+        The normalized values are ``(x - center) * scale + shift``.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with the columns as index and `center`, `scale` and `shift` as columns.
+
+        Raises
+        ------
+        ValueError
+            If the plan is not fitted.
+        """
+        if not self.fitted:
+            raise ValueError('The plan must be fitted before being used.')
+        center, scale, shift = _normalization_params(self.method, self.stats, **self.kwargs)
+        return pd.DataFrame({'center': center, 'scale': scale, 'shift': shift},
+                            index=self.columns)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normalize a chunk with the fitted parameters.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Chunk to normalize.
+
+        Returns
+        -------
+        pd.DataFrame
+            Chunk with the normalized columns.
+
+        Raises
+        ------
+        ValueError
+            If the plan is not fitted.
+        """
+        params = self.params()
+        values = df[self.columns].to_numpy(dtype=self.new_type)
+        _normalization_transform(values, *(params[col].to_numpy() for col in params.columns))
+        return _normalization_assign(df, self.columns, values, self.suffix)
+
+    def apply_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Normalize chunks in a stream, with the fitted parameters.
+
+        Parameters
+        ----------
+        chunks : iterable of pd.DataFrame
+            Chunks to normalize.
+
+        Yields
+        ------
+        pd.DataFrame
+            Each chunk with the normalized columns.
+        """
+        for df in chunks:
+            yield self.apply(df)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the plan into a dictionary.
+
+        Returns
+        -------
+        dict
+            Dictionary with the settings and the statistics of the plan.
+        """
+        return {'method': self.method,
+                'columns': None if self.columns is None else list(self.columns),
+                'suffix': self.suffix,
+                'new_type': self.new_type.name,
+                'kwargs': dict(self.kwargs),
+                'count': self.count.tolist(),
+                'stats': {name: values.tolist() for name, values in self.stats.items()}}
+
+    @classmethod
+    def from_dict(cls, plan: Dict[str, Any]) -> 'NormalizationPlan':
+        """
+        Create a plan from a dictionary generated with `to_dict`.
+
+        Parameters
+        ----------
+        plan : dict
+            Dictionary with the settings and the statistics of the plan.
+
+        Returns
+        -------
+        NormalizationPlan
+            The plan, with its statistics.
+        """
+        normalization_plan = cls(plan['method'], plan['columns'], plan['suffix'],
+                                 np.dtype(plan['new_type']), **plan['kwargs'])
+        normalization_plan.count = np.asarray(plan['count'], dtype=np.float64)
+        normalization_plan.stats = {name: np.asarray(values, dtype=np.float64)
+                                    for name, values in plan['stats'].items()}
+        return normalization_plan
+
+
+def _optimal_dtype(s: pd.Series, categories: bool = True,
+                   downcast_floats: bool = False) -> Optional[Any]:
+    """
+    Find the most memory efficient type able to store the values of a Series.
+
+    Integers are downcast to the smallest integer type containing their minimum and maximum,
+    unsigned integers staying unsigned. Floats are downcast to a nullable integer type if they
+    only hold integers and missing values, or to `float32` if no precision is lost.
+    Object columns containing only booleans or integers are cast to the (nullable) boolean
+    or integer type. Otherwise, object columns are cast to ``category`` if they are worth it
+    (see `cast_to_category_pd`).
+
+    Parameters
+    ----------
+    s : pd.Series
+        Series to find the type for.
+    categories : bool, default True
+        If True, allow the cast of object columns to ``category``.
+    downcast_floats : bool, default False
+        If True, downcast floats to `float32` as soon as their range allows it,
+        even if precision is lost.
+
+    Returns
+    -------
+    type or None
+        The optimal type, None if the current type is already the best one.
+    """
+    non_null = s.dropna()
+    if non_null.empty or pd.api.types.is_bool_dtype(s):
+        return None
+    if pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+        new_type = _smallest_int_dtype(non_null.min(), non_null.max(),
+                                       unsigned=pd.api.types.is_unsigned_integer_dtype(s))
+        return new_type if new_type != s.dtype else None
+    if pd.api.types.is_float_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+        # Integers with missing values are stored as floats by pandas.
+        if s.hasnans and (non_null % 1 == 0).all():
+            new_type = _smallest_int_dtype(non_null.min(), non_null.max(), nullable=True)
+            if new_type is not None:
+                return new_type
+        values = non_null.to_numpy()
+        if (s.dtype.itemsize > 4
+                and np.abs(values).max() <= np.finfo(np.float32).max
+                and (downcast_floats or (values.astype(np.float32) == values).all())):
+            return np.dtype(np.float32)
+        return None
+    if pd.api.types.is_object_dtype(s):
+        inferred_type = pd.api.types.infer_dtype(non_null, skipna=True)
+        if inferred_type == 'boolean':
+            return 'boolean' if s.hasnans else np.dtype(bool)
+        if inferred_type == 'integer':
+            return _smallest_int_dtype(non_null.min(), non_null.max(), nullable=s.hasnans)
+        if categories and _is_category_candidate(s):
+            return 'category'
+    return None
+
+
+def optimize_dtypes_pd(df: pd.DataFrame, categories: bool = True, details: bool = True,
+                       downcast_floats: bool = False) -> Tuple[pd.DataFrame, Dict[str, Dict]]:
+    """
+    Cast the columns of a pandas DataFrame to their most memory efficient type.
+
+    The following conversions are done:
+
+    * Integers are downcast to the smallest type able to contain their minimum and maximum.
+      Unsigned integers stay unsigned.
+    * Floats are downcast to `float32` if no precision is lost, or if their range allows it
+      with `downcast_floats`.
+    * Floats having only integers and missing values are cast to nullable integers.
+    * Object columns having only booleans are cast to `bool` (or `boolean` if missing values).
+    * Object columns having only integers are cast to (nullable) integers.
+    * Other object columns are cast to ``category`` if worth it (see `cast_to_category_pd`).
+
+    A report of the memory usage before and after the optimization is returned along with
+    the optimized DataFrame. The memory usage is computed with `mem_usage_pd`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to optimize.
+    categories : bool, default True
+        If True, cast the object columns worth it to ``category``.
+    details : bool, default True
+        If True, give the detail (memory and type) of each column in the report.
+    downcast_floats : bool, default False
+        If True, downcast floats to `float32` as soon as their range allows it,
+        even if precision is lost.
+
+    Returns
+    -------
+    pd.DataFrame
+        Optimized copy of the input DataFrame.
+    dict
+        Memory usage of the DataFrame, with `before` and `after` as keys
+        and the result of `mem_usage_pd` as values.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'age': [24, 20, 25, 23, 28],
+    ...                    'height': [1.82, 1.67, 1.75, None, 1.61],
+    ...                    'kids': [2, None, 0, 1, 3],
+    ...                    'married': [True, False, True, True, False],
+    ...                    'country': ['China', 'China', 'Switzerland', 'China', 'China']})
+    >>> df = df.astype({'married': 'object'})
+    >>> df_optimized, report = optimize_dtypes_pd(df, details=False, downcast_floats=True)
+    >>> df_optimized.dtypes
+    age            int8
+    height      float32
+    kids           Int8
+    married        bool
+    country    category
+    dtype: object
+    >>> report
+    {'before': {'total': '0.00 MB'}, 'after': {'total': '0.00 MB'}}
+    """
+    new_types = {col: _optimal_dtype(df[col], categories=categories,
+                                     downcast_floats=downcast_floats)
+                 for col in df.columns}
+    df_optimized = df.astype({col: new_type for col, new_type in new_types.items()
+                              if new_type is not None})
+    report = {'before': mem_usage_pd(df, details=details),
+              'after': mem_usage_pd(df_optimized, details=details)}
+    return df_optimized, report
 
 
 def parse_date(func: Optional[Callable] = None,
@@ -613,6 +3047,280 @@ def parse_date(func: Optional[Callable] = None,
     return _parse_date(func) if func else _parse_date
 
 
+class PeakDetector:
+    """
+    Incremental detection of the peaks of an unbounded time series.
+
+    Streaming version of `get_peaks`: the series is given by batches and the confirmed
+    peaks are returned after each batch. A local maximum is found once a lower value
+    follows it, a plateau giving a single peak at its middle, as in `signal.find_peaks`.
+    A peak is confirmed once no later peak closer than `distance` can suppress it,
+    directly or by a chain of higher peaks. With a fixed `height`, the peaks are
+    the same as the ones of `get_peaks` with the same distance, whatever the size
+    of the batches.
+
+    The state is bounded: the height threshold is the quantile of a uniform sample
+    of the stream (reservoir sampling) of at most `sample_size` values, and only
+    the peaks higher than the threshold and not confirmed yet are buffered, with
+    the last run of equal values. With a quantile, a peak is compared to the
+    threshold estimated when it is found.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> values = [4, 5, 9, 3, 2, 1, 2, 1, 3, 4, 12, 9, 6, 3, 2, 4, 5]
+    >>> s = pd.Series(values, index=pd.date_range('2019-06-20', periods=len(values), freq='T'))
+    >>> detector = PeakDetector(distance=2, height=5)
+    >>> detector.update(s[:8])
+    (array(['2019-06-20T00:02:00.000000000'], dtype='datetime64[ns]'), array([9.]))
+    >>> detector.update(s[8:])
+    (array(['2019-06-20T00:10:00.000000000'], dtype='datetime64[ns]'), array([12.]))
+    >>> detector.flush()
+    (array([], dtype='datetime64[ns]'), array([], dtype=float64))
+    """
+
+    def __init__(self, distance: int, quantile: float = 0.75, height: Optional[float] = None,
+                 sample_size: int = 10_000, random_state: Optional[int] = None):
+        """
+        Initialization of the detector.
+
+        Parameters
+        ----------
+        distance : int
+            Minimal distance, in samples, between two peaks.
+            This is also the latency of the detection.
+        quantile : float, default 0.75
+            Only the peaks higher than this quantile of the stream are returned.
+        height : float, default None
+            Fixed height threshold for the peaks. If given, `quantile` is not used.
+        sample_size : int, default 10,000
+            Number of values kept to estimate the quantile.
+        random_state : int, default None
+            Seed of the sampling of the values used to estimate the quantile.
+
+        Raises
+        ------
+        ValueError
+            If `distance` or `sample_size` is smaller than 1.
+        """
+        if distance < 1:
+            raise ValueError('Distance must be higher than 0.')
+        if sample_size < 1:
+            raise ValueError('Sample size must be higher than 0.')
+        self.distance = distance
+        self.quantile = quantile
+        self.height = height
+        self._rng = np.random.default_rng(random_state)
+        self._sample = np.empty(sample_size, dtype=np.float64)
+        self._n_seen = 0
+        self._stream = _PeakStream(distance, index_dtype='datetime64[ns]')
+
+    @property
+    def threshold(self) -> float:
+        """Current height threshold of the peaks."""
+        if self.height is not None:
+            return self.height
+        n_sample = min(self._n_seen, len(self._sample))
+        return float(np.quantile(self._sample[:n_sample], self.quantile)) if n_sample else np.nan
+
+    def _update_sample(self, values: np.ndarray) -> None:
+        """Update the reservoir sample used to estimate the quantile."""
+        values = values[~np.isnan(values)]
+        sample_size = len(self._sample)
+        # Fill the reservoir first, then replace values with a decreasing probability.
+        n_fill = max(0, min(len(values), sample_size - self._n_seen))
+        self._sample[self._n_seen:self._n_seen + n_fill] = values[:n_fill]
+        positions = self._rng.integers(0, self._n_seen + np.arange(n_fill, len(values)) + 1)
+        kept = positions < sample_size
+        self._sample[positions[kept]] = values[n_fill:][kept]
+        self._n_seen += len(values)
+
+    def update(self, s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Add a batch of the series and return the peaks confirmed by this batch.
+
+        Parameters
+        ----------
+        s : pd.Series
+            Next values of the series, with datetime as index.
+
+        Returns
+        -------
+        dates : np.ndarray
+            Dates when the confirmed peaks occur.
+        heights : np.ndarray
+            Heights of the confirmed peaks at the corresponding dates.
+        """
+        assert isinstance(s.index, pd.DatetimeIndex), (
+            'Serie must have a datetime index.')
+        values = s.to_numpy(dtype=np.float64)
+        if self.height is None:
+            self._update_sample(values)
+        return self._stream.update(values, self.threshold, s.index.values)
+
+    def flush(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the remaining peaks, at the end of the stream.
+
+        Returns
+        -------
+        dates : np.ndarray
+            Dates when the remaining peaks occur.
+        heights : np.ndarray
+            Heights of the remaining peaks at the corresponding dates.
+        """
+        return self._stream.flush()
+
+
+class _PeakStream:
+    """
+    Peaks of a series given by batches, used by `PeakDetector` and `get_peaks_memmap`.
+
+    The local maxima are found on the runs of equal values of the series. The last run
+    may continue in the next batch, so only its value, start and index are kept, with
+    the value of the run before it. The peaks higher than the threshold are buffered,
+    with their position, height and index, until their selection by
+    `_select_peaks_by_distance` is final.
+    """
+
+    def __init__(self, distance: int, index_dtype: Any = np.int64):
+        """
+        Initialization of the stream.
+
+        Parameters
+        ----------
+        distance : int
+            Minimal distance, in samples, between two peaks.
+        index_dtype : type, default np.int64
+            Type of the index of the values, the positions if no index is given.
+        """
+        self.distance = distance
+        self._n_values = 0
+        # The first run is empty and not a number, so that it is never a peak nor lower.
+        self._previous = np.nan
+        self._run_value = np.nan
+        self._run_start = 0
+        self._run_index = np.empty(0, dtype=index_dtype)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._heights = np.empty(0, dtype=np.float64)
+        self._index = np.empty(0, dtype=index_dtype)
+        self._emitted = np.empty(0, dtype=bool)
+
+    def _emit(self, frontier: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the peaks decided before `frontier` and drop the ones not needed anymore."""
+        positions, heights, emitted = self._positions, self._heights, self._emitted
+        # Emitted peaks are final, they have the priority over the other ones.
+        kept = _select_peaks_by_distance(positions, np.where(emitted, np.inf, heights),
+                                         self.distance)
+
+        # A decision is final if no peak after `frontier` can change it. Undecided peaks form
+        # chains of strictly higher peaks up to `frontier`, hence they are found
+        # from the end, until no undecided peak is closer than `distance`.
+        # The deque holds the sliding maximum of the undecided peaks closer than `distance`.
+        decided = len(positions)
+        if frontier is not None:
+            pending: Deque[Tuple[int, float]] = deque()
+            # Python scalars are faster than the NumPy ones in this loop.
+            for i, position, height, is_emitted in zip(range(len(positions) - 1, -1, -1),
+                                                       positions[::-1].tolist(),
+                                                       heights[::-1].tolist(),
+                                                       emitted[::-1].tolist()):
+                if is_emitted:
+                    continue
+                while pending and pending[0][0] - position >= self.distance:
+                    pending.popleft()
+                if frontier - position < self.distance or (pending and pending[0][1] > height):
+                    while pending and pending[-1][1] <= height:
+                        pending.pop()
+                    pending.append((position, height))
+                    decided = i
+                elif not pending:
+                    break
+
+        new_peaks = kept & ~emitted
+        new_peaks[decided:] = False
+        res = (self._index[new_peaks], heights[new_peaks])
+        # Keep the undecided peaks and the emitted ones which can suppress them or the next ones.
+        bound = (positions[decided] if decided < len(positions)
+                 else np.inf if frontier is None else frontier)
+        keep = kept & (bound - positions < self.distance)
+        keep[decided:] = True
+        self._emitted = (emitted | new_peaks)[keep]
+        self._positions = positions[keep]
+        self._heights = heights[keep]
+        self._index = self._index[keep]
+        return res
+
+    def update(self, values: np.ndarray, height: float,
+               index: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Add a batch of values and return the confirmed peaks.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            Next values of the series.
+        height : float
+            Minimal height of the peaks found in this batch.
+        index : np.ndarray, default None
+            Index of the values. If not given, the positions of the values in the series.
+
+        Returns
+        -------
+        index : np.ndarray
+            Index of the confirmed peaks.
+        heights : np.ndarray
+            Heights of the confirmed peaks.
+        """
+        if not len(values):
+            return self._emit(self._run_start)
+        offset = self._n_values
+        # Runs of equal values, the first one continuing the last run of the previous batch.
+        # Not a number is never equal, hence always a run of its own.
+        new_run = np.empty(len(values), dtype=bool)
+        new_run[0] = values[0] != self._run_value
+        np.not_equal(values[1:], values[:-1], out=new_run[1:])
+        starts = np.flatnonzero(new_run)
+        run_values = np.concatenate([[self._previous, self._run_value], values[starts]])
+        run_starts = np.concatenate([[self._run_start, self._run_start], offset + starts])
+
+        # A peak is a run higher than the runs around it, at the middle of the run.
+        middle = run_values[1:-1]
+        runs = np.flatnonzero((run_values[:-2] < middle) & (run_values[2:] < middle)
+                              & (middle >= height)) + 1
+        positions = (run_starts[runs] + run_starts[runs + 1] - 1) // 2
+        if index is None:
+            peak_index = positions
+        else:
+            # The index of the last run is kept since its middle may be in the previous batch.
+            index = np.concatenate([self._run_index, index])
+            peak_index = index[positions - self._run_start]
+            self._run_index = index[run_starts[-1] - self._run_start:].copy()
+
+        self._previous, self._run_value = run_values[-2:]
+        self._run_start = run_starts[-1]
+        self._n_values += len(values)
+        self._positions = np.concatenate([self._positions, positions])
+        self._heights = np.concatenate([self._heights, run_values[runs]])
+        self._index = np.concatenate([self._index, peak_index])
+        self._emitted = np.concatenate([self._emitted, np.zeros(len(runs), dtype=bool)])
+        # The next peaks are at least at the start of the last run.
+        return self._emit(self._run_start)
+
+    def flush(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the remaining peaks, at the end of the series.
+
+        Returns
+        -------
+        index : np.ndarray
+            Index of the remaining peaks.
+        heights : np.ndarray
+            Heights of the remaining peaks.
+        """
+        return self._emit(None)
+
+
 def pipe_multiprocessing_pd(df: pd.DataFrame, func: Callable, *,
                             nb_proc: Optional[int] = None, **kwargs) -> pd.DataFrame:
     """
@@ -653,8 +3361,129 @@ def pipe_multiprocessing_pd(df: pd.DataFrame, func: Callable, *,
     return pd.concat(results, axis='index')
 
 
+class PipelineProfiler:
+    """
+    Profiler of the steps of a method chain on a DataFrame.
+
+    Inside the context of the profiler, each call to `log_df` (or to `checkpoint`)
+    ends a named step of the chain. For each step, the profiler records:
+
+    * the wall time since the previous checkpoint,
+    * the number of rows and columns of the DataFrame,
+    * the memory of the DataFrame and its difference with the previous checkpoint
+      (NaN for the first step, having no previous checkpoint),
+    * the changes of the types of the columns, and the added and removed columns.
+
+    When leaving the context, the slowest and the most memory-hungry steps are logged.
+    All the steps are available as a DataFrame with `summary`.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'age': [24, 20, 25], 'country': ['China', 'China', 'Italy']})
+    >>> with PipelineProfiler() as profiler:
+    ...     df_res = (df.pipe(log_df, step='start')
+    ...               .assign(adult=lambda x: x['age'] >= 21)
+    ...               .pipe(log_df, step='assign')
+    ...               .astype({'age': 'int8', 'country': 'category'})
+    ...               .pipe(log_df, step='cast'))
+    >>> profiler.summary()[['step', 'rows', 'columns', 'dtype_changes']]
+         step  rows  columns                                     dtype_changes
+    0   start     3        2
+    1  assign     3        3                                            +adult
+    2    cast     3        3  age: int64 -> int8, country: object -> category
+    """
+
+    def __init__(self, top: int = 5, deep: bool = False):
+        """
+        Initialization of the profiler.
+
+        Parameters
+        ----------
+        top : int, default 5
+            Number of steps to log, for the slowest and for the most memory-hungry steps.
+        deep : bool, default False
+            If True, measure the memory of the object columns deeply, which is slower,
+            see `pd.DataFrame.memory_usage`.
+        """
+        self.top = top
+        self.deep = deep
+        self.steps: List[Dict[str, Any]] = []
+        self._time = time.perf_counter()
+        self._memory: Optional[int] = None
+        self._dtypes: Optional[Dict[Hashable, Any]] = None
+
+    def __enter__(self) -> 'PipelineProfiler':
+        """Activate the profiler for the calls to `log_df` of this thread."""
+        if not hasattr(_PROFILERS, 'stack'):
+            _PROFILERS.stack = []
+        _PROFILERS.stack.append(self)
+        self._time = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        """Deactivate the profiler and log the slowest and most memory-hungry steps."""
+        _PROFILERS.stack.remove(self)
+        if self.steps:
+            summary = self.summary()
+            LOGGER.info('Slowest steps:\n'
+                        f'{summary.nlargest(self.top, "time").to_string(index=False)}')
+            LOGGER.info('Most memory-hungry steps:\n'
+                        f'{summary.nlargest(self.top, "memory_delta_mb").to_string(index=False)}')
+
+    def checkpoint(self, df: pd.DataFrame, step: Optional[str] = None) -> pd.DataFrame:
+        """
+        End a step of the chain and record its profile.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame at the end of the step.
+        step : str, default None
+            Name of the step. If not provided, the number of the step is used.
+
+        Returns
+        -------
+        pd.DataFrame
+            The DataFrame, unmodified.
+        """
+        elapsed = time.perf_counter() - self._time
+        memory = int(df.memory_usage(index=True, deep=self.deep).sum())
+        dtypes = dict(zip(df.columns, df.dtypes))
+        changes = []
+        if self._dtypes is not None:
+            changes = ([f'{col}: {self._dtypes[col]} -> {dtype}' for col, dtype in dtypes.items()
+                        if col in self._dtypes and self._dtypes[col] != dtype]
+                       + [f'+{col}' for col in dtypes if col not in self._dtypes]
+                       + [f'-{col}' for col in self._dtypes if col not in dtypes])
+        self.steps.append({'step': step if step is not None else f'step {len(self.steps)}',
+                           'time': elapsed,
+                           'rows': df.shape[0],
+                           'columns': df.shape[1],
+                           'memory_mb': memory / 1024 ** 2,
+                           'memory_delta_mb': (np.nan if self._memory is None
+                                               else (memory - self._memory) / 1024 ** 2),
+                           'dtype_changes': ', '.join(changes)})
+        self._memory, self._dtypes = memory, dtypes
+        # The time of the checkpoint itself is not part of the next step.
+        self._time = time.perf_counter()
+        return df
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Get the profile of all the steps.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with a row per step, in the order of the chain.
+        """
+        return pd.DataFrame(self.steps, columns=['step', 'time', 'rows', 'columns', 'memory_mb',
+                                                 'memory_delta_mb', 'dtype_changes'])
+
+
 def read_sql_by_chunks(sql: str, cnxn, params: Optional[Union[List, Dict]] = None,
-                       chunksize: int = 8_000_000, column_types: Optional[Dict] = None,
+                       chunksize: int = 8_000_000,
+                       column_types: Optional[Union[Dict, DtypePlan]] = None,
                        **kwargs) -> pd.DataFrame:
     """
     Read SQL query by chunks into a DataFrame.
@@ -674,8 +3503,10 @@ def read_sql_by_chunks(sql: str, cnxn, params: Optional[Union[List, Dict]] = Non
         List of parameters to pass to execute method.
     chunksize : int, default 8,000,000
         Number of rows to include in each chunk.
-    column_types : dict, default None
+    column_types : dict or DtypePlan, default None
         Dictionary with the name of the column as key and the type as value.
+        If a `DtypePlan` is given, it is applied on each chunk. If the plan is
+        not fitted yet, it is fitted on the first chunk.
         No cast is done if None.
     **kwargs
         Additional keyword arguments to be passed to the
@@ -686,18 +3517,91 @@ def read_sql_by_chunks(sql: str, cnxn, params: Optional[Union[List, Dict]] = Non
     pd.DataFrame
         DataFrame with the concatenation of the chunks in the wanted type.
     """
+    def cast(df: pd.DataFrame) -> pd.DataFrame:
+        if isinstance(column_types, DtypePlan):
+            return column_types.apply(df)
+        return df.astype(column_types) if column_types else df
+
     sql_it = pd.read_sql(sql, cnxn, params=params, chunksize=chunksize,
                          **kwargs)
     # Read the first chunk and cast the types.
     res = next(sql_it)
-    if column_types:
-        res = res.astype(column_types)
-    for df in sql_it:
-        # Concatenate each chunk with the preservation of the categories.
-        if column_types:
-            df = df.astype(column_types)
-        res = concat_with_categories(res, df, ignore_index=True)
-    return res
+    if isinstance(column_types, DtypePlan) and not column_types.fitted:
+        column_types.fit(res)
+    # Concatenate all the chunks at once with the preservation of the categories.
+    # The categories of a plan are append-only, sorting them would change all the codes.
+    return concat_with_categories([cast(res)] + [cast(df) for df in sql_it], ignore_index=True,
+                                  sort_categories=not isinstance(column_types, DtypePlan))
+
+
+def recode_categorical(values: pd.Categorical, dtype: pd.CategoricalDtype) -> pd.Categorical:
+    """
+    Recode a categorical array with new categories, without materializing its values.
+
+    A lookup array mapping the old codes to the new ones is built from the categories only,
+    and applied on the codes with `np.take`. Values not present in the new categories
+    become missing values.
+
+    Parameters
+    ----------
+    values : pd.Categorical
+        Categorical array to recode.
+    dtype : pd.CategoricalDtype
+        New categorical type, with the new categories.
+
+    Returns
+    -------
+    pd.Categorical
+        Categorical array with the new categories.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> values = pd.Categorical(['China', 'Italy', 'China'])
+    >>> recode_categorical(values, pd.CategoricalDtype(['Italy', 'France', 'China'])).codes
+    array([2, 0, 2], dtype=int8)
+    """
+    # The last element of the lookup maps the missing values (code -1) to themselves.
+    codes_type = _smallest_int_dtype(-1, len(dtype.categories))
+    lookup = np.append(dtype.categories.get_indexer(values.categories), -1).astype(codes_type)
+    return pd.Categorical.from_codes(np.take(lookup, values.codes), dtype=dtype)
+
+
+def _select_peaks_by_distance(positions: np.ndarray, heights: np.ndarray,
+                              distance: int) -> np.ndarray:
+    """
+    Select the peaks not closer than `distance` to a higher peak.
+
+    Same selection as the `distance` argument of `signal.find_peaks`: the peaks are taken
+    from the highest to the lowest and each kept peak removes the peaks closer than
+    `distance` to it. Among peaks of the same height, the first one is taken first,
+    whereas `signal.find_peaks` orders them with an unstable sort, so that the selection
+    does not depend on the other peaks of the series, given at once or by batches,
+    and a peak can only be suppressed by a later peak strictly higher.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Sorted positions of the peaks.
+    heights : np.ndarray
+        Heights of the peaks.
+    distance : int
+        Minimal distance between two peaks.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the kept peaks.
+    """
+    kept = np.ones(len(positions), dtype=bool)
+    # Range of the peaks closer than `distance` to each peak.
+    starts = np.searchsorted(positions, positions - distance, side='right')
+    ends = np.searchsorted(positions, positions + distance, side='left')
+    for i in np.lexsort((-positions, heights))[::-1]:
+        if kept[i]:
+            kept[starts[i]:ends[i]] = False
+            kept[i] = True
+    return kept
 
 
 def size_2_square(n: int) -> Tuple[int, int]:
@@ -729,11 +3633,14 @@ def sliding_window(sequence: Sequence, window_size: int, step: int):
     Each window is yielded. If there is a remainder, the remainder is yielded
     last, and will be smaller than the other windows.
 
+    Iterables without length, such as generators or files, are processed in
+    streaming by `sliding_window_iter`, and the windows are tuples.
+
     Parameters
     ----------
     sequence : Sequence
         Sequence to apply the sliding window on
-        (can be str, list, numpy.array, etc.).
+        (can be str, list, numpy.array, generator, etc.).
     window_size : int
         Size of the window to apply on the sequence.
     step : int
@@ -750,26 +3657,14 @@ def sliding_window(sequence: Sequence, window_size: int, step: int):
     ['ab', 'bc', 'cd', 'de', 'ef']
     >>> list(sliding_window(np.array([1, 2, 3, 4, 5, 6]), 5, 5))
     [array([1, 2, 3, 4, 5]), array([6])]
-    """
-    # Check for types.
-    try:
-        __ = iter(sequence)
-    except TypeError as e:
-        raise TypeError('Sequence must be iterable.') from e
 
-    if not isinstance(step, int):
-        raise TypeError('Step must be an integer.')
-    if not isinstance(window_size, int):
-        raise TypeError('Window size must be an integer.')
-    # Check for values.
-    if window_size < step or window_size <= 0:
-        raise ValueError('Window_size must be larger or equal '
-                         'than step and higher than 0.')
-    if step <= 0:
-        raise ValueError('Step must be higher than 0.')
-    if len(sequence) < window_size:
-        raise ValueError('Length of sequence must be larger '
-                         'or equal than window_size.')
+    For numpy arrays and Series, `sliding_window_np` returns all the windows
+    at once, as a single array without copy.
+    """
+    _check_sliding_window(sequence, window_size, step)
+    if not isinstance(sequence, abc.Sized):
+        yield from sliding_window_iter(sequence, window_size, step)
+        return
 
     nb_chunks = int(((len(sequence) - window_size) / step) + 1)
     mod = len(sequence) % window_size
@@ -780,6 +3675,568 @@ def sliding_window(sequence: Sequence, window_size: int, step: int):
         yield sequence[start:]
 
 
+def sliding_window_batches(data: Union[pd.DataFrame, np.ndarray], window_size: int, step: int,
+                           batch_size: int = 32, shuffle: bool = False,
+                           random_state: Optional[int] = None, prefetch: int = 1,
+                           dtype: Any = np.float32) -> Iterator[np.ndarray]:
+    """
+    Apply a sliding window over a DataFrame and yield the windows by batches, as 3-D arrays.
+
+    Data loader for the training of models on windows. The DataFrame is converted
+    to numpy only once, and the windows are taken from a strided view of the values
+    (see `sliding_window_np`). Each batch is a single array of shape
+    ``(batch_size, window_size, nb_features)``, copied from the view.
+    Only the full windows are used, the remainder of `sliding_window` is dropped.
+    The last batch is smaller if the number of windows is not a multiple of `batch_size`.
+
+    The next batches can be prepared by a background thread while the current one
+    is used, since the copy of the windows releases the GIL.
+
+    Parameters
+    ----------
+    data : pd.DataFrame or np.ndarray
+        DataFrame with the features as columns, or 2-D array.
+    window_size : int
+        Size of the window to apply on the rows.
+    step : int
+        Step for each sliding window.
+    batch_size : int, default 32
+        Number of windows per batch.
+    shuffle : bool, default False
+        If True, the order of the windows is shuffled.
+    random_state : int, default None
+        Seed of the shuffling of the windows.
+    prefetch : int, default 1
+        Number of batches prepared in advance by a background thread.
+        If 0, the batches are prepared when requested.
+    dtype : np.dtype, default np.float32
+        Type of the values of the batches.
+
+    Yields
+    ------
+    np.ndarray
+        Batch of windows, of shape ``(batch_size, window_size, nb_features)``.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'a': range(6), 'b': range(10, 16)})
+    >>> [batch.shape for batch in sliding_window_batches(df, 3, 1, batch_size=3)]
+    [(3, 3, 2), (1, 3, 2)]
+    >>> next(sliding_window_batches(df, 3, 1, batch_size=3))[1]
+    array([[ 1., 11.],
+           [ 2., 12.],
+           [ 3., 13.]], dtype=float32)
+    """
+    if batch_size <= 0:
+        raise ValueError('Batch size must be higher than 0.')
+    values = np.asarray(data, dtype=dtype)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    windows, __ = sliding_window_np(values, window_size, step)
+
+    positions = np.arange(len(windows))
+    if shuffle:
+        np.random.default_rng(random_state).shuffle(positions)
+    batches = (windows[positions[i:i + batch_size]]
+               for i in range(0, len(positions), batch_size))
+    if prefetch <= 0:
+        yield from batches
+        return
+
+    # The thread puts the batches in the queue, followed by None at the end
+    # or by the exception raised.
+    batches_queue: queue.Queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def _producer():
+        try:
+            for batch in batches:
+                batches_queue.put(batch)
+                if stop.is_set():
+                    return
+            batches_queue.put(None)
+        except Exception as e:
+            batches_queue.put(e)
+
+    thread = threading.Thread(target=_producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches_queue.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        # If the generator is closed before the end, unblock and stop the thread.
+        stop.set()
+        while thread.is_alive():
+            try:
+                batches_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def sliding_window_iter(iterable: Iterable, window_size: int, step: int) -> Iterator[Tuple]:
+    """
+    Apply a sliding window over any iterable, in streaming.
+
+    Streaming version of `sliding_window`, for iterables that cannot be sliced or
+    whose length is unknown, such as generators, files or sockets. The values are
+    read one step at a time and only the last ``2 * window_size`` values are kept,
+    in a ring buffer, hence the memory used is ``O(window_size)`` whatever the
+    length of the iterable.
+
+    The windows, and the remainder yielded last, are the same as the ones of
+    `sliding_window`, as tuples.
+
+    Parameters
+    ----------
+    iterable : Iterable
+        Iterable to apply the sliding window on.
+    window_size : int
+        Size of the window to apply on the iterable.
+    step : int
+        Step for each sliding window.
+
+    Yields
+    ------
+    tuple
+        Values of the window.
+
+    Examples
+    --------
+    >>> list(sliding_window_iter(iter('abcdefgh'), 6, 4))
+    [('a', 'b', 'c', 'd', 'e', 'f'), ('e', 'f', 'g', 'h')]
+    >>> with open('data.txt') as f:  # doctest: +SKIP
+    ...     for lines in sliding_window_iter(f, 100, 50):
+    ...         process(lines)
+    """
+    _check_sliding_window(iterable, window_size, step)
+
+    iterator = iter(iterable)
+    window = tuple(islice(iterator, window_size))
+    if len(window) < window_size:
+        raise ValueError('Length of sequence must be larger '
+                         'or equal than window_size.')
+    # The remainder can start before the last window, up to `window_size` values,
+    # hence the last values are also kept in a ring buffer.
+    buffer: Deque = deque(window, maxlen=2 * window_size)
+
+    nb_values = window_size
+    while True:
+        yield window
+        values = tuple(islice(iterator, step))
+        buffer.extend(values)
+        nb_values += len(values)
+        if len(values) < step:
+            break
+        window = window[step:] + values
+
+    mod = nb_values % window_size
+    if mod:
+        yield tuple(islice(buffer, len(buffer) - (window_size - step + mod), None))
+
+
+def sliding_window_np(array: Union[np.ndarray, pd.Series], window_size: int,
+                      step: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Apply a sliding window over a numpy array, without copying it.
+
+    Vectorized version of `sliding_window`. All the full windows are returned
+    as a single read-only view on the array, with strides, of shape
+    ``(nb_windows, window_size)`` for a 1-D array. Features of the windows
+    can then be computed in one call, e.g. ``windows.mean(axis=1)``.
+
+    The remainder, smaller than the other windows, is the same as the last
+    window yielded by `sliding_window`. It is returned separately since it
+    does not fit in the array of windows.
+
+    Parameters
+    ----------
+    array : np.ndarray or pd.Series
+        Array to apply the sliding window on, along the first axis.
+    window_size : int
+        Size of the window to apply on the array.
+    step : int
+        Step for each sliding window.
+
+    Returns
+    -------
+    windows : np.ndarray
+        View of the array with the windows along the first axis.
+    remainder : np.ndarray or None
+        Last window, smaller than the others, or None if there is no remainder.
+
+    Examples
+    --------
+    >>> windows, remainder = sliding_window_np(np.array([1, 2, 3, 4, 5, 6, 7]), 3, 2)
+    >>> windows
+    array([[1, 2, 3],
+           [3, 4, 5],
+           [5, 6, 7]])
+    >>> remainder
+    array([6, 7])
+    >>> windows.sum(axis=1)
+    array([ 6, 12, 18])
+    """
+    _check_sliding_window(array, window_size, step)
+    array = np.asarray(array)
+
+    nb_chunks = (len(array) - window_size) // step + 1
+    windows = np.lib.stride_tricks.as_strided(
+        array, shape=(nb_chunks, window_size) + array.shape[1:],
+        strides=(array.strides[0] * step,) + array.strides, writeable=False)
+    mod = len(array) % window_size
+    remainder = array[len(array) - (window_size - step) - mod:] if mod else None
+    return windows, remainder
+
+
+def sliding_window_time(pd_obj: Union[pd.DataFrame, pd.Series],
+                        window: Union[str, pd.Timedelta],
+                        step: Union[str, pd.Timedelta]) -> Iterator[Union[pd.DataFrame, pd.Series]]:
+    """
+    Apply a sliding window of fixed duration over a DataFrame or Series with datetime as index.
+
+    Time-based version of `sliding_window`, for irregularly sampled data: each window
+    covers the same time span, ``[start, start + window)``, whatever the number of rows.
+    The windows start at the first date and every `step` after, until the end of the
+    index is reached.
+
+    The bounds of all the windows are computed at once by `sliding_window_time_bounds`,
+    and each window is a positional slice of the object, without filtering the index.
+
+    Parameters
+    ----------
+    pd_obj : pd.DataFrame or pd.Series
+        Object to apply the sliding window on, with a sorted datetime index.
+    window : str or pd.Timedelta
+        Duration of the windows, e.g. '5min'.
+    step : str or pd.Timedelta
+        Duration between the start of two windows, e.g. '1min'.
+
+    Yields
+    ------
+    pd.DataFrame or pd.Series
+        Rows of the window. Windows without rows are empty.
+
+    Examples
+    --------
+    >>> dates = pd.to_datetime(['2019-06-20 00:00', '2019-06-20 00:01', '2019-06-20 00:04',
+    ...                         '2019-06-20 00:05', '2019-06-20 00:09'])
+    >>> s = pd.Series([1, 2, 3, 4, 5], index=dates)
+    >>> [window.tolist() for window in sliding_window_time(s, '5min', '3min')]
+    [[1, 2, 3], [3, 4], [5]]
+    """
+    __, starts, stops = sliding_window_time_bounds(pd_obj.index, window, step)
+    for start, stop in zip(starts, stops):
+        yield pd_obj.iloc[start:stop]
+
+
+def sliding_window_time_bounds(index: pd.DatetimeIndex, window: Union[str, pd.Timedelta],
+                               step: Union[str, pd.Timedelta]
+                               ) -> Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+    """
+    Get the bounds of sliding windows of fixed duration over a datetime index.
+
+    The windows are ``[start, start + window)``, starting at the first date and every
+    `step` after. The last window is the first one reaching the end of the index, so
+    all the dates are in at least one window.
+    The positions of the bounds are found with a single vectorized `searchsorted`
+    over the index, so features of the windows can be computed without a loop,
+    e.g. with cumulative sums.
+
+    Parameters
+    ----------
+    index : pd.DatetimeIndex
+        Sorted index to apply the sliding window on.
+    window : str or pd.Timedelta
+        Duration of the windows, e.g. '5min'.
+    step : str or pd.Timedelta
+        Duration between the start of two windows, e.g. '1min'.
+
+    Returns
+    -------
+    dates : pd.DatetimeIndex
+        Start date of each window.
+    starts : np.ndarray
+        Position in the index of the first row of each window.
+    stops : np.ndarray
+        Position in the index after the last row of each window.
+
+    Raises
+    ------
+    ValueError
+        If the window or the step is not positive or if the index is not sorted.
+
+    Examples
+    --------
+    >>> dates = pd.to_datetime(['2019-06-20 00:00', '2019-06-20 00:01', '2019-06-20 00:04',
+    ...                         '2019-06-20 00:05', '2019-06-20 00:09'])
+    >>> __, starts, stops = sliding_window_time_bounds(dates, '5min', '3min')
+    >>> starts, stops
+    (array([0, 2, 4]), array([3, 4, 5]))
+    >>> cumsum = np.concatenate([[0], np.cumsum([1, 2, 3, 4, 5])])
+    >>> (cumsum[stops] - cumsum[starts]) / (stops - starts)
+    array([2. , 3.5, 5. ])
+    """
+    assert isinstance(index, pd.DatetimeIndex), 'Index must be a datetime index.'
+    window, step = pd.Timedelta(window), pd.Timedelta(step)
+    if window <= pd.Timedelta(0) or step <= pd.Timedelta(0):
+        raise ValueError('Window and step must be positive durations.')
+    if not index.is_monotonic_increasing:
+        raise ValueError('Index must be sorted.')
+    if index.empty:
+        return index[:0], np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    span = index[-1] - index[0]
+    nb_windows = max(0, (span - window) // step + 1) + 1
+    dates = pd.date_range(index[0], periods=nb_windows, freq=step)
+    bounds = index.searchsorted(dates.append(dates + window))
+    return dates, bounds[:nb_windows], bounds[nb_windows:]
+
+
+def _smallest_int_dtype(min_value: int, max_value: int, nullable: bool = False,
+                        unsigned: bool = False) -> Optional[Any]:
+    """
+    Get the smallest integer type able to store the given range.
+
+    Signed types are used, except `uint64` for positive values too large for `int64`.
+
+    Parameters
+    ----------
+    min_value : int
+        Minimum value to store.
+    max_value : int
+        Maximum value to store.
+    nullable : bool, default False
+        If True, return the nullable integer type of pandas (e.g. `Int8`).
+    unsigned : bool, default False
+        If True, use unsigned types if `min_value` is not negative.
+
+    Returns
+    -------
+    np.dtype or str or None
+        The smallest integer type, None if no integer type can store the range.
+    """
+    # Comparing `uint64` with signed integers in NumPy goes through floats, hence Python ints.
+    min_value, max_value = int(min_value), int(max_value)
+    int_types = [np.int8, np.int16, np.int32, np.int64, np.uint64]
+    if unsigned:
+        int_types = [np.uint8, np.uint16, np.uint32, np.uint64] if min_value >= 0 else int_types
+    for int_type in int_types:
+        if np.iinfo(int_type).min <= min_value and max_value <= np.iinfo(int_type).max:
+            name = np.dtype(int_type).name
+            if nullable:
+                # Names of the nullable types of pandas, e.g. `Int8` or `UInt8`.
+                return name.replace('uint', 'UInt').replace('int', 'Int')
+            return np.dtype(int_type)
+    return None
+
+
+def start_async_logging(logger: Optional[logging.Logger] = None,
+                        maxsize: int = 0) -> logging.handlers.QueueListener:
+    """
+    Move the handlers of a logger to a background thread.
+
+    The handlers of the logger are replaced by a single handler putting the records
+    in a queue. A listener, in a background thread, passes them to the original handlers.
+    The logging calls, for instance in `log_df`, then do not wait on the I/O of the
+    handlers (files, streams, network) anymore.
+
+    The original handlers are restored with `stop_async_logging`, which also
+    flushes the records left in the queue.
+
+    Parameters
+    ----------
+    logger : logging.Logger, default None
+        Logger whose handlers are moved. If None, the root logger, which has the
+        handlers of the configuration of bff.
+    maxsize : int, default 0
+        Maximum number of records in the queue. If 0, the queue is unbounded and
+        logging never blocks.
+
+    Returns
+    -------
+    logging.handlers.QueueListener
+        Listener running in the background.
+
+    Raises
+    ------
+    ValueError
+        If the asynchronous logging is already started on the logger.
+
+    Examples
+    --------
+    >>> listener = start_async_logging()
+    >>> df_res = df.pipe(log_df).assign(E=2).pipe(log_df)
+    >>> stop_async_logging()
+    """
+    logger = logger if logger is not None else logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) and hasattr(h, 'listener')
+           for h in logger.handlers):
+        raise ValueError('Asynchronous logging is already started on this logger.')
+    handlers = list(logger.handlers)
+    records: queue.Queue = queue.Queue(maxsize)
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    handler = logging.handlers.QueueHandler(records)
+    handler.listener = listener  # type: ignore
+    for h in handlers:
+        logger.removeHandler(h)
+    logger.addHandler(handler)
+    listener.start()
+    return listener
+
+
+def stop_async_logging(logger: Optional[logging.Logger] = None) -> None:
+    """
+    Stop the asynchronous logging started with `start_async_logging`.
+
+    The records left in the queue are handled and the original handlers
+    are restored on the logger. Does nothing if the asynchronous logging
+    is not started on the logger.
+
+    Parameters
+    ----------
+    logger : logging.Logger, default None
+        Logger given to `start_async_logging`. If None, the root logger.
+    """
+    logger = logger if logger is not None else logging.getLogger()
+    for handler in list(logger.handlers):
+        listener = getattr(handler, 'listener', None)
+        if isinstance(handler, logging.handlers.QueueHandler) and listener is not None:
+            # Stopping the listener handles all the remaining records.
+            listener.stop()
+            logger.removeHandler(handler)
+            for h in listener.handlers:
+                logger.addHandler(h)
+
+
+def track_memory(func: Optional[Union[Callable, str]] = None, *, name: Optional[str] = None,
+                 registry: Optional[MemoryRegistry] = None, trace: bool = True,
+                 interval: float = 0.01) -> Any:
+    """
+    Measure the memory of a function or of a block of code.
+
+    Can be used as a decorator, with or without arguments, or as a context manager.
+    For each call, a record is added to the registry with:
+
+    * `peak_rss_mb`: peak resident set size (RSS) of the process during the call,
+      sampled every `interval` seconds and exact if it is the peak of the process,
+    * `rss_delta_mb`: difference of RSS between the end and the start of the call,
+    * `peak_traced_mb`: peak of the memory allocated by Python and numpy during the call,
+      above the memory at the start, measured with `tracemalloc`,
+    * `retained_mb`: memory allocated during the call and not freed at its end,
+    * `children_peak_rss_mb`: peak RSS of the child processes terminated during the call,
+      e.g. the workers of `pipe_multiprocessing_pd`, if it exceeds the peak of the
+      previous children of the process (else NaN).
+
+    All the measures are process-wide: the RSS is the one of the process and `tracemalloc`
+    traces the allocations of all the threads, so the allocations of the other threads
+    during the call are counted as well. Calls can be nested and run in several threads,
+    `tracemalloc` is stopped when the last call tracing it ends, if it was started by them.
+
+    Parameters
+    ----------
+    func : Callable or str, default None
+        Function to decorate, or name of the record.
+    name : str, default None
+        Name of the record. By default, the name of the decorated function.
+    registry : MemoryRegistry, default None
+        Registry of the records. If None, `MEMORY_REGISTRY` is used.
+    trace : bool, default True
+        If True, trace the allocations with `tracemalloc`, which slows them down.
+        If False, only the RSS is measured.
+    interval : float, default 0.01
+        Interval in seconds between the samples of the RSS.
+
+    Returns
+    -------
+    Callable or context manager
+        Decorated function or context manager.
+
+    Examples
+    --------
+    >>> @track_memory
+    ... def load():
+    ...     return pd.DataFrame(np.zeros((1_000_000, 10)))
+    >>> df = load()
+    >>> with track_memory('process'):
+    ...     df_res = (df + 1).cumsum()
+    >>> MEMORY_REGISTRY.to_frame()[['name', 'peak_rss_mb', 'retained_mb']]
+          name  peak_rss_mb  retained_mb
+    0     load   235.109375    76.294...
+    1  process   353.453125    76.318...
+    >>> MEMORY_REGISTRY.exceeded(peak_rss_mb=300)['name'].tolist()
+    ['process']
+    """
+    if isinstance(func, str):
+        func, name = None, func
+    tracker = _MemoryTracker(name, registry, trace, interval)
+    return tracker(func) if func is not None else tracker
+
+
+def _unflatten_dict(items: Iterable[Tuple[Tuple, Any]]) -> Dict:
+    """
+    Rebuild a nested dictionary from its key paths.
+
+    Parameters
+    ----------
+    items : iterable of tuple
+        Path of the keys, see `_dict_paths`, and value of each leaf.
+        An empty dictionary as value creates an empty dictionary.
+
+    Returns
+    -------
+    dict
+        Nested dictionary.
+
+    Raises
+    ------
+    ValueError
+        If a path is both a leaf and a dictionary.
+    """
+    res: Dict = {}
+    for path, value in items:
+        node = res
+        for i, key in enumerate(path):
+            is_dict = i < len(path) - 1 or isinstance(value, dict)
+            child = node.setdefault(key, {} if is_dict else value)
+            if isinstance(child, dict) != is_dict:
+                raise ValueError(f'Key path {path[:i + 1]} is a value in some dictionaries '
+                                 'and a dictionary in others.')
+            node = child
+    return res
+
+
+def _union_categories(cats: Sequence[pd.Series],
+                      sort_categories: bool = True) -> pd.CategoricalDtype:
+    """
+    Get the categorical type having the union of the categories of all the given Series.
+
+    Parameters
+    ----------
+    cats : sequence of pd.Series
+        Categorical Series to get the categories from.
+    sort_categories : bool, default True
+        If True, sort the union of the categories, otherwise keep their order of appearance.
+
+    Returns
+    -------
+    pd.CategoricalDtype
+        Categorical type with the union of all the categories.
+    """
+    # Union of the categories only, `union_categoricals` would also hash them to compare the types.
+    indexes = [s.cat.categories for s in cats]
+    if sort_categories and len(indexes) == 2:
+        # Categories are usually sorted already, their union is then merged without sorting.
+        return pd.CategoricalDtype(indexes[0].union(indexes[1]))
+    # A single pass for any number of Series, a fold of pairwise unions is quadratic.
+    union = indexes[0].append(indexes[1:]).unique()
+    return pd.CategoricalDtype(union.sort_values() if sort_categories else union)
+
+
 def value_2_list(value: Any) -> Sequence:
     """
     Convert a single value into a list with a single value.
@@ -0,0 +1,252 @@
+"""
+CategoryRegistry, persistent dictionaries of categories.
+
+Tool to store the categories of categorical columns on disk, in order to have
+stable codes across chunks, processes and runs.
+"""
+from collections.abc import Mapping
+import json
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+from urllib.parse import quote, unquote
+import pandas as pd
+
+from .fancy import recode_categorical
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # File locking is not available on Windows.
+    fcntl = None  # type: ignore
+
+
+class CategoryRegistry(Mapping):
+    """
+    Class to store append-only dictionaries of categories on disk.
+
+    This class behaves like a read-only dictionary with the name of the columns
+    as keys and their categories as values.
+
+    Each column has its own dictionary of categories, stored as a file with one
+    category per line (in json format) in the directory of the registry.
+    The name of the file is the name of the column, or its json representation,
+    prefixed by ``=``, if the name is not a string, so that the type of the names
+    is preserved (the column ``1`` is not the column ``'1'``).
+    Categories are only appended, never removed nor reordered, hence the code of a
+    value never changes. Frames encoded with the same registry, in any process and
+    at any time, can be concatenated without recoding their values.
+
+    Files are locked when new categories are appended or read, so several processes
+    can share the same registry. Only complete lines are read, in case the lock is
+    not available.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> registry = CategoryRegistry('/tmp/categories')
+    >>> df_a = pd.DataFrame({'country': ['China', 'Switzerland', 'China']})
+    >>> df_b = pd.DataFrame({'country': ['Italy', 'China']})
+    >>> registry.encode(df_a, columns=['country'])['country'].cat.codes.tolist()
+    [0, 1, 0]
+    >>> registry.encode(df_b, columns=['country'])['country'].cat.codes.tolist()
+    [2, 0]
+    >>> registry['country']
+    ['China', 'Switzerland', 'Italy']
+    >>> registry.concat([df_a, df_b], ignore_index=True)['country'].cat.codes.tolist()
+    [0, 1, 0, 2, 0]
+    """
+
+    def __init__(self, path: Path = Path.home().joinpath('.config/bff/categories')):
+        """
+        Initialization of the registry.
+
+        If the directory of the registry does not exist, create it.
+
+        Parameters
+        ----------
+        path : Path, default '~/.config/bff/categories'
+            Directory to store the dictionaries of categories.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._categories: Dict[Hashable, List[Any]] = {}
+        self._offsets: Dict[Hashable, int] = {}
+
+    def __getitem__(self, column: Hashable) -> List[Any]:
+        """Getter of the class, categories of the column."""
+        if not self._path_column(column).exists():
+            raise KeyError(column)
+        self._sync(column)
+        return list(self._categories[column])
+
+    def __iter__(self):
+        """Iterator of the class, over the registered columns."""
+        return iter(self._column_path(path) for path in sorted(self.path.glob('*.jsonl')))
+
+    def __len__(self):
+        """Number of registered columns."""
+        return len(list(self.path.glob('*.jsonl')))
+
+    def __repr__(self):
+        """Representation of the registry."""
+        return f'{self.__class__.__name__}({str(self.path)!r})'
+
+    @staticmethod
+    def _column_path(path: Path) -> Hashable:
+        """Column of the file storing its categories, inverse of `_path_column`."""
+        name = unquote(path.stem)
+        if not name.startswith('='):
+            return name
+        # Json has no tuples, lists are the names of the columns of a MultiIndex.
+        return _tuples(json.loads(name[1:]))
+
+    def _path_column(self, column: Hashable) -> Path:
+        """Path of the file storing the categories of the column."""
+        # The character `=` is always escaped by `quote`, hence never the start of a string name.
+        name = column if isinstance(column, str) else f'={json.dumps(column)}'
+        return self.path.joinpath(f'{quote(name, safe="")}.jsonl')
+
+    def _read_new_lines(self, column: Hashable, f) -> None:
+        """Read the complete categories appended to the binary file since the last read."""
+        offset = self._offsets.get(column, 0)
+        f.seek(offset)
+        data = f.read()
+        # A line being written by another process without lock is read at the next sync.
+        data = data[:data.rfind(b'\n') + 1]
+        self._categories.setdefault(column, []).extend(
+            json.loads(line) for line in data.decode('utf-8').splitlines())
+        self._offsets[column] = offset + len(data)
+
+    def _sync(self, column: Hashable) -> None:
+        """Load the categories added on disk, by this or another process."""
+        path = self._path_column(column)
+        if path.exists():
+            with path.open(mode='rb') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                self._read_new_lines(column, f)
+        else:
+            self._categories.setdefault(column, [])
+
+    def dtype(self, column: Hashable) -> pd.CategoricalDtype:
+        """
+        Get the categorical type of a column, with all its registered categories.
+
+        Parameters
+        ----------
+        column : str
+            Name of the column.
+
+        Returns
+        -------
+        pd.CategoricalDtype
+            Categorical type of the column.
+        """
+        self._sync(column)
+        return pd.CategoricalDtype(self._categories[column])
+
+    def register(self, column: Hashable, values: Iterable[Any]) -> pd.CategoricalDtype:
+        """
+        Add the values not registered yet to the categories of a column.
+
+        Values must be json serializable. New values are appended at the end of the categories.
+
+        Parameters
+        ----------
+        column : str
+            Name of the column.
+        values : iterable
+            Values of the column to register.
+
+        Returns
+        -------
+        pd.CategoricalDtype
+            Categorical type of the column, with all its registered categories.
+        """
+        values = pd.Index(values).dropna().unique()
+        self._sync(column)
+        if values.difference(self._categories[column]).empty:
+            return pd.CategoricalDtype(self._categories[column])
+
+        with self._path_column(column).open(mode='a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            # Other processes may have appended categories since the last sync.
+            self._read_new_lines(column, f)
+            new_values = values.difference(self._categories[column], sort=False)
+            f.write(''.join(f'{json.dumps(value)}\n' for value in new_values.tolist())
+                    .encode('utf-8'))
+            f.flush()
+            self._categories[column].extend(new_values.tolist())
+            self._offsets[column] = f.tell()
+        return pd.CategoricalDtype(self._categories[column])
+
+    def encode(self, df: pd.DataFrame,
+               columns: Optional[Sequence[Hashable]] = None) -> pd.DataFrame:
+        """
+        Cast columns of a DataFrame to ``category`` with the categories of the registry.
+
+        Values not registered yet are added to the registry.
+
+        Columns already encoded with the registry are not recoded, only their
+        type is extended with the categories registered since.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame to encode.
+        columns : sequence of str, default None
+            Columns to encode. If None, encode the categorical columns and
+            the columns already present in the registry.
+
+        Returns
+        -------
+        pd.DataFrame
+            Copy of the DataFrame with the encoded columns. Other columns are not copied.
+        """
+        if columns is None:
+            columns = [col for col in df.columns
+                       if (pd.api.types.is_categorical_dtype(df[col].dtype)
+                           or self._path_column(col).exists())]
+        df_res = df.copy(deep=False)
+        for col in columns:
+            values = (df[col].values if pd.api.types.is_categorical_dtype(df[col].dtype)
+                      else pd.Categorical(df[col]))
+            cat_type = self.register(col, values.categories)
+            if cat_type.categories[:len(values.categories)].equals(values.categories):
+                # Already encoded with the registry, the codes are unchanged.
+                df_res[col] = pd.Categorical.from_codes(values.codes, dtype=cat_type)
+            else:
+                df_res[col] = recode_categorical(values, cat_type)
+        return df_res
+
+    def concat(self, dfs: Iterable[pd.DataFrame],
+               columns: Optional[Sequence[Hashable]] = None, **kwargs) -> pd.DataFrame:
+        """
+        Concatenation of DataFrames encoded with the registry.
+
+        All DataFrames are encoded with the same, complete, categories before the
+        concatenation, so the categorical columns are preserved.
+
+        Parameters
+        ----------
+        dfs : iterable of pd.DataFrame
+            DataFrames to concatenate.
+        columns : sequence of str, default None
+            Columns to encode, see `encode`.
+        **kwargs
+            Additional keyword arguments to be passed to the `pd.concat` function.
+
+        Returns
+        -------
+        pd.DataFrame
+            Concatenation of the DataFrames.
+        """
+        # First pass registers all the values, second pass gives the complete types.
+        frames = [self.encode(df, columns) for df in dfs]
+        return pd.concat([self.encode(df, columns) for df in frames], **kwargs)
+
+
+def _tuples(value: Any) -> Any:
+    """Convert the lists of a value loaded from json into tuples, recursively."""
+    return tuple(map(_tuples, value)) if isinstance(value, list) else value
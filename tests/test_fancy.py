@@ -4,6 +4,12 @@
 This module test the various functions present in the Fancy module.
 """
 import datetime
+import logging
+import math
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
 import unittest
 import unittest.mock
 import sys
@@ -13,12 +19,20 @@ from numpy.testing import assert_array_equal
 import pandas as pd
 from pandas.api.types import CategoricalDtype
 import pandas.util.testing as tm
-from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import classification_report
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
 
-from bff.fancy import (avg_dicts, cast_to_category_pd, concat_with_categories, get_peaks,
-                       idict, kwargs_2_list, log_df, mem_usage_pd, normalization_pd,
-                       parse_date, pipe_multiprocessing_pd, size_2_square,
-                       sliding_window, value_2_list)
+import bff.fancy
+from bff.fancy import (avg_dicts, avg_nested_dicts, BiDict, cast_to_category_pd,
+                       concat_with_categories, DictAverager, DtypePlan, get_peaks,
+                       get_peaks_memmap, get_peaks_pd, idict, kwargs_2_list, log_df, map_windows,
+                       mem_footprint, mem_usage_pd, MEMORY_REGISTRY, MemoryRegistry,
+                       merge_with_categories, normalization_pd, NormalizationPlan,
+                       optimize_dtypes_pd, parse_date, PeakDetector, pipe_multiprocessing_pd,
+                       PipelineProfiler, read_sql_by_chunks, recode_categorical, size_2_square,
+                       sliding_window, sliding_window_batches, sliding_window_iter,
+                       sliding_window_np, sliding_window_time, sliding_window_time_bounds,
+                       start_async_logging, stop_async_logging, track_memory, value_2_list)
 
 
 def df_dummy_func_one(df, i=1):
@@ -82,6 +96,95 @@ class TestFancy(unittest.TestCase):
         self.assertRaises(TypeError, avg_dicts, dic_std_a, dic_str_f)
         self.assertRaises(TypeError, avg_dicts, dic_std_a, dic_std_b, dic_str_g)
 
+        # Test with negative values.
+        self.assertEqual(avg_dicts({'a': -1, 'b': 2}, {'a': -2}), {'a': -1.5, 'b': 1.})
+
+    def test_avg_nested_dicts(self):
+        """
+        Test of the `avg_nested_dicts` function.
+        """
+        rng = np.random.RandomState(42)
+        reports = []
+        for __ in range(10):
+            y_true = rng.randint(0, 5, 100)
+            y_pred = np.where(rng.rand(100) < 0.7, y_true, rng.randint(0, 5, 100))
+            reports.append(classification_report(y_true, y_pred, output_dict=True))
+        res = avg_nested_dicts(*reports)
+        # Should have the same structure and average each leaf as `avg_dicts`.
+        self.assertEqual(list(res.keys()), list(reports[0].keys()))
+        self.assertAlmostEqual(res['accuracy'],
+                               np.mean([report['accuracy'] for report in reports]))
+        for label in ('0', '4', 'macro avg'):
+            res_label = avg_dicts(*[report[label] for report in reports])
+            self.assertEqual(list(res[label].keys()), list(res_label.keys()))
+            for metric, value in res_label.items():
+                self.assertAlmostEqual(res[label][metric], value)
+
+        # Should work with dicts not having the same keys, missing values being 0.
+        self.assertEqual(avg_nested_dicts({'a': {'x': 1, 'y': {'z': 2}}}, {'a': {'x': 3}, 'b': 4}),
+                         {'a': {'x': 2., 'y': {'z': 1.}}, 'b': 2.})
+
+        # Should raise exception for values that are not numbers.
+        self.assertRaises(TypeError, avg_nested_dicts, {'a': {'x': 1}}, {'a': {'x': 'str'}})
+        self.assertRaises(TypeError, avg_nested_dicts, {'a': {'x': 1}}, {'a': {'x': [1, 2]}})
+        # Should keep the empty dicts and raise for keys being a value and a dict.
+        self.assertEqual(avg_nested_dicts({'a': {}, 'b': 1}, {'a': {'x': 2}, 'c': {}}),
+                         {'a': {'x': 1.}, 'b': 0.5, 'c': {}})
+        self.assertRaises(ValueError, avg_nested_dicts, {'a': 1}, {'a': {'x': 1}})
+        self.assertRaises(ValueError, avg_nested_dicts, {'a': {'x': 1}}, {'a': 1})
+        self.assertRaises(ValueError, avg_nested_dicts, {'a': 1}, {'a': {}})
+
+    def test_bidict(self):
+        """
+        Test of the `BiDict` class.
+        """
+        labels = BiDict({1: 'cat', 2: 'dog'})
+        self.assertEqual(labels[1], 'cat')
+        self.assertEqual(labels.inverse['dog'], 2)
+        # Both directions should be updated.
+        labels[3] = 'bird'
+        labels[1] = 'lion'
+        del labels[2]
+        self.assertEqual(dict(labels), {1: 'lion', 3: 'bird'})
+        self.assertEqual(dict(labels.inverse), {'lion': 1, 'bird': 3})
+        self.assertEqual(dict(labels.inverse), idict(dict(labels)))
+        # Values must be unique and hashable.
+        with self.assertRaises(ValueError):
+            labels[4] = 'bird'
+        self.assertRaises(ValueError, BiDict, {1: 'cat', 2: 'cat'})
+        self.assertRaises(TypeError, BiDict, {1: ['cat']})
+
+        # Should keep all the keys of a value with `multi`.
+        labels = BiDict({1: 'cat', 2: 'dog', 3: 'cat'}, multi=True)
+        self.assertEqual(labels.inverse['cat'], [1, 3])
+        labels[1] = 'dog'
+        self.assertEqual(labels.inverse['cat'], [3])
+        self.assertEqual(labels.inverse['dog'], [2, 1])
+        del labels[3]
+        self.assertNotIn('cat', labels.inverse)
+
+        # Compact dictionaries should behave the same.
+        values = np.array(['cat', 'dog', 'bird'])
+        labels = BiDict.from_array(values)
+        self.assertTrue(labels.is_compact)
+        self.assertEqual(dict(labels), {0: 'cat', 1: 'dog', 2: 'bird'})
+        self.assertEqual(dict(labels.inverse), {'cat': 0, 'dog': 1, 'bird': 2})
+        self.assertRaises(KeyError, labels.__getitem__, 3)
+        self.assertRaises(KeyError, labels.__getitem__, -1)
+        self.assertRaises(KeyError, labels.inverse.__getitem__, 'lion')
+        self.assertIs(type(labels[0]), str)
+        self.assertIs(labels.inverse, labels.inverse)
+        # Modifying a compact dictionary should convert it.
+        labels[3] = 'lion'
+        self.assertFalse(labels.is_compact)
+        self.assertEqual(labels.inverse['lion'], 3)
+        self.assertEqual(labels.inverse['bird'], 2)
+        self.assertRaises(ValueError, BiDict.from_array, ['cat', 'cat'])
+
+        labels = BiDict.from_array([5, 3, 5, 1], multi=True)
+        self.assertEqual(dict(labels.inverse), {5: [0, 2], 3: [1], 1: [3]})
+        self.assertIs(type(labels[0]), int)
+
     def test_cast_to_category_pd(self):
         """
         Test of the `cast_to_category_pd` function.
@@ -112,6 +215,24 @@ class TestFancy(unittest.TestCase):
         self.assertDictEqual(df_unhashable_optimized.dtypes.to_dict(),
                              optimized_types)
 
+        # Should convert the given DataFrame without copying it.
+        df_inplace = self.df.copy()
+        df_inplace_res = cast_to_category_pd(df_inplace, inplace=True)
+        self.assertIs(df_inplace_res, df_inplace)
+        self.assertTrue(pd.api.types.is_categorical_dtype(df_inplace['country']))
+        self.assertListEqual(list(df_inplace.columns), self.columns)
+        tm.assert_frame_equal(self.df, df_inplace, check_dtype=False, check_categorical=False)
+
+        # The memory overhead of the inplace conversion must be bounded by one column.
+        df_large = pd.DataFrame({f'col_{i}': [f'value_{j % 100}' for j in range(50_000)]
+                                 for i in range(3)})
+        column_size = df_large['col_0'].memory_usage(index=False, deep=True)
+        tracemalloc.start()
+        cast_to_category_pd(df_large, inplace=True)
+        __, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertLess(peak, column_size)
+
     def test_concat_with_categories(self):
         """
         Test of the `concat_with_categories` function.
@@ -146,6 +267,149 @@ class TestFancy(unittest.TestCase):
                                      columns=['name', 'size', 'country'])
         self.assertRaises(AssertionError, concat_with_categories, df_left_wrong, df_right)
 
+        # Should work with any number of DataFrames, given as an iterable.
+        df_other = pd.DataFrame([['Greg', 'green', 'Spain']],
+                                columns=columns).astype(column_types)
+        df_concat_many = concat_with_categories((df for df in [df_left, df_right, df_other]),
+                                                ignore_index=True)
+        self.assertEqual(df_concat_many.shape, (5, 3))
+        self.assertListEqual(df_concat_many['color'].cat.categories.tolist(),
+                             ['blue', 'green', 'red', 'yellow'])
+        tm.assert_frame_equal(df_concat_many.iloc[:4], df_res, check_categorical=False)
+        tm.assert_frame_equal(concat_with_categories(df_left, df_right, df_other,
+                                                     ignore_index=True),
+                              df_concat_many)
+        # Original DataFrames should be preserved.
+        self.assertListEqual(df_left['color'].cat.categories.tolist(), ['blue', 'red'])
+        # Should raise an exception if there is nothing to concatenate.
+        self.assertRaises(ValueError, concat_with_categories, [])
+
+        # Missing values should be preserved when the codes are remapped.
+        df_missing = pd.DataFrame([['Jim', None, 'China']],
+                                  columns=columns).astype(column_types)
+        df_concat_missing = concat_with_categories(df_right, df_missing, ignore_index=True)
+        self.assertListEqual(df_concat_missing['color'].isna().tolist(), [False, False, True])
+        self.assertListEqual(df_concat_missing['country'].cat.codes.tolist(), [1, 2, 0])
+        self.assertListEqual(df_right['country'].cat.codes.tolist(), [0, 1])
+
+    def test_dict_averager(self):
+        """
+        Test of the `DictAverager` class.
+        """
+        rng = np.random.RandomState(42)
+        dicts = [{key: rng.rand() + 1000 for key in 'abcd' if rng.rand() < 0.7}
+                 for __ in range(300)]
+        weights = rng.rand(300)
+
+        # Should give the same result one at a time, by buffer or all at once.
+        for buffer_size in (1, 64):
+            averager = DictAverager(buffer_size=buffer_size)
+            for d in dicts:
+                averager.update(d)
+            res = avg_dicts(*dicts)
+            self.assertEqual(averager.result().keys(), res.keys())
+            for key in res:
+                self.assertAlmostEqual(averager.result()[key], res[key])
+
+        # Should compute weighted mean, variance and count, missing values being 0.
+        averager = DictAverager()
+        averager.update_many(dicts[:100], weights[:100])
+        for d, weight in zip(dicts[100:], weights[100:]):
+            averager.update(d, weight)
+        self.assertEqual(len(averager), 4)
+        self.assertAlmostEqual(averager.total_weight, weights.sum())
+        for key in 'abcd':
+            values = np.array([d.get(key, 0.) for d in dicts])
+            mean = np.average(values, weights=weights)
+            self.assertAlmostEqual(averager.result()[key], mean)
+            self.assertAlmostEqual(averager.var()[key],
+                                   np.average((values - mean) ** 2, weights=weights))
+            self.assertEqual(averager.count()[key], sum(key in d for d in dicts))
+
+        self.assertRaises(TypeError, DictAverager().update_many, [{'a': 1}, {'a': 'str'}])
+        self.assertRaises(ValueError, DictAverager().update_many, [{'a': 1}], [1, 2])
+
+    def test_dtype_plan(self):
+        """
+        Test of the `DtypePlan` class.
+        """
+        df_first = pd.DataFrame({'age': [24, 20, 25, 23, 28],
+                                 'country': ['China', 'China', 'Switzerland', 'China', 'China'],
+                                 'date': pd.date_range('2019-06-20', periods=5).astype(str)})
+        plan = DtypePlan()
+        self.assertFalse(plan.fitted)
+        self.assertIs(plan.fit(df_first), plan)
+        self.assertTrue(plan.fitted)
+        self.assertDictEqual(plan.to_dict(),
+                             {'types': {'age': 'int8', 'country': 'category'},
+                              'categories': {'country': ['China', 'Switzerland']},
+                              'dates': ['date']})
+
+        # Unseen categories are appended, codes of known values are preserved.
+        df_next = pd.DataFrame({'age': [31, 22],
+                                'country': ['France', 'China'],
+                                'date': ['2019-06-25', '2019-06-26']})
+        df_next_res = plan.apply(df_next)
+        self.assertListEqual(df_next_res['country'].cat.categories.tolist(),
+                             ['China', 'Switzerland', 'France'])
+        self.assertListEqual(df_next_res['country'].cat.codes.tolist(), [2, 0])
+        # The categories of the plan are not modified.
+        self.assertListEqual(plan.categories['country'], ['China', 'Switzerland'])
+        self.assertEqual(df_next_res['age'].dtype, np.dtype('int8'))
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df_next_res['date']))
+        # Original DataFrame must not be modified.
+        self.assertEqual(df_next['country'].dtype, np.dtype('O'))
+
+        # Integers not fitting in the target should widen it.
+        df_large = pd.DataFrame({'age': [1_000], 'country': ['China'], 'date': ['2019-06-27']})
+        self.assertEqual(plan.apply(df_large)['age'].tolist(), [1_000])
+        self.assertEqual(plan.types['age'], 'int16')
+
+        # Missing values in a later chunk use the nullable types.
+        df_bool = pd.DataFrame({'age': [1, 2], 'married': [True, False]}).astype(object)
+        plan_bool = DtypePlan().fit(df_bool)
+        self.assertDictEqual(plan_bool.types, {'age': 'int8', 'married': 'bool'})
+        df_na = pd.DataFrame({'age': [3, None], 'married': [None, True]})
+        df_na_res = plan_bool.apply(df_na)
+        self.assertEqual(df_na_res['age'].dtype, pd.Int8Dtype())
+        self.assertEqual(df_na_res['married'].dtype, pd.BooleanDtype())
+        self.assertTrue(df_na_res['married'].isna()[0])
+        self.assertDictEqual(plan_bool.types, {'age': 'int8', 'married': 'bool'})
+
+        # Floats not stored exactly by the target should widen it to floats.
+        plan_float = DtypePlan().fit(pd.DataFrame({'a': [1., np.nan, 3.], 'b': [0.5, 1., 2.]}))
+        self.assertDictEqual(plan_float.types, {'a': 'Int8', 'b': 'float32'})
+        df_float = pd.DataFrame({'a': [1.5, np.nan, 3.], 'b': [1.1, 2., 3.]})
+        df_float_res = plan_float.apply(df_float)
+        tm.assert_frame_equal(df_float_res, df_float)
+        self.assertDictEqual(plan_float.types, {'a': 'float64', 'b': 'float64'})
+        # Values stored exactly keep the target.
+        plan_float = DtypePlan().fit(pd.DataFrame({'a': [1., np.nan, 3.], 'b': [0.5, 1., 2.]}))
+        df_float_res = plan_float.apply(pd.DataFrame({'a': [7., np.nan], 'b': [0.25, np.nan]}))
+        self.assertEqual(df_float_res['a'].dtype, pd.Int8Dtype())
+        self.assertEqual(df_float_res['b'].dtype, np.dtype('float32'))
+
+        # Should be serializable.
+        plan_restored = DtypePlan.from_dict(plan.to_dict())
+        self.assertTrue(plan_restored.fitted)
+        self.assertDictEqual(plan_restored.to_dict(), plan.to_dict())
+        tm.assert_frame_equal(plan_restored.apply(df_next), plan.apply(df_next))
+
+        # Should fit on the first chunk of `read_sql_by_chunks`.
+        cnxn = sqlite3.connect(':memory:')
+        pd.concat([df_first, df_next], ignore_index=True).to_sql('people', cnxn, index=False)
+        plan_sql = DtypePlan()
+        df_sql = read_sql_by_chunks('SELECT * FROM people', cnxn, chunksize=5,
+                                    column_types=plan_sql)
+        self.assertTrue(plan_sql.fitted)
+        self.assertEqual(df_sql.shape, (7, 3))
+        self.assertEqual(df_sql['age'].dtype, np.dtype('int8'))
+        # Categories are not sorted again, the codes of the first chunk are kept.
+        self.assertListEqual(df_sql['country'].cat.categories.tolist(),
+                             ['China', 'Switzerland', 'France'])
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df_sql['date']))
+        cnxn.close()
+
     def test_get_peaks(self):
         """
         Test of the `get_peaks` function.
@@ -168,6 +432,72 @@ class TestFancy(unittest.TestCase):
         # Check assertion if index is not of type `datetime`.
         self.assertRaises(AssertionError, get_peaks, pd.Series(values, index=range(len(values))))
 
+    def test_get_peaks_memmap(self):
+        """
+        Test of the `get_peaks_memmap` function.
+        """
+        rng = np.random.RandomState(42)
+        values = np.cumsum(rng.randn(5000))
+        s = pd.Series(values, index=pd.date_range('2019-06-20', periods=len(values), freq='T'))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = f'{tmp_dir}/values.npy'
+            np.save(path, values)
+            mmap = np.load(path, mmap_mode='r')
+
+            # With a sample larger than the array, same peaks as `get_peaks`.
+            peak_dates, peak_values = get_peaks(s, distance_scale=0.01)
+            for block_size in (7, 100, 5000):
+                positions, heights = get_peaks_memmap(mmap, distance_scale=0.01,
+                                                      block_size=block_size)
+                assert_array_equal(s.index.values[positions], peak_dates)
+                assert_array_equal(heights, peak_values)
+
+            # With a sampled quantile, peaks are higher than the estimated quantile.
+            positions, heights = get_peaks_memmap(mmap, distance_scale=0.01, block_size=100,
+                                                  sample_size=500, random_state=0)
+            assert_array_equal(heights, values[positions])
+            self.assertTrue((np.diff(positions) >= 50).all())
+            self.assertLess(abs(len(positions) - len(peak_dates)), 5)
+            del mmap
+
+            # Plateaus and peaks of the same height at the edges of the blocks.
+            values_ties = np.round(np.cumsum(rng.randn(20_000)))
+            s_ties = pd.Series(values_ties,
+                               index=pd.date_range('2019-06-20', periods=20_000, freq='T'))
+            np.save(path, values_ties)
+            mmap = np.load(path, mmap_mode='r')
+            peak_dates, peak_values = get_peaks(s_ties, distance_scale=0.001)
+            for block_size in (3, 1000):
+                positions, heights = get_peaks_memmap(mmap, distance_scale=0.001,
+                                                      block_size=block_size)
+                assert_array_equal(s_ties.index.values[positions], peak_dates)
+                assert_array_equal(heights, peak_values)
+            del mmap
+
+    def test_get_peaks_pd(self):
+        """
+        Test of the `get_peaks_pd` function.
+        """
+        values = [4, 5, 9, 3, 2, 1, 2, 1, 3, 4, 12, 9, 6, 3, 2, 4, 5]
+        dates = pd.date_range('2019-06-20', periods=len(values), freq='T')
+        rng = np.random.RandomState(42)
+        df = pd.DataFrame({'a': values, 'b': rng.randn(len(values)), 'c': values[::-1]},
+                          index=dates)
+
+        for nb_proc in (1, 2):
+            df_peaks = get_peaks_pd(df, nb_proc=nb_proc)
+            self.assertListEqual(list(df_peaks.columns), ['column', 'date', 'height'])
+            # Should give the same peaks as `get_peaks` on each column.
+            for col in df.columns:
+                peak_dates, peak_values = get_peaks(df[col])
+                df_col = df_peaks[df_peaks['column'] == col]
+                assert_array_equal(df_col['date'].values, peak_dates)
+                assert_array_equal(df_col['height'].values, peak_values)
+
+        # Check assertion if index is not of type `datetime`.
+        self.assertRaises(AssertionError, get_peaks_pd, df.reset_index(drop=True))
+
     def test_idict(self):
         """
         Test of the `idict` function.
@@ -212,6 +542,11 @@ class TestFancy(unittest.TestCase):
 
         All tests of logger are done using a mock.
         """
+        logger = logging.getLogger('bff.fancy')
+        level = logger.level
+        self.addCleanup(logger.setLevel, level)
+        logger.setLevel(logging.INFO)
+
         # Should work directly on a DataFrame.
         with unittest.mock.patch('logging.Logger.info') as mock_logging:
             log_df(self.df)
@@ -234,6 +569,100 @@ class TestFancy(unittest.TestCase):
                       )
             mock_logging.assert_called_with(f'My df: \n{df_res.shape}')
 
+        # Should not apply the function if the level is disabled.
+        logger.setLevel(logging.WARNING)
+        mock_func = unittest.mock.Mock(return_value='info')
+        with unittest.mock.patch('logging.Logger.info') as mock_logging:
+            df_res = df.pipe(log_df, mock_func)
+            mock_func.assert_not_called()
+            mock_logging.assert_not_called()
+        self.assertIs(df_res, df)
+        logger.setLevel(logging.INFO)
+
+        # Should log in a background thread with the asynchronous logging.
+        handler = unittest.mock.Mock(level=logging.NOTSET)
+        root_handlers = logging.getLogger().handlers
+        with unittest.mock.patch.object(logging.getLogger(), 'handlers', [handler]):
+            listener = start_async_logging()
+            self.assertRaises(ValueError, start_async_logging)
+            self.assertNotIn(handler, logging.getLogger().handlers)
+            log_df(df, msg='Async ')
+            stop_async_logging()
+            self.assertEqual(logging.getLogger().handlers, [handler])
+            self.assertIsNone(listener._thread)
+            self.assertEqual(handler.handle.call_args[0][0].getMessage(), f'Async {df.shape}')
+        self.assertIs(logging.getLogger().handlers, root_handlers)
+
+    def test_map_windows(self):
+        """
+        Test of the `map_windows` function.
+        """
+        array = np.random.RandomState(42).rand(103)
+        # Should give the same results as `sliding_window`, in the same order.
+        for window_size, step in [(10, 3), (10, 10), (7, 5), (103, 1)]:
+            res = [np.sum(window) for window in sliding_window(array, window_size, step)]
+            self.assertEqual(map_windows(np.sum, array, window_size, step, nb_proc=2), res)
+            self.assertEqual(map_windows(np.sum, array, window_size, step, nb_proc=2,
+                                         use_threads=True, chunksize=1), res)
+            self.assertEqual(map_windows(np.sum, array, window_size, step, nb_proc=1), res)
+
+        # Should work with other sequences.
+        self.assertEqual(map_windows(len, 'abcdefgh', 6, 4, nb_proc=2), [6, 4])
+        self.assertEqual(map_windows(len, self.df, 2, 2, nb_proc=2), [2, 2, 1])
+
+        self.assertRaises(ValueError, map_windows, len, 'abc', 4, 1)
+        # Iterators have no length and cannot be sliced.
+        self.assertRaises(TypeError, map_windows, len, (i for i in range(10)), 4, 1)
+        # The sequence must not be kept by the main process.
+        self.assertIsNone(bff.fancy._MAP_WINDOWS_SEQUENCE)
+
+    def test_mem_footprint(self):
+        """
+        Test of the `mem_footprint` function.
+        """
+        array = np.zeros((1000, 2))
+        mb = array.nbytes / 1024 ** 2
+        # Views of an array hold the whole array.
+        self.assertAlmostEqual(mem_footprint(array), mb)
+        self.assertAlmostEqual(mem_footprint(array[:10, 0]), mb)
+        self.assertAlmostEqual(mem_footprint((array, array[:10], array.T)),
+                               mb + sys.getsizeof((1, 2, 3)) / 1024 ** 2)
+
+        # Frames created from the same block share their memory.
+        df = pd.DataFrame(array, columns=['a', 'b'], copy=False)
+        df_copy = df.copy()
+        cache = {'df': df, 'a': df['a'], 'view': df.iloc[:10], 'copy': df_copy}
+        self.assertAlmostEqual(mem_footprint(cache), 2 * mb, places=2)
+        res = mem_footprint(cache, details=True)
+        self.assertEqual(res.columns.tolist(), ['total_mb', 'unique_mb', 'shared_mb'])
+        self.assertEqual(res.index.tolist(), ['df', 'a', 'view', 'copy'])
+        self.assertTrue((res.loc[['df', 'a', 'view'], 'shared_mb'] >= mb).all())
+        self.assertGreaterEqual(res.loc['copy', 'unique_mb'], mb)
+        assert_array_equal(res['total_mb'], res['unique_mb'] + res['shared_mb'])
+
+        # Python objects are counted once, with their containers.
+        values = ['a' * 1000] * 100
+        self.assertAlmostEqual(mem_footprint(pd.Series(values, dtype=object)) * 1024 ** 2,
+                               pd.Series(values).memory_usage(deep=True)
+                               - 99 * sys.getsizeof(values[0]))
+        self.assertLess(mem_footprint(pd.Series(values), deep=False), 0.01)
+        recursive = [1]
+        recursive.append(recursive)
+        self.assertEqual(mem_footprint(recursive) * 1024 ** 2,
+                         sys.getsizeof(recursive) + sys.getsizeof(1))
+
+        # Should give about the same memory as pandas for any type of column, without sharing.
+        df = pd.DataFrame({'a': pd.Categorical([1, 2] * 500),
+                           'b': pd.array(range(1000), dtype='Int64'),
+                           'c': pd.date_range('2020', periods=1000, freq='s', tz='UTC')})
+        self.assertAlmostEqual(mem_footprint(df),
+                               (df.memory_usage(deep=True).sum()
+                                + df.columns.memory_usage(deep=True)) / 1024 ** 2, places=3)
+        index = pd.MultiIndex.from_product([[1, 2], range(500)])
+        self.assertAlmostEqual(mem_footprint(index) * 1024 ** 2,
+                               sum(array.nbytes for array in [*index.levels, *index.codes]))
+        self.assertEqual(mem_footprint(df, details=True).index.tolist(), ['a', 'b', 'c', 'Index'])
+
     def test_mem_usage_pd(self):
         """
         Test of the `mem_usage_pd` function.
@@ -267,6 +696,82 @@ class TestFancy(unittest.TestCase):
         # Check for exception if not a pandas object.
         self.assertRaises(AttributeError, mem_usage_pd, {'a': 1, 'b': 2})
 
+        # Should estimate the memory of the objects from a sample.
+        def parse(value):
+            return [float(v) for v in value.replace(' MB', '').split(' ± ')]
+
+        df_obj = df.reset_index().assign(
+            D=lambda x: x['A'].str.repeat(np.random.RandomState(42).randint(1, 20, len(x))),
+            E=lambda x: x['A'].astype('category'))
+        exact = mem_usage_pd(df_obj)
+        approx = mem_usage_pd(df_obj, approx=True, sample_size=1000, random_state=42)
+        self.assertEqual(approx.keys(), exact.keys())
+        for key in ['A', 'D', 'total']:
+            value, bound = parse(next(v for v in approx[key] if isinstance(v, str))
+                                 if key != 'total' else approx[key])
+            exact_value = parse(next(v for v in exact[key] if isinstance(v, str))
+                                if key != 'total' else exact[key])[0]
+            self.assertLessEqual(abs(value - exact_value), bound + 0.01)
+        # Other columns are exact.
+        for key in ['Index', 'B', 'C', 'E']:
+            self.assertEqual(approx[key], exact[key])
+        self.assertGreater(parse(approx['total'])[1], 0)
+        # Small columns are measured exactly.
+        serie = df_obj['D'].head(1000)
+        self.assertEqual(mem_usage_pd(serie, approx=True, sample_size=1000),
+                         {'total': mem_usage_pd(serie)['total'].replace(' MB', ' ± 0.00 MB')})
+        # Should be ignored if not deep.
+        self.assertEqual(mem_usage_pd(df_obj, deep=False, approx=True),
+                         mem_usage_pd(df_obj, deep=False))
+
+    def test_memory_registry(self):
+        """
+        Test of the `MemoryRegistry` class.
+        """
+        registry = MemoryRegistry()
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.to_frame().columns.tolist(), MemoryRegistry.columns)
+        for name, peak in [('load', 100.), ('load', 300.), ('process', 200.)]:
+            registry.add({'name': name, 'peak_rss_mb': peak, 'retained_mb': peak / 10})
+        self.assertEqual(len(registry), 3)
+        assert_array_equal(registry.to_frame('load')['peak_rss_mb'], [100., 300.])
+        self.assertEqual(registry.exceeded(peak_rss_mb=150)['peak_rss_mb'].tolist(), [300., 200.])
+        self.assertEqual(registry.exceeded('process', peak_rss_mb=150, retained_mb=25)
+                         ['name'].tolist(), ['process'])
+        self.assertTrue(registry.exceeded(peak_rss_mb=500).empty)
+        self.assertRaises(KeyError, registry.exceeded, peak_mb=10)
+        registry.clear()
+        self.assertEqual(len(registry), 0)
+
+    def test_merge_with_categories(self):
+        """
+        Test of the `merge_with_categories` function.
+        """
+        df_left = pd.DataFrame({'country': ['China', 'Switzerland', 'China', None],
+                                'name': ['John', 'Jane', 'Mary', 'Greg']})
+        df_left = df_left.astype({'country': 'category'})
+        df_right = pd.DataFrame({'country': ['Switzerland', 'China', 'Italy'],
+                                 'capital': ['Bern', 'Beijing', 'Rome']})
+        df_right = df_right.astype({'country': 'category'})
+
+        df_merged = merge_with_categories(df_left, df_right, on='country')
+        df_res = pd.merge(df_left.astype(object), df_right.astype(object), on='country')
+        tm.assert_frame_equal(df_merged, df_res, check_dtype=False, check_categorical=False)
+        # The key must stay categorical with the union of the categories.
+        self.assertListEqual(df_merged['country'].cat.categories.tolist(),
+                             ['China', 'Italy', 'Switzerland'])
+        # Original DataFrames should be preserved.
+        self.assertListEqual(df_left['country'].cat.categories.tolist(),
+                             ['China', 'Switzerland'])
+        self.assertListEqual(df_right['country'].cat.codes.tolist(), [2, 0, 1])
+
+        # Keyword arguments should be passed to `pd.merge`.
+        df_outer = merge_with_categories(df_left, df_right, on=['country'], how='outer')
+        self.assertEqual(df_outer.shape, (5, 3))
+        self.assertTrue(pd.api.types.is_categorical_dtype(df_outer['country']))
+        self.assertListEqual(df_outer['capital'].tolist(),
+                             ['Beijing', 'Beijing', 'Bern', np.nan, 'Rome'])
+
     def test_normalization_pd(self):
         """
         Test of the `normalization_pd` function.
@@ -290,6 +795,146 @@ class TestFancy(unittest.TestCase):
         data_min_max['y_norm'] = [2.000000, 0.06320755, 0.000000, 0.009434, 0.273585]
         df_min_max_res = pd.DataFrame(data_min_max)
         tm.assert_frame_equal(df_min_max, df_min_max_res, check_dtype=True, check_categorical=False)
+        # A scaler None should still be the min-max normalization.
+        tm.assert_frame_equal(normalization_pd(df, scaler=None, suffix='_norm',
+                                               feature_range=(0, 2), new_type=np.float64),
+                              df_min_max)
+
+        # Built-in methods should give the same results as the scalers of sklearn.
+        df_rand = pd.DataFrame(np.random.RandomState(42).normal(size=(100, 4)) * [1, 10, 100, 0],
+                               columns=['a', 'b', 'c', 'd']).assign(color='r')
+        df_rand.iloc[3, 1] = np.nan
+        for method, scaler, kwargs in [('minmax', MinMaxScaler, {'feature_range': (-1, 1)}),
+                                       ('standard', StandardScaler, {}),
+                                       ('standard', StandardScaler, {'with_mean': False}),
+                                       ('robust', RobustScaler, {'quantile_range': (10, 90)})]:
+            tm.assert_frame_equal(normalization_pd(df_rand, method, **kwargs),
+                                  normalization_pd(df_rand, scaler, **kwargs), atol=1e-6)
+        # Columns keep their position, new ones are appended.
+        df_res = normalization_pd(df_rand, 'standard', columns=['c', 'a'])
+        self.assertEqual(df_res.columns.tolist(), df_rand.columns.tolist())
+        tm.assert_frame_equal(df_res[['b', 'color']], df_rand[['b', 'color']])
+        self.assertEqual(normalization_pd(df_rand, 'robust', columns=['c'], suffix='_n')
+                         .columns.tolist(), ['a', 'b', 'c', 'd', 'color', 'c_n'])
+        # Without numerical columns, the DataFrame is unchanged.
+        tm.assert_frame_equal(normalization_pd(df_rand[['color']]), df_rand[['color']])
+        # Check for exceptions with unknown methods or arguments.
+        self.assertRaises(ValueError, normalization_pd, df, 'maxabs')
+        self.assertRaises(TypeError, normalization_pd, df, 'standard', feature_range=(0, 2))
+
+    def test_normalization_plan(self):
+        """
+        Test of the `NormalizationPlan` class.
+        """
+        df = pd.DataFrame(np.random.RandomState(42).normal(size=(1000, 3)) * [1, 1000, 0]
+                          + [0, 1e6, 3], columns=['a', 'b', 'c']).assign(color='r')
+        df.iloc[:300, 1] = np.nan
+
+        def chunks(size=77):
+            return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+        for method, kwargs in [('minmax', {}), ('minmax', {'feature_range': (-1, 1)}),
+                               ('standard', {}), ('standard', {'with_mean': False})]:
+            plan = NormalizationPlan(method, **kwargs).fit(chunks())
+            self.assertTrue(plan.fitted)
+            self.assertEqual(plan.columns, ['a', 'b', 'c'])
+            assert_array_equal(plan.count, [1000, 700, 1000])
+            # Should give the same result as a fit on the whole data.
+            tm.assert_frame_equal(pd.concat(plan.apply_chunks(chunks())),
+                                  normalization_pd(df, method, **kwargs))
+            tm.assert_frame_equal(plan.params(), NormalizationPlan(method, **kwargs)
+                                  .fit(df).params(), rtol=1e-12)
+        # Should be the same with chunks having only missing values in a column.
+        tm.assert_frame_equal(NormalizationPlan('standard').fit(chunks(100)).params(),
+                              NormalizationPlan('standard').fit(df).params(), rtol=1e-12)
+
+        # Should work with selected columns and a suffix.
+        plan = NormalizationPlan('minmax', columns=['b', 'color'], suffix='_norm').fit(chunks())
+        self.assertEqual(plan.columns, ['b'])
+        df_res = plan.apply(df)
+        self.assertEqual(df_res.columns.tolist(), ['a', 'b', 'c', 'color', 'b_norm'])
+        self.assertAlmostEqual(df_res['b_norm'].min(), 0)
+        self.assertAlmostEqual(df_res['b_norm'].max(), 1)
+
+        # Should be serializable.
+        plan_restored = NormalizationPlan.from_dict(plan.to_dict())
+        tm.assert_frame_equal(plan_restored.apply(df), df_res)
+        self.assertEqual(plan_restored.to_dict(), plan.to_dict())
+
+        # Should select the columns again when fitted on another schema.
+        plan = NormalizationPlan('minmax').fit(df)
+        self.assertEqual(plan.fit(df[['c', 'a']]).columns, ['c', 'a'])
+        plan = NormalizationPlan('minmax', columns=['b', 'd']).fit(df.assign(d='r'))
+        self.assertEqual(plan.columns, ['b'])
+        self.assertEqual(plan.fit(df.assign(d=1.)).columns, ['b', 'd'])
+
+        # Check for exceptions.
+        self.assertRaises(ValueError, NormalizationPlan('standard').apply, df)
+        self.assertRaises(ValueError, NormalizationPlan, 'robust')
+        self.assertRaises(ValueError, NormalizationPlan, 'maxabs')
+        self.assertRaises(TypeError, NormalizationPlan, 'minmax', with_mean=False)
+
+    def test_optimize_dtypes_pd(self):
+        """
+        Test of the `optimize_dtypes_pd` function.
+        """
+        df = pd.DataFrame({'small_int': [1, -2, 3, 4, 5],
+                           'large_int': [1, 2, 3, 4, 100_000],
+                           'float': [1.5, 2.5, 3.5, np.nan, 5.5],
+                           'nullable_int': [1, np.nan, 3, 4, 5],
+                           'boolean': [True, False, True, True, False],
+                           'nullable_boolean': [True, None, True, True, False],
+                           'object_int': [1, 2, None, 4, 300],
+                           'name': ['John', 'Mary', 'Jane', 'Greg', 'James'],
+                           'country': ['China', 'China', 'Switzerland', 'China', 'China']})
+        df = df.astype({'boolean': 'object'})
+
+        df_optimized, report = optimize_dtypes_pd(df)
+        optimized_types = {'small_int': np.dtype('int8'),
+                           'large_int': np.dtype('int32'),
+                           'float': np.dtype('float32'),
+                           'nullable_int': pd.Int8Dtype(),
+                           'boolean': np.dtype('bool'),
+                           'nullable_boolean': pd.BooleanDtype(),
+                           'object_int': pd.Int16Dtype(),
+                           'name': np.dtype('O'),
+                           'country': CategoricalDtype(categories=['China', 'Switzerland'])}
+        self.assertDictEqual(df_optimized.dtypes.to_dict(), optimized_types)
+        # Values must be preserved.
+        tm.assert_frame_equal(df, df_optimized.astype(object).where(df_optimized.notna(), None),
+                              check_dtype=False)
+        # The original DataFrame must not be modified.
+        self.assertEqual(df['small_int'].dtype, np.dtype('int64'))
+
+        # Check the report, in the format of `mem_usage_pd`.
+        self.assertDictEqual(report['before'], mem_usage_pd(df))
+        self.assertDictEqual(report['after'], mem_usage_pd(df_optimized))
+        __, report_total = optimize_dtypes_pd(df, details=False)
+        self.assertListEqual(list(report_total['after'].keys()), ['total'])
+
+        # Should not cast to category if not wanted.
+        df_no_cat, __ = optimize_dtypes_pd(df, categories=False)
+        self.assertEqual(df_no_cat['country'].dtype, np.dtype('O'))
+
+        # Unsigned integers stay unsigned, values larger than `int64` are not wrapped around.
+        df_unsigned = pd.DataFrame({'uint8': np.arange(201, dtype=np.uint8),
+                                    'uint32': np.arange(201, dtype=np.uint32),
+                                    'uint64': np.append(np.arange(200, dtype=np.uint64),
+                                                        2**63 + 5),
+                                    'object': pd.Series([2**63 + 5] * 200 + [None],
+                                                        dtype=object)})
+        df_unsigned_optimized, __ = optimize_dtypes_pd(df_unsigned)
+        self.assertDictEqual(df_unsigned_optimized.dtypes.to_dict(),
+                             {'uint8': np.dtype('uint8'), 'uint32': np.dtype('uint8'),
+                              'uint64': np.dtype('uint64'), 'object': pd.UInt64Dtype()})
+        self.assertEqual(df_unsigned_optimized['uint64'].max(), 2**63 + 5)
+        self.assertEqual(df_unsigned_optimized['object'][0], 2**63 + 5)
+
+        # Floats are only downcast if no precision is lost, unless asked.
+        df_float = pd.DataFrame({'float': [1.82, 1.67, 1.75]})
+        self.assertEqual(optimize_dtypes_pd(df_float)[0]['float'].dtype, np.dtype('float64'))
+        self.assertEqual(optimize_dtypes_pd(df_float, downcast_floats=True)[0]['float'].dtype,
+                         np.dtype('float32'))
 
     def test_parse_date(self):
         """
@@ -328,6 +973,87 @@ class TestFancy(unittest.TestCase):
         self.assertEqual(dummy_function(date='wrong format')['date'],
                          'wrong format')
 
+    def test_peak_detector(self):
+        """
+        Test of the `PeakDetector` class.
+        """
+        values = [4, 5, 9, 3, 2, 1, 2, 1, 3, 4, 12, 9, 6, 3, 2, 4, 5]
+        dates = pd.date_range('2019-06-20', periods=len(values), freq='T')
+        s = pd.Series(values, index=dates)
+
+        # Peaks are confirmed `distance` samples after them.
+        detector = PeakDetector(distance=2, height=5)
+        peak_dates, peak_values = detector.update(s[:4])
+        self.assertEqual(len(peak_dates), 0)
+        peak_dates, peak_values = detector.update(s[4:8])
+        assert_array_equal(peak_dates, [np.datetime64('2019-06-20T00:02')])
+        assert_array_equal(peak_values, [9.])
+        peak_dates, peak_values = detector.update(s[8:])
+        assert_array_equal(peak_dates, [np.datetime64('2019-06-20T00:10')])
+        assert_array_equal(peak_values, [12.])
+        self.assertEqual(len(detector.flush()[0]), 0)
+
+        # Should give the same result as `get_peaks`, whatever the size of the batches.
+        rng = np.random.RandomState(42)
+        s_long = pd.Series(rng.randn(2_000).cumsum() + rng.randn(2_000) * 3,
+                           index=pd.date_range('2019-06-20', periods=2_000, freq='S'))
+        peak_dates_res, peak_values_res = get_peaks(s_long)
+        for batch_size in (1, 7, 150, 2_000):
+            detector = PeakDetector(distance=80, height=s_long.quantile(0.75))
+            res = ([detector.update(s_long[i:i + batch_size])
+                    for i in range(0, len(s_long), batch_size)]
+                   + [detector.flush()])
+            assert_array_equal(np.concatenate([dates for dates, __ in res]), peak_dates_res)
+            assert_array_equal(np.concatenate([heights for __, heights in res]),
+                               peak_values_res)
+
+        # Plateaus spanning several batches and peaks of the same height, as in `get_peaks`.
+        for values_ties, distance, peaks in (([1, 3, 3, 2, 3], 1, [1]),
+                                             ([3, 0, 1, 0, 2, 1, 3, 3, 1], 3, [2, 6])):
+            s_ties = pd.Series(values_ties, index=dates[:len(values_ties)])
+            for batch_size in (1, 2, 3):
+                detector = PeakDetector(distance=distance, height=0)
+                res = ([detector.update(s_ties[i:i + batch_size])
+                        for i in range(0, len(s_ties), batch_size)]
+                       + [detector.flush()])
+                assert_array_equal(np.concatenate([dates for dates, __ in res]), dates[peaks])
+        s_ties = pd.Series(rng.randint(0, 4, 2_000).astype(float),
+                           index=pd.date_range('2019-06-20', periods=2_000, freq='S'))
+        s_ties[rng.rand(2_000) < 0.02] = np.nan
+        for distance_scale in (0.001, 0.01, 0.04):
+            peak_dates_res, peak_values_res = get_peaks(s_ties, distance_scale=distance_scale)
+            for batch_size in (1, 2, 3):
+                distance = math.ceil(2_000 * distance_scale)
+                detector = PeakDetector(distance=distance, height=s_ties.quantile(0.75))
+                res = []
+                for i in range(0, len(s_ties), batch_size):
+                    res.append(detector.update(s_ties[i:i + batch_size]))
+                    # Peaks of the same height do not wait for each other.
+                    self.assertLessEqual(len(detector._stream._positions), distance + 1)
+                res.append(detector.flush())
+                assert_array_equal(np.concatenate([dates for dates, __ in res]), peak_dates_res)
+                assert_array_equal(np.concatenate([heights for __, heights in res]),
+                                   peak_values_res)
+
+        # The quantile is estimated on the stream.
+        detector = PeakDetector(distance=80)
+        self.assertTrue(np.isnan(detector.threshold))
+        detector.update(s_long)
+        self.assertAlmostEqual(detector.threshold, s_long.quantile(0.75))
+        # With a uniform sample of the stream when the stream is larger than the sample.
+        s_uniform = pd.Series(np.arange(20_000, dtype=float),
+                              index=pd.date_range('2019-06-20', periods=20_000, freq='S'))
+        detector_sampled = PeakDetector(distance=80, sample_size=1_000, random_state=42)
+        for i in range(0, len(s_uniform), 1_000):
+            detector_sampled.update(s_uniform[i:i + 1_000])
+        self.assertAlmostEqual(detector_sampled.threshold / 20_000, 0.75, delta=0.03)
+
+        # Check the exceptions.
+        self.assertRaises(ValueError, PeakDetector, distance=0)
+        self.assertRaises(ValueError, PeakDetector, distance=1, sample_size=0)
+        self.assertRaises(AssertionError, PeakDetector(distance=1).update,
+                          pd.Series(values, index=range(len(values))))
+
     def test_pipe_multiprocessing_pd_one(self):
         """
         Test of the `pipe_multiprocessing_pd` function.
@@ -360,6 +1086,67 @@ class TestFancy(unittest.TestCase):
                               pd.DataFrame({'a': [1, 2, 3], 'd': [1, 8, 27]}),
                               check_dtype=False, check_categorical=False)
 
+    def test_pipeline_profiler(self):
+        """
+        Test of the `PipelineProfiler` class.
+        """
+        df = pd.DataFrame({'age': [24, 20, 25, 30], 'country': ['CH', 'CH', 'IT', 'FR']})
+        with self.assertLogs('bff.fancy', level='INFO') as logs:
+            with PipelineProfiler(top=2) as profiler:
+                df_res = (df.pipe(log_df, step='start')
+                          .assign(adult=lambda x: x['age'] >= 21)
+                          .pipe(log_df, msg='assign: ')
+                          .astype({'age': 'int8', 'country': 'category'})
+                          .drop(columns='adult')
+                          .pipe(log_df))
+        # The DataFrame is not modified by the checkpoints.
+        self.assertEqual(df_res.shape, (4, 2))
+
+        summary = profiler.summary()
+        self.assertEqual(summary.columns.tolist(),
+                         ['step', 'time', 'rows', 'columns', 'memory_mb',
+                          'memory_delta_mb', 'dtype_changes'])
+        self.assertEqual(summary['step'].tolist(), ['start', 'assign: ', 'step 2'])
+        self.assertEqual(summary['rows'].tolist(), [4, 4, 4])
+        self.assertEqual(summary['columns'].tolist(), [2, 3, 2])
+        self.assertEqual(summary['dtype_changes'].tolist(),
+                         ['', '+adult', 'age: int64 -> int8, country: object -> category, -adult'])
+        self.assertTrue((summary['time'] >= 0).all())
+        # The first step has no previous checkpoint to measure the memory from.
+        self.assertTrue(np.isnan(summary['memory_delta_mb'].iloc[0]))
+        self.assertAlmostEqual(summary['memory_delta_mb'].sum(),
+                               summary['memory_mb'].iloc[-1] - summary['memory_mb'].iloc[0])
+
+        # The slowest and most memory-hungry steps are logged at the exit.
+        self.assertTrue(any('Slowest steps' in line for line in logs.output))
+        memory_log = next(line for line in logs.output if 'Most memory-hungry steps' in line)
+        self.assertNotIn('start', memory_log)
+
+        # Outside of the context, `log_df` does not record steps.
+        df.pipe(log_df, step='outside')
+        self.assertEqual(len(profiler.steps), 3)
+
+        # Checkpoints can be called directly, nested profilers get the calls.
+        with PipelineProfiler() as outer:
+            with PipelineProfiler() as inner:
+                df.pipe(log_df)
+            outer.checkpoint(df, 'direct')
+        self.assertEqual(len(inner.steps), 1)
+        self.assertEqual(outer.summary()['step'].tolist(), ['direct'])
+
+    def test_recode_categorical(self):
+        """
+        Test of the `recode_categorical` function.
+        """
+        values = pd.Categorical(['China', 'Italy', None, 'China', 'Spain'])
+        cat_type = pd.CategoricalDtype(['Italy', 'France', 'China'])
+        res = recode_categorical(values, cat_type)
+        self.assertEqual(res.dtype, cat_type)
+        self.assertListEqual(res.codes.tolist(), [2, 0, -1, 2, -1])
+        # Values not in the new categories become missing values.
+        self.assertListEqual(pd.Series(res).tolist()[:2], ['China', 'Italy'])
+        self.assertTrue(pd.isna(res[4]))
+
     def test_size_2_square(self):
         """
         Test of the `size_2_square` function.
@@ -438,6 +1225,237 @@ class TestFancy(unittest.TestCase):
         with self.assertRaises(ValueError):
             list(sliding_window('abc', 4, 1))
 
+    def test_sliding_window_batches(self):
+        """
+        Test of the `sliding_window_batches` function.
+        """
+        df = pd.DataFrame({'a': range(20), 'b': np.arange(20) * 10.})
+        windows = [window.to_numpy(np.float32) for window in sliding_window(df, 4, 2)]
+
+        for prefetch in (0, 2):
+            batches = list(sliding_window_batches(df, 4, 2, batch_size=3, prefetch=prefetch))
+            self.assertEqual([batch.shape for batch in batches],
+                             [(3, 4, 2), (3, 4, 2), (3, 4, 2)])
+            self.assertEqual(batches[0].dtype, np.float32)
+            # Should be the full windows of `sliding_window`, in order.
+            assert_array_equal(np.concatenate(batches), windows)
+
+        # Should shuffle the windows with the seed.
+        batches = list(sliding_window_batches(df, 4, 2, batch_size=4, shuffle=True,
+                                              random_state=42))
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 1])
+        shuffled = np.concatenate(batches)
+        self.assertFalse(np.array_equal(shuffled, windows))
+        assert_array_equal(shuffled[np.argsort(shuffled[:, 0, 0])], windows)
+        assert_array_equal(np.concatenate(list(sliding_window_batches(
+            df, 4, 2, batch_size=4, shuffle=True, random_state=42))), shuffled)
+
+        # Should work with arrays and stop the thread if not consumed until the end.
+        batches = sliding_window_batches(np.arange(10), 2, 1, batch_size=1, prefetch=2)
+        assert_array_equal(next(batches), [[[0.], [1.]]])
+        batches.close()
+
+        self.assertRaises(ValueError, list, sliding_window_batches(df, 4, 2, batch_size=0))
+        self.assertRaises(ValueError, list, sliding_window_batches(df, 21, 2))
+
+    def test_sliding_window_iter(self):
+        """
+        Test of the `sliding_window_iter` function.
+        """
+        # Should give the same windows as `sliding_window`, including the remainder.
+        for size, window_size, step in [(6, 2, 1), (6, 5, 5), (7, 2, 2), (7, 7, 3),
+                                        (8, 6, 4), (8, 6, 5), (11, 6, 1), (10, 4, 2)]:
+            res = [tuple(window) for window in sliding_window(range(size), window_size, step)]
+            self.assertEqual(list(sliding_window_iter(iter(range(size)), window_size, step)),
+                             res)
+            # `sliding_window` should use it for iterables without length.
+            self.assertEqual(list(sliding_window((i for i in range(size)), window_size, step)),
+                             res)
+
+        # Should only keep the last values of the iterable.
+        windows = sliding_window_iter(iter(range(10**6)), 3, 2)
+        self.assertEqual(next(windows), (0, 1, 2))
+        self.assertEqual(next(windows), (2, 3, 4))
+
+        # Should check the arguments, length only once consumed.
+        self.assertRaises(TypeError, list, sliding_window_iter(iter('abc'), 2, '1'))
+        self.assertRaises(ValueError, list, sliding_window_iter(iter('abc'), 1, 2))
+        self.assertRaises(ValueError, list, sliding_window_iter(iter('abc'), 4, 1))
+        self.assertRaises(ValueError, list, sliding_window_iter('abc', 4, 1))
+
+    def test_sliding_window_np(self):
+        """
+        Test of the `sliding_window_np` function.
+        """
+        # Should give the same windows as `sliding_window`.
+        for size, window_size, step in [(6, 2, 1), (6, 5, 5), (7, 2, 2), (7, 7, 3),
+                                        (8, 6, 4), (8, 6, 5), (10, 4, 2)]:
+            array = np.arange(size)
+            windows, remainder = sliding_window_np(array, window_size, step)
+            res = list(sliding_window(array, window_size, step))
+            self.assertEqual(windows.shape, (len(windows), window_size))
+            assert_array_equal(windows, np.array(res[:len(windows)]))
+            if remainder is None:
+                self.assertEqual(len(res), len(windows))
+            else:
+                assert_array_equal(remainder, res[-1])
+
+        # Should be a read-only view, without copy.
+        array = np.arange(10.)
+        windows, __ = sliding_window_np(array, 4, 2)
+        self.assertTrue(np.shares_memory(windows, array))
+        self.assertFalse(windows.flags.writeable)
+        assert_array_equal(windows.mean(axis=1), [1.5, 3.5, 5.5, 7.5])
+
+        # Should work with Series and 2-D arrays.
+        windows, remainder = sliding_window_np(pd.Series(array), 5, 5)
+        assert_array_equal(windows, [[0., 1., 2., 3., 4.], [5., 6., 7., 8., 9.]])
+        self.assertIsNone(remainder)
+        windows, __ = sliding_window_np(array.reshape(5, 2), 2, 1)
+        self.assertEqual(windows.shape, (4, 2, 2))
+        assert_array_equal(windows[1], [[2., 3.], [4., 5.]])
+
+        # Should check the arguments as `sliding_window`.
+        self.assertRaises(TypeError, sliding_window_np, array, 2.0, 1)
+        self.assertRaises(ValueError, sliding_window_np, array, 1, 2)
+        self.assertRaises(ValueError, sliding_window_np, array, 11, 1)
+
+    def test_sliding_window_time(self):
+        """
+        Test of the `sliding_window_time` function.
+        """
+        dates = pd.to_datetime(['2019-06-20 00:00', '2019-06-20 00:01', '2019-06-20 00:04',
+                                '2019-06-20 00:05', '2019-06-20 00:09', '2019-06-20 00:20'])
+        df = pd.DataFrame({'a': range(6), 'b': list('abcdef')}, index=dates)
+
+        windows = list(sliding_window_time(df, '5min', '3min'))
+        # Windows of 5 minutes, starting every 3 minutes until the last date.
+        self.assertEqual([window['a'].tolist() for window in windows],
+                         [[0, 1, 2], [2, 3], [4], [4], [], [], [5]])
+        tm.assert_frame_equal(windows[0], df.iloc[:3])
+        # Should work with Series and a single window.
+        self.assertEqual([window.tolist() for window in sliding_window_time(df['a'], '1h', '1h')],
+                         [list(range(6))])
+
+    def test_sliding_window_time_bounds(self):
+        """
+        Test of the `sliding_window_time_bounds` function.
+        """
+        dates = pd.to_datetime(['2019-06-20 00:00', '2019-06-20 00:01', '2019-06-20 00:04',
+                                '2019-06-20 00:05', '2019-06-20 00:09'])
+        starts_date, starts, stops = sliding_window_time_bounds(dates, '5min', '3min')
+        tm.assert_index_equal(starts_date, pd.date_range('2019-06-20', periods=3, freq='3min'))
+        assert_array_equal(starts, [0, 2, 4])
+        assert_array_equal(stops, [3, 4, 5])
+        # Should be the same as filtering the index.
+        for date, start, stop in zip(starts_date, starts, stops):
+            mask = (dates >= date) & (dates < date + pd.Timedelta('5min'))
+            assert_array_equal(np.flatnonzero(mask), np.arange(start, stop))
+
+        # Window should be the duration with the step given as Timedelta.
+        __, starts, stops = sliding_window_time_bounds(dates, pd.Timedelta('2min'),
+                                                       pd.Timedelta('1min'))
+        assert_array_equal(stops - starts, [2, 1, 0, 1, 2, 1, 0, 0, 1])
+        # Empty index should have no window.
+        self.assertEqual(len(sliding_window_time_bounds(dates[:0], '5min', '1min')[1]), 0)
+
+        # Check the arguments.
+        self.assertRaises(AssertionError, sliding_window_time_bounds,
+                          pd.Index(range(5)), '5min', '1min')
+        self.assertRaises(ValueError, sliding_window_time_bounds, dates, '0min', '1min')
+        self.assertRaises(ValueError, sliding_window_time_bounds, dates, '5min', '-1min')
+        self.assertRaises(ValueError, sliding_window_time_bounds, dates[::-1], '5min', '1min')
+
+    def test_track_memory(self):
+        """
+        Test of the `track_memory` function.
+        """
+        registry = MemoryRegistry()
+
+        # Should work as a decorator, with and without arguments.
+        @track_memory
+        def load_default():
+            return np.ones(1_000_000)
+
+        @track_memory(name='load', registry=registry)
+        def load():
+            return np.ones(1_000_000)
+
+        mb = np.ones(1_000_000).nbytes / 1024 ** 2
+        array = load()
+        self.assertEqual(load.__name__, 'load')
+        self.assertEqual(len(registry), 1)
+        record = registry.to_frame().iloc[0]
+        self.assertEqual(record['name'], 'load')
+        self.assertGreater(record['time'], 0)
+        self.assertGreaterEqual(record['peak_traced_mb'], mb)
+        self.assertAlmostEqual(record['retained_mb'], mb, places=1)
+        self.assertGreater(record['peak_rss_mb'], 0)
+        self.assertTrue(np.isnan(record['children_peak_rss_mb']))
+        # Each call adds a record.
+        load()
+        self.assertEqual(len(registry), 2)
+        # Should use the default registry, with the name of the function.
+        nb_records = len(MEMORY_REGISTRY)
+        load_default()
+        self.assertEqual(MEMORY_REGISTRY.records[-1]['name'],
+                         'TestFancy.test_track_memory.<locals>.load_default')
+        self.assertEqual(len(MEMORY_REGISTRY), nb_records + 1)
+
+        # Should work as a nested context manager, memory freed is not retained.
+        registry.clear()
+        with track_memory('outer', registry=registry):
+            with track_memory('inner', registry=registry):
+                array = np.ones(2_000_000)
+                del array
+            array = np.ones(1_000_000)
+        inner, outer = registry.records
+        self.assertEqual((inner['name'], outer['name']), ('inner', 'outer'))
+        self.assertGreaterEqual(inner['peak_traced_mb'], 2 * mb)
+        self.assertLess(inner['retained_mb'], 0.1)
+        self.assertGreaterEqual(outer['peak_traced_mb'], 2 * mb)
+        self.assertAlmostEqual(outer['retained_mb'], mb, places=1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        # Contexts of several threads end in any order, the last one stops the tracing.
+        registry_threads = MemoryRegistry()
+        first = track_memory('first', registry=registry_threads).__enter__()
+        second = track_memory('second', registry=registry_threads).__enter__()
+        first.__exit__(None, None, None)
+        self.assertTrue(tracemalloc.is_tracing())
+        second.__exit__(None, None, None)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        def work():
+            for _ in range(20):
+                with track_memory('thread', registry=registry_threads):
+                    np.ones(10_000)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(registry_threads), 82)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        # Should track generators until they are exhausted.
+        @track_memory('chunks', registry=registry)
+        def chunks():
+            for _ in range(3):
+                yield np.ones(1_000_000)
+
+        self.assertEqual(len(list(chunks())), 3)
+        self.assertEqual(len(registry), 3)
+        self.assertGreaterEqual(registry.records[-1]['peak_traced_mb'], 3 * mb)
+
+        # Should only measure the RSS without tracing, and the peak of the workers.
+        with track_memory('process', registry=registry, trace=False):
+            pipe_multiprocessing_pd(pd.DataFrame({'a': [1, 2, 3]}), df_dummy_func_one, nb_proc=2)
+        record = registry.records[-1]
+        self.assertTrue(np.isnan(record['peak_traced_mb']))
+        self.assertGreater(record['peak_rss_mb'], 0)
+
     def test_value_2_list(self):
         """
         Test of the `value_2_list` function.
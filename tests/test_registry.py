@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Test of registry module
+
+This module test the persistent registry of categories.
+"""
+from pathlib import Path
+import tempfile
+import unittest
+
+import pandas as pd
+import pandas.util.testing as tm
+
+from bff.registry import CategoryRegistry
+
+
+class TestCategoryRegistry(unittest.TestCase):
+    """
+    Unittest of registry module.
+    """
+
+    def setUp(self):
+        """Create a temporary directory for the registry."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name).joinpath('categories')
+
+    def tearDown(self):
+        """Remove the temporary directory of the registry."""
+        self.tmp_dir.cleanup()
+
+    def test_register(self):
+        """
+        Test the registration of categories.
+        """
+        registry = CategoryRegistry(self.path)
+        self.assertTrue(self.path.exists())
+        self.assertEqual(len(registry), 0)
+
+        cat_type = registry.register('country', ['China', 'Switzerland', 'China', None])
+        self.assertListEqual(cat_type.categories.tolist(), ['China', 'Switzerland'])
+        # Categories are only appended.
+        cat_type = registry.register('country', ['Italy', 'China'])
+        self.assertListEqual(cat_type.categories.tolist(), ['China', 'Switzerland', 'Italy'])
+        registry.register('sensor', [12, 3])
+
+        self.assertEqual(len(registry), 2)
+        self.assertListEqual(sorted(registry), ['country', 'sensor'])
+        self.assertListEqual(registry['sensor'], [12, 3])
+        self.assertEqual(registry.dtype('sensor'), pd.CategoricalDtype([12, 3]))
+        with self.assertRaises(KeyError):
+            __ = registry['error']
+
+        # The categories are persisted and shared with other instances.
+        registry_other = CategoryRegistry(self.path)
+        self.assertListEqual(registry_other['country'], ['China', 'Switzerland', 'Italy'])
+        registry_other.register('country', ['France'])
+        self.assertListEqual(registry['country'],
+                             ['China', 'Switzerland', 'Italy', 'France'])
+        registry.register('country', ['Spain', 'France'])
+        self.assertListEqual(registry_other['country'],
+                             ['China', 'Switzerland', 'Italy', 'France', 'Spain'])
+
+    def test_encode(self):
+        """
+        Test the encoding and concatenation of DataFrames with the registry.
+        """
+        registry = CategoryRegistry(self.path)
+        df_a = pd.DataFrame({'country': ['China', 'Switzerland', 'China'], 'age': [24, 20, 25]})
+        df_b = pd.DataFrame({'country': ['Italy', 'China'], 'age': [23, 28]})
+
+        df_a_encoded = registry.encode(df_a, columns=['country'])
+        self.assertListEqual(df_a_encoded['country'].cat.codes.tolist(), [0, 1, 0])
+        tm.assert_frame_equal(df_a_encoded, df_a, check_dtype=False, check_categorical=False)
+        # Original DataFrame should be preserved.
+        self.assertEqual(df_a['country'].dtype, 'object')
+
+        # Codes are stable, already registered columns are encoded by default.
+        df_b_encoded = registry.encode(df_b)
+        self.assertListEqual(df_b_encoded['country'].cat.codes.tolist(), [2, 0])
+        self.assertTrue(pd.api.types.is_integer_dtype(df_b_encoded['age']))
+
+        # Categorical columns with other categories are recoded.
+        df_c = pd.DataFrame({'country': ['France', 'Italy']}).astype('category')
+        self.assertListEqual(registry.encode(df_c)['country'].cat.codes.tolist(), [3, 2])
+        # Previously encoded columns keep their codes.
+        df_a_reencoded = registry.encode(df_a_encoded)
+        self.assertListEqual(df_a_reencoded['country'].cat.codes.tolist(), [0, 1, 0])
+        self.assertEqual(len(df_a_reencoded['country'].cat.categories), 4)
+
+        # Concatenation should preserve the categories.
+        df_concat = registry.concat([df_a_encoded, df_b, df_c], ignore_index=True)
+        self.assertTrue(pd.api.types.is_categorical_dtype(df_concat['country']))
+        self.assertListEqual(df_concat['country'].cat.codes.tolist(), [0, 1, 0, 2, 0, 3, 2])
+        self.assertListEqual(df_concat['country'].tolist(),
+                             ['China', 'Switzerland', 'China', 'Italy', 'China',
+                              'France', 'Italy'])
+
+    def test_columns(self):
+        """
+        Test the names of the columns and the reading of the files of the registry.
+        """
+        registry = CategoryRegistry(self.path)
+        registry.register(1, ['a'])
+        registry.register('1', ['b'])
+        registry.register(('sensor', 2), ['c'])
+        # Names of other types than strings are preserved.
+        self.assertEqual(len(registry), 3)
+        self.assertSetEqual(set(registry), {1, '1', ('sensor', 2)})
+        self.assertListEqual(registry[1], ['a'])
+        self.assertListEqual(registry['1'], ['b'])
+        self.assertListEqual(CategoryRegistry(self.path)[('sensor', 2)], ['c'])
+
+        # A line not completely written is read once complete.
+        path = registry._path_column(1)
+        with path.open(mode='ab') as f:
+            f.write(b'"incompl')
+        self.assertListEqual(registry[1], ['a'])
+        with path.open(mode='ab') as f:
+            f.write(b'ete"\n')
+        self.assertListEqual(registry[1], ['a', 'incomplete'])